@@ -1,83 +1,131 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, simpledialog, colorchooser
 from tkinter import font as tkfont
-from PIL import Image, ImageTk
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.dml.color import RGBColor
-from pptx.enum.text import PP_PARAGRAPH_ALIGNMENT
-from pptx.enum.shapes import MSO_SHAPE
-from pptx.enum.dml import MSO_THEME_COLOR
-import json
+import copy
 import os
+import sys
 from collections import OrderedDict
 
+from model import (
+    SECTION_KEYS, SECTION_LABELS, SECTION_FIELDS,
+    DomainState, CompetenceItem, Project, domain_color, new_section_data,
+    parse_competences_file, parse_timestamp, format_timestamp,
+)
+from layout import (
+    PREVIEW_WIDTH, PREVIEW_HEIGHT, HEADER_HEIGHT, TEXT_MARGIN_X,
+    SUBHEADER_SPACING, LINE_SPACING, SUBHEADER_HEIGHT,
+    paginate, page_fingerprint,
+)
+from theme import Theme, load_theme
+from render import BookletRenderer, ThumbnailCache, DEFAULT_DPI, make_thumbnail
+from bulk import bulk_add, referential_keys
+from roster import import_roster
+from photos import preview_path
+from image_cache import PageImageCache, fit_size
+from templates import GENRES, wrap_competence
+from referential import diff_referentials, apply_diff
+from history import History
+from workspace import PupilSession, adopt_referential, pupil_label
+from periods import ALL_PERIODS, TimestampIndex, filter_project, parse_period, partial_domains
+
 # ==== Configuration ====
 
 APP_TITLE = "Compétences Pro Ultimate"
 MAX_LINES_PER_SLIDE = 20    # Gardé pour compat; pagination export/aperçu utilise maintenant une simulation pixel
 LEFT_PANEL_MINW = 300
 COMP_LISTBOX_WIDTH = 62
-PREVIEW_WIDTH = 900
-PREVIEW_HEIGHT = 520
-HEADER_HEIGHT = 48
-SUBHEADER_SPACING = 6
-LINE_SPACING = 6
 COVER_HEADER_HEIGHT = 64
-TEXT_MARGIN_X = 24
-TEXT_MARGIN_Y = 18
-DEFAULT_BODY_FONT = ("Arial", 12)
-DEFAULT_TITLE_SIZE_PT = 20
-DEFAULT_BODY_SIZE_PT = 12
-DEFAULT_SUBHEADER_BOLD = True
-DEFAULT_SUBHEADER_UNDERLINE = True
 DEFAULT_TITLE_FG = "white"
 COVER_HEADER_COLOR = "#6e6e6e"
 COVER_PERSONAL_BG_PREVIEW = "#6B8E23"
-
-# Palette de couleurs pour domaines
-DOMAIN_COLORS = [
-    "#2E86C1", "#AF7AC5", "#48C9B0", "#F5B041", "#EC7063",
-    "#16A085", "#5D6D7E", "#CA6F1E", "#7D3C98", "#1F618D"
-]
-
-# Sections (maternelle)
-SECTION_KEYS = ["TPS", "PS", "MS", "GS"]
-SECTION_LABELS = {
-    "TPS": "TOUTE PETITE SECTION",
-    "PS": "PETITE SECTION",
-    "MS": "MOYENNE SECTION",
-    "GS": "GRANDE SECTION",
-}
-# Champs par section
-SECTION_FIELDS = OrderedDict([
-    ("annee", "Année scolaire"),
-    ("ecole", "École"),
-    ("enseignants", "Enseignant(s)"),
-])
-
-
-# ==== Structures de données ====
-
-class DomainState:
-    def __init__(self, name, color):
-        self.name = name
-        self.color = color  # hex
-        self.font_body = DEFAULT_BODY_FONT
-
-
-class CompetenceItem:
-    def __init__(self, domain, subdomain, text, ts=None, batch_id=None):
-        self.domain = domain
-        self.subdomain = subdomain
-        self.text = text
-        # Ajouts: horodatage & lot d'ajout (pour regrouper dans le PPT)
-        self.ts = ts    # "Mois Année"
-        self.batch_id = batch_id  # entier
-
-    def key(self):
-        # clé d'unicité
-        return (self.domain, self.subdomain or "", self.text)
+THUMB_WIDTH = 120            # largeur d'une miniature de page (px)
+THUMB_HEIGHT = 90
+THUMB_GAP = 10
+THUMB_RENDER_DPI = 24        # rendu hors écran avant réduction
+THUMB_DELAY_MS = 150         # regroupe les mises à jour de la bande (glisser d'image, frappe)
+WRAP_CACHE_MAX = 20000
+RESIZE_DEBOUNCE_MS = 120     # redessin différé pendant un redimensionnement de fenêtre
+IMAGE_MEMORY_MB = 96         # budget des pixels d'images de page et de couverture
+PAGE_IMAGE_MAX_SIDE = 360    # taille initiale d'une image ajoutée à une page (px)
+WATCH_INTERVAL_MS = 1000     # surveillance de COMPETENCES.txt et des fichiers de thème
+
+
+def photo_image(pil):
+    # Pont PIL -> Tk importé au premier affichage d'image (démarrage plus rapide)
+    from PIL import ImageTk
+    return ImageTk.PhotoImage(pil)
+
+
+# ==== Rafraîchissements ====
+
+class RedrawScheduler:
+    """
+    Point unique des rafraîchissements de l'interface.
+    Le code marque ce qui est à refaire ("pages" = pagination, "page" = page courante,
+    "cover" = mini-couverture) et un seul passage, au prochain moment inactif de Tk,
+    exécute chaque travail au plus une fois. Pendant un redimensionnement, le passage
+    est repoussé jusqu'à la fin de la rafale d'événements <Configure>.
+    """
+
+    ORDER = ("pages", "page", "cover")
+
+    def __init__(self, root, handlers):
+        self.root = root
+        self.handlers = handlers          # part -> callable
+        self.dirty = set()
+        self._idle_job = None
+        self._resize_job = None
+        self.requested = {part: 0 for part in self.ORDER}
+        self.executed = {part: 0 for part in self.ORDER}
+        self.frames = 0
+
+    def invalidate(self, *parts):
+        for part in parts:
+            self.requested[part] += 1
+            self.dirty.add(part)
+        # une nouvelle pagination implique de redessiner la page courante
+        if "pages" in self.dirty:
+            self.dirty.add("page")
+        if self._idle_job is None and self._resize_job is None:
+            self._idle_job = self.root.after_idle(self.flush)
+
+    def invalidate_resize(self, *parts):
+        for part in parts:
+            self.requested[part] += 1
+            self.dirty.add(part)
+        if self._idle_job is not None:
+            self.root.after_cancel(self._idle_job)
+            self._idle_job = None
+        if self._resize_job is not None:
+            self.root.after_cancel(self._resize_job)
+        self._resize_job = self.root.after(RESIZE_DEBOUNCE_MS, self.flush)
+
+    def flush(self, only=None):
+        """Exécute les travaux en attente (ou seulement `only`, ex. la pagination avant un export)."""
+        if only is not None:
+            if only in self.dirty:
+                self.dirty.discard(only)
+                self.executed[only] += 1
+                self.handlers[only]()
+            return
+        self._idle_job = None
+        self._resize_job = None
+        parts, self.dirty = self.dirty, set()
+        if not parts:
+            return
+        self.frames += 1
+        for part in self.ORDER:
+            if part in parts:
+                self.executed[part] += 1
+                self.handlers[part]()
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "requested": dict(self.requested),
+            "executed": dict(self.executed),
+            "avoided": {p: self.requested[p] - self.executed[p] for p in self.ORDER},
+        }
 
 
 # ==== Application ====
@@ -94,21 +142,29 @@ class CompetenceApp:
         self.selected_items = []          # list[CompetenceItem]
         self.added_set = set()            # keys pour anti-doublon
         self.add_batch_counter = 0
+        self.project_path = None          # fichier du projet ouvert (sauvegarde / chargement)
+        self.referential_path = None      # COMPETENCES.txt chargé (rechargé s'il change)
+        self._referential_mtime = None
+        self.export_dirty = False         # livret modifié depuis le dernier export PowerPoint
 
         # Aperçu global
         self.domain_page_map = {}         # domain -> list[page]
         self.item_page_index = {}         # item.key() -> (domain, page_index)
         self.flat_pages = []              # list of (domain, page_index)
+        self._page_domains = None         # domaines à repaginer au prochain passage (None: tous)
         self.current_flat_index = 0
         self.current_domain = None
 
-        # Images par page
+        # Images par page: fiches {"path", "pos", "size"}; pixels dans image_cache
         self.page_images = {}             # (domain, page_index) -> [img dict]
+        self.image_cache = PageImageCache(photo_image, IMAGE_MEMORY_MB)
+        self._cover_image_keys = []       # (chemin, taille) affichés sur la couverture
 
         # Infos couverture
         self.nom_var = tk.StringVar()
         self.prenom_var = tk.StringVar()
         self.naissance_var = tk.StringVar()
+        self.genre_var = tk.StringVar(value=GENRES[""])   # libellé affiché (GENRES)
         self.photo_path = None
         self.personal_completed = False
 
@@ -116,34 +172,69 @@ class CompetenceApp:
         self.month_var = tk.StringVar()
         self.year_var = tk.StringVar()
 
+        # Période affichée et exportée (periods.py), commune aux onglets; « MS » se lit par élève
+        self.period_var = tk.StringVar(value=ALL_PERIODS)
+        self._ts_index = None             # TimestampIndex de selected_items (None: à refaire)
+        self._hidden_image_domains = set()    # domaines en partie filtrés: pages d'images masquées
+
         # Sections (TPS/PS/MS/GS)
-        self.sections_data = {
-            key: {
-                "completed": False,
-                "fields": {fname: "" for fname in SECTION_FIELDS.keys()},
-                "photo": None,
-                "bilan1": "",
-                "bilan2": "",
-                "bilan2_enabled": False,
-            } for key in SECTION_KEYS
-        }
+        self.sections_data = {key: new_section_data() for key in SECTION_KEYS}
         self.sections_widgets = {}
 
-        # Descriptions domaines/sous-domaines (DOMAINES.txt)
-        self.domain_descriptions = {}     # domain -> str
-        self.subdomain_descriptions = {}  # (domain, subdomain) -> str
+        # Thème: descriptions (DOMAINES.txt) et couleurs (COULEURS_DOMAINES.txt), compilé une fois
+        self.theme = None
+        self._theme_error = None
+        self._refresh_theme()
+
+        # Export PowerPoint compact (une zone de texte par sous-domaine)
+        self.compact_export_var = tk.BooleanVar(value=False)
 
         # Pour mesure du texte
         self.measure_font = tkfont.Font(family="Arial", size=12)
+        self._fonts = {}                  # (family, size) -> tkfont.Font
+        self._wrap_cache = {}             # (text, width, family, size) -> lignes
+
+        # Miniatures des pages (rendu hors écran, par empreinte de page)
+        self.thumb_cache = ThumbnailCache()
+        self._thumb_job = None
+        self._thumb_queue = []
+        self._thumb_renderer = None
+
+        # Annuler / rétablir (compétences, images, sections, styles de domaine)
+        self.history = History()
+
+        # Élèves ouverts en onglets (workspace.py): l'élève affiché vit dans les attributs
+        # ci-dessus, les autres dans leur PupilSession
+        self.session = PupilSession(self.available)
+        self.sessions = [self.session]
+        self._pupil_tabs = {}             # onglet -> PupilSession
+        self._switching = False           # champs remplis par un changement d'onglet
 
         # Drag/Resize images (aperçu)
         self.drag_data = {"x": 0, "y": 0, "image_index": None}
         self.resize_data = {"image_index": None, "start_x": 0, "start_y": 0}
 
+        # Rafraîchissements regroupés
+        self.scheduler = RedrawScheduler(self.root, {
+            "pages": self._rebuild_pages,
+            "page": self._draw_preview,
+            "cover": self._draw_cover_preview,
+        })
+
         # UI
         self._build_ui()
+        self._add_pupil_tab(self.session)
+        for var in (self.nom_var, self.naissance_var):
+            var.trace_add("write", lambda *args: self._on_pupil_field())
+        # le prénom figure aussi dans chaque ligne de compétence
+        self.prenom_var.trace_add("write", lambda *args: self._on_pupil_field(repaginate=True))
+        # le genre accorde les intitulés (il/elle, -é/-ée): la coupure des lignes peut changer
+        self.genre_var.trace_add("write", lambda *args: self._on_pupil_field(cover=False, repaginate=True))
         self.update_cover_preview()
-        self.rebuild_pages_and_refresh()
+        # Aucune compétence au lancement: pas de pagination, seulement la page vide
+        self.update_preview()
+        self.export_dirty = False
+        self.root.after(WATCH_INTERVAL_MS, self._watch_files)
 
     # ---- UI ----
 
@@ -178,6 +269,15 @@ class CompetenceApp:
 
         self.main_canvas.bind("<Configure>", _sync_content_width)
 
+        # Onglets des élèves ouverts (onglets vides: seul l'en-tête sert)
+        pupils = ttk.Frame(self.content)
+        pupils.pack(fill="x", padx=8, pady=(6, 0))
+        ttk.Button(pupils, text="Fermer l'élève", command=self.close_pupil).pack(side="right", padx=2)
+        ttk.Button(pupils, text="Nouvel élève", command=self.new_pupil).pack(side="right", padx=2)
+        self.pupils_nb = ttk.Notebook(pupils, height=1)
+        self.pupils_nb.pack(side="left", fill="x", expand=True)
+        self.pupils_nb.bind("<<NotebookTabChanged>>", self._on_pupil_tab_changed)
+
         # Ligne haute: informations personnelles + Sections onglets
         top = ttk.Frame(self.content)
         top.pack(fill="x", padx=8, pady=6)
@@ -202,6 +302,18 @@ class CompetenceApp:
         ttk.Entry(pers, textvariable=self.month_var, width=14).grid(row=1, column=1, sticky="we", padx=4, pady=(6, 0))
         ttk.Label(pers, text="Année (ex: 2023):").grid(row=1, column=2, sticky="w", pady=(6, 0))
         ttk.Entry(pers, textvariable=self.year_var, width=10).grid(row=1, column=3, sticky="we", padx=4, pady=(6, 0))
+        ttk.Label(pers, text="Genre (accords):").grid(row=1, column=4, sticky="w", pady=(6, 0))
+        ttk.Combobox(pers, textvariable=self.genre_var, values=list(GENRES.values()), state="readonly",
+                     width=14).grid(row=1, column=5, sticky="we", padx=4, pady=(6, 0))
+        ttk.Label(pers, text="Période (aperçu, exports):").grid(row=2, column=0, sticky="w", pady=(6, 0))
+        period_box = ttk.Combobox(pers, textvariable=self.period_var, values=[ALL_PERIODS] + list(SECTION_KEYS),
+                                  width=28)
+        period_box.grid(row=2, column=1, columnspan=3, sticky="we", padx=4, pady=(6, 0))
+        period_box.bind("<<ComboboxSelected>>", self._apply_period)
+        period_box.bind("<Return>", self._apply_period)
+        period_box.bind("<FocusOut>", self._apply_period)
+        ttk.Label(pers, text="ex: MS, 2024-2025, depuis Mars 2025, Septembre 2024 - Juin 2025",
+                  foreground="#777").grid(row=2, column=4, columnspan=3, sticky="w", pady=(6, 0))
 
         for col in range(8):
             pers.grid_columnconfigure(col, weight=1)
@@ -212,8 +324,14 @@ class CompetenceApp:
 
         self.sections_nb = ttk.Notebook(sections_block)
         self.sections_nb.pack(fill="x", padx=6, pady=6)
+        # Onglets vides: contenu construit au premier affichage (_on_section_tab_changed)
+        self._section_frames = {}
         for key in SECTION_KEYS:
-            self._build_section_tab(key)
+            frame = ttk.Frame(self.sections_nb)
+            self.sections_nb.add(frame, text=SECTION_LABELS[key])
+            self._section_frames[str(frame)] = key
+        self.sections_nb.bind("<<NotebookTabChanged>>", self._on_section_tab_changed)
+        self._on_section_tab_changed()
 
         # Zone principale: 3 colonnes
         main = ttk.Frame(self.content)
@@ -284,6 +402,10 @@ class CompetenceApp:
         ttk.Button(row1, text="Retirer <-", command=self.remove_selected_from_ppt).pack(side="left", padx=2)
         ttk.Button(row1, text="Aller à la page", command=self.goto_selected_page).pack(side="left", padx=2)
         ttk.Button(row1, text="Exporter PowerPoint", command=self.export_ppt).pack(side="right", padx=2)
+        ttk.Button(row1, text="Exporter PDF", command=self.export_pdf).pack(side="right", padx=2)
+        ttk.Button(row1, text="Exporter HTML", command=self.export_html).pack(side="right", padx=2)
+        # Export compact: une zone de texte par sous-domaine (fichier plus léger)
+        ttk.Checkbutton(row1, text="Compact", variable=self.compact_export_var).pack(side="right", padx=2)
 
         # Rangée 2
         row2 = ttk.Frame(btns_center)
@@ -291,7 +413,11 @@ class CompetenceApp:
         ttk.Button(row2, text="Ajouter image (page)", command=self.add_image_page).pack(side="left", padx=2)
         ttk.Button(row2, text="Police/Couleur (domaine)", command=self.change_font_color).pack(side="left", padx=2)
         ttk.Button(row2, text="Sauvegarder projet", command=self.save_project).pack(side="left", padx=2)
-        ttk.Button(row2, text="Charger projet", command=self.load_project).pack(side="left", padx=2)
+        ttk.Button(row2, text="Charger projet(s)", command=self.load_project).pack(side="left", padx=2)
+        ttk.Button(row2, text="Validation groupée", command=self.bulk_validate_dialog).pack(side="left", padx=2)
+        ttk.Button(row2, text="Importer une liste", command=self.import_roster_dialog).pack(side="left", padx=2)
+        ttk.Button(row2, text="Rétablir", command=self.redo).pack(side="right", padx=2)
+        ttk.Button(row2, text="Annuler", command=self.undo).pack(side="right", padx=2)
 
         # En dessous des 3 colonnes: zone de prévisualisation globale
         bottom = ttk.Frame(self.content)
@@ -301,7 +427,7 @@ class CompetenceApp:
         cover_frame.pack(fill="x")
         self.cover_canvas = tk.Canvas(cover_frame, height=260, bg="white", highlightthickness=1, highlightbackground="#ddd")
         self.cover_canvas.pack(fill="x")
-        self.cover_canvas.bind("<Configure>", lambda e: self.update_cover_preview())
+        self.cover_canvas.bind("<Configure>", lambda e: self.scheduler.invalidate_resize("cover"))
 
         pager = ttk.Frame(bottom)
         pager.pack(fill="x", pady=6)
@@ -312,6 +438,15 @@ class CompetenceApp:
         self.btn_next = ttk.Button(pager, text="Page suivante ▶", command=self.next_page)
         self.btn_next.pack(side="left", padx=4)
 
+        strip = ttk.LabelFrame(bottom, text="Miniatures des pages")
+        strip.pack(fill="x", pady=(0, 6))
+        self.thumb_canvas = tk.Canvas(strip, height=THUMB_HEIGHT + 26, bg="#f4f4f4", highlightthickness=0)
+        thumb_scroll = ttk.Scrollbar(strip, orient="horizontal", command=self.thumb_canvas.xview)
+        self.thumb_canvas.configure(xscrollcommand=thumb_scroll.set)
+        self.thumb_canvas.pack(fill="x", padx=4, pady=(4, 0))
+        thumb_scroll.pack(fill="x", padx=4)
+        self.thumb_canvas.bind("<Button-1>", self._on_thumbnail_click)
+
         self.preview_frame = ttk.LabelFrame(bottom, text="Aperçu des pages (tous domaines)")
         self.preview_frame.pack(fill="both", expand=True)
         self.preview_canvas = tk.Canvas(
@@ -320,24 +455,35 @@ class CompetenceApp:
             bg="white", highlightthickness=1, highlightbackground="#ddd"
         )
         self.preview_canvas.pack(fill="both", expand=True)
-        self.preview_canvas.bind("<Configure>", lambda e: self.update_preview())
+        self.preview_canvas.bind("<Configure>", lambda e: self.scheduler.invalidate_resize("page"))
 
         # drag/resize images sur page courante
         self.preview_canvas.bind("<Button-1>", self.start_drag)
         self.preview_canvas.bind("<B1-Motion>", self.drag_image)
+        self.preview_canvas.bind("<ButtonRelease-1>", self.end_drag)
         self.preview_canvas.bind("<Button-3>", self.start_resize)
         self.preview_canvas.bind("<B3-Motion>", self.resize_image)
+        self.preview_canvas.bind("<ButtonRelease-3>", self.end_resize)
+
+        # Raccourcis annuler / rétablir
+        self.root.bind_all("<Control-z>", lambda e: self.undo())
+        self.root.bind_all("<Control-y>", lambda e: self.redo())
+        self.root.bind_all("<Control-Z>", lambda e: self.redo())   # Ctrl+Maj+Z
 
         # Events
         self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
 
-    def _build_section_tab(self, key):
-        title = SECTION_LABELS[key]
-        frame = ttk.Frame(self.sections_nb)
-        self.sections_nb.add(frame, text=title)
+    def _on_section_tab_changed(self, event=None):
+        key = self._section_frames.get(self.sections_nb.select())
+        if key and key not in self.sections_widgets:
+            self._build_section_tab(key, self.sections_nb.nametowidget(self.sections_nb.select()))
+
+    def _build_section_tab(self, key, frame):
+        # Les widgets reprennent l'état courant (projet chargé avant le premier affichage)
+        data = self.sections_data[key]
 
         # Case à cocher "Section complétée"
-        completed_var = tk.BooleanVar(value=False)
+        completed_var = tk.BooleanVar(value=data["completed"])
         chk = ttk.Checkbutton(
             frame,
             text="Marquer cette section comme complétée",
@@ -350,16 +496,18 @@ class CompetenceApp:
         r = 1
         for fname, flabel in SECTION_FIELDS.items():
             ttk.Label(frame, text=flabel + " :").grid(row=r, column=0, sticky="e", padx=(0, 6), pady=(6, 2))
-            var = tk.StringVar()
+            var = tk.StringVar(value=data["fields"].get(fname, ""))
             ent = ttk.Entry(frame, width=32, textvariable=var)
             ent.grid(row=r, column=1, sticky="we", pady=(6, 2))
 
             def on_change(var=var, k=key, fn=fname):
+                before = copy.deepcopy(self.sections_data[k])
                 self.sections_data[k]["fields"][fn] = var.get().strip()
                 # auto: tous les champs remplis -> completed True
                 all_filled = all(self.sections_data[k]["fields"][f].strip() for f in SECTION_FIELDS.keys())
                 self.sections_widgets[k]["completed_var"].set(all_filled)
                 self.sections_data[k]["completed"] = all_filled
+                self._record_section(k, SECTION_FIELDS[fn], before, merge_key=("field", k, fn))
                 self.update_cover_preview()
 
             var.trace_add("write", lambda *args, cb=on_change: cb())
@@ -368,7 +516,7 @@ class CompetenceApp:
 
         # Boutons et photo de la section
         ttk.Button(frame, text="Importer photo de la section", command=lambda k=key: self._import_section_photo(k)).grid(row=r, column=0, sticky="e", pady=6)
-        photo_label = ttk.Label(frame, text="Aucune photo")
+        photo_label = ttk.Label(frame, text=os.path.basename(data["photo"]) if data["photo"] else "Aucune photo")
         photo_label.grid(row=r, column=1, sticky="w", pady=6)
         r += 1
 
@@ -386,14 +534,15 @@ class CompetenceApp:
         ttk.Button(btns, text="Ajouter bilan",
                    command=lambda k=key: self._add_bilan(k, which=1)).pack(side="left", padx=8)
 
-        bilan2_var = tk.BooleanVar(value=False)
+        bilan2_var = tk.BooleanVar(value=data["bilan2_enabled"])
         chk2 = ttk.Checkbutton(btns, text="2e bilan", variable=bilan2_var,
                                command=lambda k=key: self._toggle_bilan2(k))
         chk2.pack(side="left", padx=8)
 
         bilan2_btn = ttk.Button(btns, text="Ajouter bilan 2",
                                 command=lambda k=key: self._add_bilan(k, which=2))
-        bilan2_btn.state(["disabled"])
+        if not data["bilan2_enabled"]:
+            bilan2_btn.state(["disabled"])
         bilan2_btn.pack(side="left", padx=8)
 
         frame.grid_columnconfigure(1, weight=1)
@@ -414,61 +563,96 @@ class CompetenceApp:
         )
         if not path:
             return
+        if self.available:
+            # Référentiel déjà en place: fusion par diff, les sélections sont gardées
+            try:
+                self.reload_referential(path)
+            except Exception as e:
+                messagebox.showerror("Référentiel", f"Lecture impossible : {e}")
+            return
+        self._watch_referential(path)
 
         self.available.clear()
         self.domain_order.clear()
         self.domain_states.clear()
         self.selected_items.clear()
         self.added_set.clear()
+        self._ts_index = None
         self.domain_page_map.clear()
         self.item_page_index.clear()
         self.flat_pages.clear()
         self.page_images.clear()
         self.current_flat_index = 0
         self.current_domain = None
+        self.history.clear()
 
-        current_domain = None
-        current_subdomain = None
-
-        with open(path, "r", encoding="utf-8-sig") as f:
-            for raw in f:
-                line = raw.strip()
-                if not line:
-                    continue
-                # Nettoyage unicode
-                line = line.replace("\u202f", " ").replace("\u00a0", " ").replace("\u2019", "'")
-
-                if line.startswith("##-Domaine"):
-                    current_domain = line.replace("##-Domaine", "").strip()
-                    if current_domain not in self.available:
-                        self.available[current_domain] = OrderedDict()
-                        self.domain_order.append(current_domain)
-                        color = DOMAIN_COLORS[(len(self.domain_order) - 1) % len(DOMAIN_COLORS)]
-                        self.domain_states[current_domain] = DomainState(current_domain, color)
-                    current_subdomain = None
-
-                elif line.startswith("#-"):
-                    sub = line.replace("#-", "").strip()
-                    if sub.lower().startswith("sous-domaine:"):
-                        sub = sub.split(":", 1)[1].strip()
-                    current_subdomain = sub
-
-                elif line.startswith("XX"):
-                    comp = line.replace("XX", "").strip()
-                    if current_domain is None:
-                        current_domain = "Domaine"
-                        if current_domain not in self.available:
-                            self.available[current_domain] = OrderedDict()
-                            self.domain_order.append(current_domain)
-                            color = DOMAIN_COLORS[(len(self.domain_order) - 1) % len(DOMAIN_COLORS)]
-                            self.domain_states[current_domain] = DomainState(current_domain, color)
-                    sd = current_subdomain if current_subdomain else current_domain
-                    self.available[current_domain].setdefault(sd, [])
-                    self.available[current_domain][sd].append(comp)
+        available, domain_order = parse_competences_file(path)
+        for current_domain in domain_order:
+            self.available[current_domain] = available[current_domain]
+            self.domain_order.append(current_domain)
+            color = self.theme.domain_color(current_domain, domain_color(len(self.domain_order) - 1))
+            self.domain_states[current_domain] = DomainState(current_domain, color)
+        self._share_referential()
 
         self.build_available_tree()
+        self.export_dirty = True
         self.rebuild_pages_and_refresh()
 
+    def reload_referential(self, path):
+        """
+        Recharge COMPETENCES.txt sur place (referential.py): les compétences sélectionnées
+        suivent renommages et déplacements, seuls les domaines touchés sont repaginés.
+        """
+        available, domain_order = parse_competences_file(path)
+        self._watch_referential(path)
+        diff = diff_referentials(self.available, self.domain_order, available, domain_order)
+        if not diff:
+            return diff
+        domains = apply_diff(diff, self, available, domain_order, self.theme)
+        self.added_set = {it.key() for it in self.selected_items}
+        # Élèves des autres onglets: même diff, repaginés à leur affichage
+        for session in self.sessions:
+            if session is not self.session:
+                session.follow_referential(diff, available, domain_order, self.theme)
+        self.build_available_tree()
+        self.refresh_selected_tree()
+        self.export_dirty = True
+        self._repaginate_domains(domains)
+        return diff
+
+    def _watch_referential(self, path):
+        self.referential_path = path
+        try:
+            self._referential_mtime = os.path.getmtime(path)
+        except OSError:
+            self._referential_mtime = None
+
+    def _watch_files(self):
+        # Sondage des dates de modification: un stat par fichier et par seconde
+        self.root.after(WATCH_INTERVAL_MS, self._watch_files)
+        path = self.referential_path
+        if path:
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                mtime = self._referential_mtime   # enregistrement en cours: on réessaie
+            if mtime != self._referential_mtime:
+                try:
+                    self.reload_referential(path)
+                except Exception as e:
+                    self._referential_mtime = mtime
+                    messagebox.showwarning("Référentiel", f"{os.path.basename(path)} illisible : {e}")
+        try:
+            theme = load_theme()
+        except Exception:
+            theme = self.theme      # fichier en cours d'écriture: on réessaie au prochain tour
+        else:
+            self._theme_error = None
+        if theme is not self.theme:
+            # Descriptions / couleurs: bandeaux et miniatures seulement, pas de repagination
+            self.theme = theme
+            self.update_preview()
+
     def build_available_tree(self):
         self.tree.delete(*self.tree.get_children())
         for domain in self.domain_order:
@@ -510,7 +694,10 @@ class CompetenceApp:
         if not month or not year:
             messagebox.showinfo("Champs requis", "Veuillez remplir les champs Mois et Année avant d'ajouter des compétences.")
             return
-        ts = f"{month} {year}"
+        ts = self._timestamp(month, year)
+        if ts is None:
+            messagebox.showinfo("Horodatage", f"Date illisible : « {month} {year} » (ex: Février 2025).")
+            return
 
         sel = self.tree.selection()
         if not sel:
@@ -529,26 +716,68 @@ class CompetenceApp:
             messagebox.showinfo("Info", "Sélectionnez au moins une compétence.")
             return
 
-        # Nouveau lot d'ajout
+        self._add_competences([(domain, sub, comp) for comp in chosen], ts)
+
+    @staticmethod
+    def _timestamp(month, year):
+        # Horodatage validé, sous sa forme « Mois Année » (bandeaux de date et périodes identiques)
+        rank = parse_timestamp(f"{month.strip()} {year.strip()}")
+        return format_timestamp(rank) if rank is not None else None
+
+    def _add_competences(self, keys, ts):
+        """Ajoute (domain, sub, text) en un nouveau lot, sans doublon; retourne le nombre ajouté."""
         self.add_batch_counter += 1
         batch_id = self.add_batch_counter
 
-        added_any = False
-        for comp in chosen:
+        items = []
+        for domain, sub, comp in keys:
             item = CompetenceItem(domain, sub, comp, ts=ts, batch_id=batch_id)
             if item.key() in self.added_set:
                 continue
             self.selected_items.append(item)
             self.added_set.add(item.key())
-            added_any = True
-
-        if not added_any:
-            return
-
+            items.append(item)
+
+        if items:
+            placed = [(len(self.selected_items) - len(items) + i, it) for i, it in enumerate(items)]
+            self.history.record("Ajout de compétences",
+                                lambda: self._remove_items(items), lambda: self._insert_items(placed))
+            self._items_changed()
+        return len(items)
+
+    def _add_competences_in_background(self, session, keys, ts):
+        """Comme _add_competences, pour l'élève d'un onglet en arrière-plan."""
+        items = session.add_competences(keys, ts)
+        if items:
+            placed = [(len(session.selected_items) - len(items) + i, it) for i, it in enumerate(items)]
+            # Annulé depuis son onglet: l'état de cet élève est alors celui de l'application
+            session.history.record("Ajout de compétences",
+                                   lambda: self._remove_items(items), lambda: self._insert_items(placed))
+        return len(items)
+
+    def _items_changed(self):
+        self.export_dirty = True
+        self._ts_index = None
         self.refresh_selected_tree()
         self.rebuild_pages_and_refresh()
         self.on_tree_select(None)
 
+    def _remove_items(self, items):
+        """Retire ces CompetenceItem; retourne [(index, item)] pour les réinsérer."""
+        targets = {id(it) for it in items}
+        placed = [(i, it) for i, it in enumerate(self.selected_items) if id(it) in targets]
+        for i, it in reversed(placed):
+            self.selected_items.pop(i)
+            self.added_set.discard(it.key())
+        self._items_changed()
+        return placed
+
+    def _insert_items(self, placed):
+        for i, it in sorted(placed, key=lambda p: p[0]):
+            self.selected_items.insert(i, it)
+            self.added_set.add(it.key())
+        self._items_changed()
+
     def refresh_selected_tree(self):
         self.selected_tree.delete(*self.selected_tree.get_children())
         for it in self.selected_items:
@@ -568,20 +797,16 @@ class CompetenceApp:
         if not indices:
             return
 
-        for idx in sorted(indices, reverse=True):
-            k = self.selected_items[idx].key()
-            if k in self.added_set:
-                self.added_set.remove(k)
-            self.selected_items.pop(idx)
-
-        self.refresh_selected_tree()
-        self.rebuild_pages_and_refresh()
-        self.on_tree_select(None)
+        items = [self.selected_items[idx] for idx in indices]
+        placed = self._remove_items(items)
+        self.history.record("Retrait de compétences",
+                            lambda: self._insert_items(placed), lambda: self._remove_items(items))
 
     def goto_selected_page(self):
         sel = self.selected_tree.selection()
         if not sel:
             return
+        self.ensure_pages()
         iid = sel[0]
         sd, txt = self.selected_tree.item(iid, "values")
         for it in self.selected_items:
@@ -599,7 +824,12 @@ class CompetenceApp:
 
     # ---- Images (par page) ----
 
+    def _genre(self):
+        # Code du genre ("", "M", "F") d'après le libellé choisi
+        return next((code for code, label in GENRES.items() if label == self.genre_var.get()), "")
+
     def _current_page_key(self):
+        self.ensure_pages()
         if not self.flat_pages:
             return None
         return self.flat_pages[self.current_flat_index]  # (domain, page_index)
@@ -611,6 +841,10 @@ class CompetenceApp:
             messagebox.showinfo("Info", "Aucune page n'est disponible.")
             return
         domain, page_index = key
+        if domain in self._hidden_image_domains:
+            messagebox.showinfo("Info", "Les pages de ce domaine sont filtrées par la période : "
+                                        "choisissez « " + ALL_PERIODS + " » pour placer des images.")
+            return
         paths = filedialog.askopenfilenames(
             title="Sélectionnez une ou plusieurs images",
             filetypes=[("Images", "*.png;*.jpg;*.jpeg;*.bmp")]
@@ -618,23 +852,43 @@ class CompetenceApp:
         if not paths:
             return
         imgs = self.page_images.setdefault((domain, page_index), [])
+        count = len(imgs)
         for p in paths:
             try:
-                pil = Image.open(p)
-                pil.thumbnail((360, 360), Image.LANCZOS)
-                tkimg = ImageTk.PhotoImage(pil)
+                size = fit_size(self.image_cache.source_size(p), PAGE_IMAGE_MAX_SIDE)
                 imgs.append({
                     "path": p,
-                    "pil": pil,
-                    "tk": tkimg,
                     "pos": [60, HEADER_HEIGHT + 30],
-                    "size": list(pil.size)
+                    "size": list(size)
                 })
             except Exception as e:
                 messagebox.showerror("Image", f"Erreur avec {p}: {e}")
+        added = imgs[count:]
+        if added:
+            key = (domain, page_index)
+            self.history.record("Ajout d'images",
+                                lambda: self._remove_page_images(key, added),
+                                lambda: self._append_page_images(key, added))
+        self.export_dirty = True
+        self.update_preview()
+
+    def _remove_page_images(self, key, images):
+        targets = {id(im) for im in images}
+        remaining = [im for im in self.page_images.get(key, []) if id(im) not in targets]
+        if remaining:
+            self.page_images[key] = remaining
+        else:
+            self.page_images.pop(key, None)
+        self.export_dirty = True
+        self.update_preview()
+
+    def _append_page_images(self, key, images):
+        self.page_images.setdefault(key, []).extend(images)
+        self.export_dirty = True
         self.update_preview()
 
     def change_font_color(self):
+        self.ensure_pages()
         if not self.flat_pages:
             return
         domain, _ = self.flat_pages[self.current_flat_index]
@@ -644,18 +898,31 @@ class CompetenceApp:
         size = simpledialog.askinteger("Taille police corps", "Taille de la police (ex: 12):",
                                        initialvalue=ds.font_body[1])
         color = colorchooser.askcolor(title="Couleur du domaine (bandeau/titres)")[1]
+        before = (ds.font_body, ds.color)
         if size:
             ds.font_body = (ds.font_body[0], size)
         if color:
             ds.color = color
-        self.update_preview()
+        after = (ds.font_body, ds.color)
+        if after != before:
+            self.export_dirty = True
+            self.history.record("Style du domaine",
+                                lambda: self._set_domain_style(ds, *before), lambda: self._set_domain_style(ds, *after))
+        # la taille de police change la hauteur des lignes: repaginer
+        self.rebuild_pages_and_refresh()
+
+    def _set_domain_style(self, ds, font_body, color):
+        ds.font_body = font_body
+        ds.color = color
+        self.export_dirty = True
+        self.rebuild_pages_and_refresh()
 
     # Drag & drop / resize (aperçu)
     def _hit_test_image(self, event):
         key = self._current_page_key()
         if not key:
             return None, None
-        imgs = self.page_images.get(key, [])
+        imgs = self._page_images(key)
         for i, img in enumerate(reversed(imgs)):
             # sélectionner l'image au-dessus si superposition
             real_index = len(imgs) - 1 - i
@@ -669,7 +936,8 @@ class CompetenceApp:
         imgs, idx = self._hit_test_image(event)
         if idx is None:
             return
-        self.drag_data = {"image_index": idx, "x": event.x, "y": event.y}
+        self.drag_data = {"image_index": idx, "x": event.x, "y": event.y,
+                          "image": imgs[idx], "start": list(imgs[idx]["pos"])}
 
     def drag_image(self, event):
         key = self._current_page_key()
@@ -678,7 +946,7 @@ class CompetenceApp:
         idx = self.drag_data.get("image_index")
         if idx is None:
             return
-        imgs = self.page_images.get(key, [])
+        imgs = self._page_images(key)
         if idx >= len(imgs):
             return
         img = imgs[idx]
@@ -688,13 +956,35 @@ class CompetenceApp:
         img["pos"][1] += dy
         self.drag_data["x"] = event.x
         self.drag_data["y"] = event.y
+        self.export_dirty = True
+        self.update_preview()
+
+    def end_drag(self, event):
+        # Un glisser complet = un seul pas d'historique
+        img = self.drag_data.get("image")
+        start = self.drag_data.get("start")
+        self.drag_data = {"x": 0, "y": 0, "image_index": None}
+        if img is None or img["pos"] == start:
+            return
+        end = list(img["pos"])
+        self.history.record("Déplacement d'image",
+                            lambda: self._set_image_geometry(img, pos=start),
+                            lambda: self._set_image_geometry(img, pos=end))
+
+    def _set_image_geometry(self, img, pos=None, size=None):
+        if pos is not None:
+            img["pos"] = list(pos)
+        if size is not None:
+            img["size"] = [int(size[0]), int(size[1])]
+        self.export_dirty = True
         self.update_preview()
 
     def start_resize(self, event):
         imgs, idx = self._hit_test_image(event)
         if idx is None:
             return
-        self.resize_data = {"image_index": idx, "start_x": event.x, "start_y": event.y}
+        self.resize_data = {"image_index": idx, "start_x": event.x, "start_y": event.y,
+                            "image": imgs[idx], "start_size": list(imgs[idx]["size"])}
 
     def resize_image(self, event):
         key = self._current_page_key()
@@ -703,7 +993,7 @@ class CompetenceApp:
         idx = self.resize_data.get("image_index")
         if idx is None:
             return
-        imgs = self.page_images.get(key, [])
+        imgs = self._page_images(key)
         if idx >= len(imgs):
             return
         img = imgs[idx]
@@ -711,33 +1001,75 @@ class CompetenceApp:
         dy = event.y - self.resize_data["start_y"]
         new_w = max(30, img["size"][0] + dx)
         new_h = max(30, img["size"][1] + dy)
-        try:
-            pil = Image.open(img["path"]).resize((int(new_w), int(new_h)), Image.LANCZOS)
-            img["pil"] = pil
-            img["tk"] = ImageTk.PhotoImage(pil)
-            img["size"] = [int(new_w), int(new_h)]
-            self.resize_data["start_x"] = event.x
-            self.resize_data["start_y"] = event.y
-            self.update_preview()
-        except Exception as e:
-            messagebox.showerror("Redimensionner", str(e))
+        # Redimensionnée depuis l'image source en cache: pas de relecture du fichier
+        img["size"] = [int(new_w), int(new_h)]
+        self.resize_data["start_x"] = event.x
+        self.resize_data["start_y"] = event.y
+        self.export_dirty = True
+        self.update_preview()
+
+    def end_resize(self, event):
+        img = self.resize_data.get("image")
+        start = self.resize_data.get("start_size")
+        self.resize_data = {"image_index": None, "start_x": 0, "start_y": 0}
+        if img is None or img["size"] == start:
+            return
+        end = list(img["size"])
+        self.history.record("Redimensionnement d'image",
+                            lambda: self._set_image_geometry(img, size=start),
+                            lambda: self._set_image_geometry(img, size=end))
 
     # ---- Sections - logique ----
 
+    def _record_section(self, key, label, before, merge_key=None):
+        """Pas d'historique pour une section: instantanés de cette seule section."""
+        after = copy.deepcopy(self.sections_data[key])
+        if after == before:
+            return
+        self.export_dirty = True
+        self.history.record(label,
+                            lambda: self._restore_section(key, before),
+                            lambda: self._restore_section(key, after), merge_key)
+
+    def _restore_section(self, key, snapshot):
+        data = self.sections_data[key]
+        widgets = self.sections_widgets.get(key)
+        if widgets:
+            # les traces des champs n'enregistrent rien pendant la restauration
+            for fname, (ent, var) in widgets["entries"].items():
+                var.set(snapshot["fields"].get(fname, ""))
+        # même dict (partagé avec to_project), contenu remplacé
+        data.clear()
+        data.update(copy.deepcopy(snapshot))
+        self.export_dirty = True
+        if widgets:
+            widgets["completed_var"].set(data["completed"])
+            widgets["photo_label"].configure(text=os.path.basename(data["photo"]) if data["photo"] else "Aucune photo")
+            widgets["bilan2_var"].set(data["bilan2_enabled"])
+            widgets["bilan2_btn"].state(["!disabled"] if data["bilan2_enabled"] else ["disabled"])
+        self.update_cover_preview()
+
     def _toggle_section_completed(self, key):
+        before = copy.deepcopy(self.sections_data[key])
         val = self.sections_widgets[key]["completed_var"].get()
         self.sections_data[key]["completed"] = bool(val)
+        self._record_section(key, "Section complétée", before)
         self.update_cover_preview()
 
     def _set_section_completed(self, key, value):
+        before = copy.deepcopy(self.sections_data[key])
         self.sections_widgets[key]["completed_var"].set(bool(value))
         self.sections_data[key]["completed"] = bool(value)
+        self._record_section(key, "Section complétée", before)
         self.update_cover_preview()
 
     def _clear_section(self, key):
-        for fname in SECTION_FIELDS.keys():
-            ent, var = self.sections_widgets[key]["entries"][fname]
-            var.set("")
+        before = copy.deepcopy(self.sections_data[key])
+        # un seul pas pour tout l'effacement (pas un par champ)
+        with self.history.paused():
+            for fname in SECTION_FIELDS.keys():
+                ent, var = self.sections_widgets[key]["entries"][fname]
+                var.set("")
         # reset photo
         self.sections_data[key]["photo"] = None
         self.sections_widgets[key]["photo_label"].configure(text="Aucune photo")
@@ -750,6 +1082,7 @@ class CompetenceApp:
 
         # recalcul auto completed
         self._recalc_section_completed(key)
+        self._record_section(key, "Effacer le contenu", before)
         self.update_cover_preview()
 
     def _recalc_section_completed(self, key):
@@ -758,22 +1091,26 @@ class CompetenceApp:
         self.sections_data[key]["completed"] = all_filled
 
     def _toggle_bilan2(self, key):
+        before = copy.deepcopy(self.sections_data[key])
         enabled = bool(self.sections_widgets[key]["bilan2_var"].get())
         self.sections_data[key]["bilan2_enabled"] = enabled
         if enabled:
             self.sections_widgets[key]["bilan2_btn"].state(["!disabled"])
         else:
             self.sections_widgets[key]["bilan2_btn"].state(["disabled"])
+        self._record_section(key, "2e bilan", before)
 
     def _add_bilan(self, key, which=1):
         initial = self.sections_data[key]["bilan1" if which == 1 else "bilan2"]
         title = f"Saisir le {'1er' if which == 1 else '2e'} bilan - {SECTION_LABELS[key]}"
         text = self._prompt_multiline(title, initial)
         if text is not None:
+            before = copy.deepcopy(self.sections_data[key])
             if which == 1:
                 self.sections_data[key]["bilan1"] = text.strip()
             else:
                 self.sections_data[key]["bilan2"] = text.strip()
+            self._record_section(key, "Bilan", before)
 
     # ---- Couverture (aperçu mini) ----
 
@@ -784,6 +1121,7 @@ class CompetenceApp:
         )
         if p:
             self.photo_path = p
+            self.export_dirty = True
             self.update_cover_preview()
 
     def _import_section_photo(self, key):
@@ -792,14 +1130,19 @@ class CompetenceApp:
             filetypes=[("Images", "*.png;*.jpg;*.jpeg;*.bmp")]
         )
         if p:
+            before = copy.deepcopy(self.sections_data[key])
             self.sections_data[key]["photo"] = p
             self.sections_widgets[key]["photo_label"].configure(text=os.path.basename(p))
+            self._record_section(key, "Photo de la section", before)
             self.update_cover_preview()
 
     def _mark_personal_completed(self):
-        self.personal_completed = bool(
+        completed = bool(
             self.nom_var.get().strip() and self.prenom_var.get().strip() and self.naissance_var.get().strip()
         )
+        if completed != self.personal_completed:
+            self.personal_completed = completed
+            self.export_dirty = True
         self.update_cover_preview()
 
     def _cover_canvas_size(self):
@@ -813,24 +1156,28 @@ class CompetenceApp:
         return cw, ch
 
     def update_cover_preview(self):
+        self.scheduler.invalidate("cover")
+
+    def _draw_cover_preview(self):
         c = self.cover_canvas
         c.delete("all")
         cw, ch = self._cover_canvas_size()
 
         # Tente d'afficher la bannière top si disponible
+        # Images Tk gardées par image_cache tant qu'elles sont à l'écran
+        self._cover_image_keys = []
         top_img_path = self._find_image_variant(os.path.join("img", "banniere-top.png"))
         if top_img_path and os.path.exists(top_img_path):
             try:
-                pil = Image.open(top_img_path)
-                ratio = pil.width / pil.height if pil.height else 1.0
+                width, height = self.image_cache.source_size(top_img_path)
+                ratio = width / height if height else 1.0
                 new_w = cw
                 new_h = int(new_w / ratio)
                 if new_h > min(160, int(ch * 0.5)):
                     new_h = min(160, int(ch * 0.5))
                     new_w = int(new_h * ratio)
-                pil = pil.resize((new_w, new_h), Image.LANCZOS)
-                tkimg = ImageTk.PhotoImage(pil)
-                c.top_banner_image = tkimg
+                tkimg = self.image_cache.photo(top_img_path, (new_w, new_h))
+                self._cover_image_keys.append((top_img_path, (new_w, new_h)))
                 c.create_image(0, 0, anchor="nw", image=tkimg)
                 banner_h = new_h
             except Exception:
@@ -867,113 +1214,49 @@ class CompetenceApp:
         if self.photo_path and os.path.exists(self.photo_path):
             try:
                 max_side = min(160, int(ch * 0.55))
-                pil = Image.open(self.photo_path)
-                pil.thumbnail((max_side, max_side), Image.LANCZOS)
-                tkimg = ImageTk.PhotoImage(pil)
-                c.image = tkimg  # éviter le GC
+                # Dérivé d'aperçu des photos importées en lot; sinon décodage JPEG réduit
+                path = preview_path(self.photo_path)
+                size = fit_size(self.image_cache.source_size(path), max_side)
+                tkimg = self.image_cache.photo(path, size)
+                self._cover_image_keys.append((path, size))
                 c.create_image(cw - max_side - 20, banner_h + 8, anchor="nw", image=tkimg)
             except Exception:
                 pass
+        self._retain_images()
 
     # ---- Pagination & Aperçu ----
 
     def rebuild_pages_and_refresh(self):
+        # Pagination et page courante refaites au prochain passage inactif
+        self._page_domains = None
+        self.scheduler.invalidate("pages")
+
+    def _repaginate_domains(self, domains):
+        # Comme rebuild_pages_and_refresh, limité à `domains` (sauf repagination complète en attente)
+        if "pages" not in self.scheduler.dirty:
+            self._page_domains = set(domains)
+        elif self._page_domains is not None:
+            self._page_domains |= set(domains)
+        self.scheduler.invalidate("pages")
+
+    def ensure_pages(self):
+        # Pagination à jour immédiatement (lecture de flat_pages, export)
+        self.scheduler.flush("pages")
+
+    def _rebuild_pages(self):
         """
         Regroupe par domaine/sous-domaine et découpe en pages en simulant la hauteur réelle
         (entêtes, texte wrap, espacements, bandeaux de date).
         """
-        self.domain_page_map.clear()
-        self.item_page_index.clear()
-
-        # ordre des domaines fixe
-        by_domain = OrderedDict((d, OrderedDict()) for d in self.domain_order)
-        for it in self.selected_items:
-            d = it.domain
-            sd = it.subdomain or d
-            by_domain.setdefault(d, OrderedDict())
-            by_domain[d].setdefault(sd, [])
-            by_domain[d][sd].append(it)
-
-        # Dimensions d'aperçu pour simuler les hauteurs
-        cw, ch = self._preview_canvas_size()
-        preview_y_start = HEADER_HEIGHT + 14
-        preview_y_bottom_margin = 20
-        content_preview_height_px = max(1, ch - preview_y_start - preview_y_bottom_margin)
-
-        for d in self.domain_order:
-            ds = self.domain_states.get(d)
-            if not ds:
-                ds = DomainState(d, DOMAIN_COLORS[(len(self.domain_states)) % len(DOMAIN_COLORS)])
-                self.domain_states[d] = ds
-
-            body_font_size = ds.font_body[1]
-            max_text_width_px = cw - 2 * TEXT_MARGIN_X - 10
-            pages = []
-            current_page = []
-            y_px = preview_y_start
-            last_ts_on_slide = None
-            submap = by_domain.get(d, {})
-            current_sd = None
-
-            def start_new_page(carry_sd=None):
-                nonlocal current_page, y_px, last_ts_on_slide
-                if current_page:
-                    pages.append(current_page)
-                current_page = []
-                y_px = preview_y_start
-                last_ts_on_slide = None
-                if carry_sd:
-                    current_page.append((True, carry_sd, None))
-                    # Hauteur entête sous-domaine approx 22 px
-                    y_px += 22
-
-            for sd, items in submap.items():
-                # Entête de sous-domaine
-                header_h = 22
-                if (y_px + header_h > (preview_y_start + content_preview_height_px)) and current_page:
-                    start_new_page(carry_sd=None)
-                current_page.append((True, sd, None))
-                y_px += header_h
-                current_sd = sd
-
-                # Items
-                for it in items:
-                    ts = (it.ts or "").strip()
-                    prenom = (self.prenom_var.get() or "").strip()
-                    full_text = f"• {prenom} {it.text}".strip()
-                    wrapped_lines = self.wrap_text(full_text, max_text_width_px, ("Arial", body_font_size))
-                    lines_h_px = len(wrapped_lines) * (body_font_size + LINE_SPACING)
-                    banner_h_px = 20 if (ts and ts != last_ts_on_slide) else 0
-                    needed = banner_h_px + lines_h_px + SUBHEADER_SPACING
-
-                    if (y_px + needed > (preview_y_start + content_preview_height_px)) and current_page:
-                        # nouvelle page, répéter le header du sous-domaine
-                        start_new_page(carry_sd=current_sd)
-
-                    # Ajouter l'item
-                    current_page.append((False, sd, it))
-                    y_px += needed
-                    last_ts_on_slide = ts
-
-            if current_page:
-                pages.append(current_page)
-
-            self.domain_page_map[d] = pages
-
-            # indexer items -> page
-            for pi, page in enumerate(pages):
-                for is_header, sd, payload in page:
-                    if not is_header and payload is not None:
-                        self.item_page_index[payload.key()] = (d, pi)
-
-        # Construire la liste plate de navigation (tous domaines)
-        self.flat_pages = []
-        for d in self.domain_order:
-            pages = self.domain_page_map.get(d, [])
-            if not pages:
-                continue
-            for pi in range(len(pages)):
-                self.flat_pages.append((d, pi))
+        domains, self._page_domains = self._page_domains, None
+        items = self._visible_items()
+        self._hidden_image_domains = (partial_domains(self.selected_items, items)
+                                      if items is not self.selected_items else set())
+        self.domain_page_map, self.item_page_index, self.flat_pages = paginate(
+            items, self.domain_order, self.domain_states,
+            self.prenom_var.get(), self.wrap_text, self._preview_canvas_size(), self._genre(),
+            previous=self.domain_page_map if domains is not None else None, domains=domains,
+        )
 
         # Ajuster current_flat_index
         if not self.flat_pages:
@@ -984,9 +1267,8 @@ class CompetenceApp:
                 self.current_flat_index = len(self.flat_pages) - 1
             self.current_domain = self.flat_pages[self.current_flat_index][0]
 
-        self.update_preview()
-
     def prev_page(self):
+        self.ensure_pages()
         if not self.flat_pages:
             return
         if self.current_flat_index > 0:
@@ -995,6 +1277,7 @@ class CompetenceApp:
             self.update_preview()
 
     def next_page(self):
+        self.ensure_pages()
         if not self.flat_pages:
             return
         if self.current_flat_index < len(self.flat_pages) - 1:
@@ -1012,8 +1295,10 @@ class CompetenceApp:
         return cw, ch
 
     def update_preview(self):
-        # Met à jour la mini-couverture + la page domaine courante
-        self.update_cover_preview()
+        self.scheduler.invalidate("page")
+
+    def _draw_preview(self):
+        # Dessine la page domaine courante
         c = self.preview_canvas
         c.delete("all")
 
@@ -1023,6 +1308,7 @@ class CompetenceApp:
             self.page_var.set("Page 0/0 — Aucune page (ajoutez des compétences)")
             c.create_text(cw//2, ch//2, text="Aucune page à afficher",
                           font=("Arial", 14, "italic"), fill="#666")
+            self._schedule_thumbnails()
             return
 
         d, pi = self.flat_pages[self.current_flat_index]
@@ -1045,25 +1331,106 @@ class CompetenceApp:
         page = pages[pi] if 0 <= pi < len(pages) else []
         for is_header, sub, payload in page:
             if is_header:
-                c.create_text(x, y, anchor="nw", text=sub, fill=ds.color,
+                c.create_text(x, y, anchor="nw", text=sub, fill=self.theme.subdomain_color(d, sub, ds.color),
                               font=("Arial", 13, "bold", "underline"))
-                y += 22
+                y += SUBHEADER_HEIGHT
             else:
-                wrapped = self.wrap_text(payload.text, max_text_width, body_font)
+                # Lignes de l'export: « • Prénom » + intitulé accordé
+                wrapped = wrap_competence(self.prenom_var.get(), payload.text, self.wrap_text,
+                                          max_text_width, body_font, self._genre())
                 for li, line in enumerate(wrapped):
                     c.create_text(x + 16, y, anchor="nw",
-                                  text=("• " + line if li == 0 else "  " + line),
+                                  text=(line if li == 0 else "  " + line),
                                   fill="black", font=body_font)
                     y += (ds.font_body[1] + LINE_SPACING)
                 y += SUBHEADER_SPACING
 
         # Images de la page courante
         key = (d, pi)
-        for img in self.page_images.get(key, []):
-            c.create_image(img["pos"][0], img["pos"][1], image=img["tk"], anchor="nw")
+        for img in self._page_images(key):
+            try:
+                tkimg = self.image_cache.photo(img["path"], img["size"])
+            except Exception:
+                continue    # fichier déplacé ou illisible: rien à afficher
+            c.create_image(img["pos"][0], img["pos"][1], image=tkimg, anchor="nw")
+
+        self._retain_images()
+        self._schedule_thumbnails()
+
+    # ---- Période (aperçu et exports limités à une période ou une section) ----
+
+    def _period(self):
+        # Période choisie pour l'élève affiché (None: tout, ou section sans année scolaire)
+        try:
+            return parse_period(self.period_var.get(), self.sections_data)
+        except ValueError:
+            return None
+
+    def _apply_period(self, event=None):
+        try:
+            parse_period(self.period_var.get(), self.sections_data)
+        except ValueError as e:
+            messagebox.showwarning("Période", str(e))
+            return
+        self.rebuild_pages_and_refresh()
+
+    def _timestamp_index(self):
+        if self._ts_index is None:
+            self._ts_index = TimestampIndex(self.selected_items)
+        return self._ts_index
+
+    def _visible_items(self):
+        """Compétences de la période choisie (recherche dans l'index trié des horodatages)."""
+        period = self._period()
+        if period is None:
+            return self.selected_items
+        return self._timestamp_index().select(self.selected_items, period)
+
+    def _page_images(self, key):
+        # Images d'une page; masquées si la période change les pages de leur domaine
+        if key[0] in self._hidden_image_domains:
+            return []
+        return self.page_images.get(key, [])
+
+    def _export_project(self):
+        """Projet exporté: l'élève affiché, limité à la période choisie (ValueError si illisible)."""
+        period = parse_period(self.period_var.get(), self.sections_data)
+        if period is None:
+            return self.to_project()
+        return filter_project(self.to_project(), period, self._timestamp_index())
+
+    # ---- Mémoire des images (page courante, voisines, couverture) ----
+
+    def _image_keys(self, page_key):
+        return [(img["path"], img["size"]) for img in self._page_images(page_key)]
+
+    def _retain_images(self):
+        # Images Tk: page courante et couverture seulement
+        keys = list(self._cover_image_keys)
+        if self.flat_pages:
+            keys += self._image_keys(self.flat_pages[self.current_flat_index])
+        self.image_cache.retain(keys)
+
+    def _font(self, family, size):
+        f = self._fonts.get((family, size))
+        if f is None:
+            f = tkfont.Font(family=family, size=size)
+            self._fonts[(family, size)] = f
+        return f
 
     def wrap_text(self, text, max_width_px, font_tuple):
-        f = tkfont.Font(family=font_tuple[0], size=font_tuple[1])
+        # Résultats mémorisés: la pagination, l'aperçu et l'export re-mesurent les mêmes lignes
+        key = (text, max_width_px, font_tuple[0], font_tuple[1])
+        lines = self._wrap_cache.get(key)
+        if lines is None:
+            if len(self._wrap_cache) >= WRAP_CACHE_MAX:
+                self._wrap_cache.clear()
+            lines = self._wrap_text_uncached(text, max_width_px, font_tuple)
+            self._wrap_cache[key] = lines
+        return lines
+
+    def _wrap_text_uncached(self, text, max_width_px, font_tuple):
+        f = self._font(font_tuple[0], font_tuple[1])
         words = text.split()
         lines = []
         cur = ""
@@ -1079,6 +1446,244 @@ class CompetenceApp:
             lines.append(cur)
         return lines
 
+    # ---- Miniatures (bande de navigation) ----
+
+    def _page_fingerprint(self, key):
+        d, pi = key
+        pages = self.domain_page_map.get(d, [])
+        page = pages[pi] if 0 <= pi < len(pages) else []
+        return page_fingerprint(d, page, self.domain_states[d], self.prenom_var.get(),
+                                self._page_images(key), self._preview_canvas_size(),
+                                self.theme.description(d), self._genre())
+
+    def _schedule_thumbnails(self):
+        # Regroupe les demandes rapprochées (navigation, glisser d'image) en une seule mise à jour
+        if self._thumb_job is not None:
+            self.root.after_cancel(self._thumb_job)
+        self._thumb_job = self.root.after(THUMB_DELAY_MS, self._update_thumbnail_strip)
+
+    def _thumbnail_order(self):
+        # Page courante et voisines d'abord (préchargement), puis le reste
+        n = len(self.flat_pages)
+        cur = self.current_flat_index
+        order = [cur, cur + 1, cur - 1, cur + 2, cur - 2]
+        order += [i for i in range(n) if i not in order]
+        return [i for i in order if 0 <= i < n]
+
+    def _update_thumbnail_strip(self):
+        self._thumb_job = None
+        self.ensure_pages()
+        c = self.thumb_canvas
+        c.delete("all")
+        self.thumb_cache.retain(self.flat_pages)
+        self._thumb_renderer = None
+        self._thumb_queue = []
+
+        step = THUMB_WIDTH + THUMB_GAP
+        for i, key in enumerate(self.flat_pages):
+            x = THUMB_GAP + i * step
+            fp = self._page_fingerprint(key)
+            tkimg = self.thumb_cache.get(key, fp)
+            if tkimg is not None:
+                c.create_image(x, 4, anchor="nw", image=tkimg, tags=(f"thumb{i}",))
+            else:
+                c.create_rectangle(x, 4, x + THUMB_WIDTH, 4 + THUMB_HEIGHT, fill="white",
+                                   outline="#ccc", tags=(f"thumb{i}",))
+            c.create_text(x + THUMB_WIDTH // 2, THUMB_HEIGHT + 14, text=str(i + 1),
+                          font=("Arial", 9), fill="#444")
+        if self.flat_pages:
+            x = THUMB_GAP + self.current_flat_index * step
+            c.create_rectangle(x - 3, 1, x + THUMB_WIDTH + 3, THUMB_HEIGHT + 7, outline="#d35400", width=2)
+        total_w = THUMB_GAP + len(self.flat_pages) * step
+        c.configure(scrollregion=(0, 0, total_w, THUMB_HEIGHT + 26))
+        self._scroll_thumbnail_into_view(total_w)
+
+        for i in self._thumbnail_order():
+            key = self.flat_pages[i]
+            fp = self._page_fingerprint(key)
+            if self.thumb_cache.get(key, fp) is None:
+                self._thumb_queue.append((i, key, fp))
+        if self._thumb_queue:
+            self.root.after_idle(self._render_next_thumbnail)
+        self._prefetch_neighbours()
+
+    def _scroll_thumbnail_into_view(self, total_w):
+        if not self.flat_pages or total_w <= 0:
+            return
+        view_w = max(1, self.thumb_canvas.winfo_width())
+        x = THUMB_GAP + self.current_flat_index * (THUMB_WIDTH + THUMB_GAP)
+        left, right = self.thumb_canvas.xview()
+        if not (left * total_w <= x and x + THUMB_WIDTH <= right * total_w):
+            self.thumb_canvas.xview_moveto(max(0.0, (x - (view_w - THUMB_WIDTH) / 2) / total_w))
+
+    def _render_next_thumbnail(self):
+        # Une miniature par passage inactif: l'interface reste réactive pendant le rendu
+        while self._thumb_queue:
+            i, key, fp = self._thumb_queue.pop(0)
+            if i >= len(self.flat_pages) or self.flat_pages[i] != key:
+                continue
+            if self._thumb_renderer is None:
+                self._thumb_renderer = BookletRenderer(
+                    self.to_project(), dpi=THUMB_RENDER_DPI, measurer=self,
+                    canvas_size=self._preview_canvas_size(),
+                    theme=self.theme,
+                )
+            d, pi = key
+            try:
+                pil = self._thumb_renderer.render_preview_page(d, pi, self.domain_page_map[d][pi])
+                tkimg = photo_image(make_thumbnail(pil, THUMB_WIDTH))
+            except Exception:
+                continue
+            self.thumb_cache.put(key, fp, tkimg)
+            tag = f"thumb{i}"
+            x = THUMB_GAP + i * (THUMB_WIDTH + THUMB_GAP)
+            self.thumb_canvas.delete(tag)
+            self.thumb_canvas.create_image(x, 4, anchor="nw", image=tkimg, tags=(tag,))
+            self.thumb_canvas.tag_lower(tag)
+            break
+        if self._thumb_queue:
+            self.root.after(1, self._render_next_thumbnail)
+
+    def _prefetch_neighbours(self):
+        # Prépare la mesure du texte et les pixels des images des pages voisines:
+        # la navigation ne re-mesure et ne relit plus rien
+        cw, _ = self._preview_canvas_size()
+        max_text_width = cw - 2 * TEXT_MARGIN_X - 10
+        for i in (self.current_flat_index - 1, self.current_flat_index + 1):
+            if not (0 <= i < len(self.flat_pages)):
+                continue
+            d, pi = self.flat_pages[i]
+            self.image_cache.prefetch(self._image_keys((d, pi)))
+            body_font = ("Arial", self.domain_states[d].font_body[1])
+            prenom, genre = self.prenom_var.get(), self._genre()
+            for is_header, _sd, payload in self.domain_page_map[d][pi]:
+                if not is_header and payload is not None:
+                    wrap_competence(prenom, payload.text, self.wrap_text, max_text_width, body_font, genre)
+
+    def _on_thumbnail_click(self, event):
+        self.ensure_pages()
+        x = self.thumb_canvas.canvasx(event.x)
+        i = int((x - THUMB_GAP) // (THUMB_WIDTH + THUMB_GAP))
+        if 0 <= i < len(self.flat_pages) and i != self.current_flat_index:
+            self.current_flat_index = i
+            self.current_domain = self.flat_pages[i][0]
+            self.update_preview()
+
+    # ---- Annuler / rétablir ----
+
+    def undo(self):
+        if self.history.undo() is not None:
+            self._after_history()
+
+    def redo(self):
+        if self.history.redo() is not None:
+            self._after_history()
+
+    def _after_history(self):
+        # les images et compétences restaurées peuvent changer de page
+        self._page_domains = None
+        self.scheduler.invalidate("pages", "page", "cover")
+
+    # ---- Élèves ouverts (onglets) ----
+
+    def _add_pupil_tab(self, session):
+        frame = ttk.Frame(self.pupils_nb, height=1)
+        self.pupils_nb.add(frame, text=session.label)
+        session.tab = str(frame)
+        self._pupil_tabs[session.tab] = session
+
+    def _update_pupil_tab(self):
+        self.pupils_nb.tab(self.session.tab, text=pupil_label(self.nom_var.get(), self.prenom_var.get()))
+
+    def _on_pupil_field(self, cover=True, repaginate=False):
+        # Champs de la couverture; rien à refaire quand un changement d'onglet les remplit
+        if self._switching:
+            return
+        self.export_dirty = True
+        if cover:
+            self.update_cover_preview()
+            self._update_pupil_tab()
+        if repaginate:
+            self.rebuild_pages_and_refresh()
+
+    def _on_pupil_tab_changed(self, event=None):
+        session = self._pupil_tabs.get(self.pupils_nb.select())
+        if session is not None and session is not self.session:
+            self.switch_pupil(session)
+
+    def _referential_order(self):
+        # Ordre des domaines du référentiel partagé (sans les domaines propres à un élève)
+        return [d for d in self.domain_order if d in self.available]
+
+    def _share_referential(self):
+        # Premier référentiel chargé: les autres onglets, forcément vides, le reprennent
+        for session in self.sessions:
+            if session is not self.session:
+                session.reset_domains(self._referential_order(), self.theme)
+
+    def _is_blank_pupil(self):
+        return (not self.selected_items and self.project_path is None
+                and not self.nom_var.get().strip() and not self.prenom_var.get().strip())
+
+    def new_pupil(self):
+        """Ouvre un élève vide dans un nouvel onglet (même référentiel, thème et caches)."""
+        session = PupilSession(self.available, self._referential_order(), self.theme)
+        self.sessions.append(session)
+        self._add_pupil_tab(session)
+        self.switch_pupil(session)
+
+    def switch_pupil(self, session):
+        """
+        Affiche l'élève de `session`: son état remplace celui de l'élève courant, gardé dans
+        sa PupilSession. Les pages déjà calculées sont reprises telles quelles.
+        """
+        self.session.store(self)
+        self.scheduler.dirty.discard("pages")
+        self.session = session
+        session.restore(self)
+        self._switching = True
+        try:
+            with self.history.paused():
+                for name, value in session.values.items():
+                    getattr(self, name).set(value)
+                for key in list(self.sections_widgets):
+                    self._restore_section(key, copy.deepcopy(self.sections_data[key]))
+        finally:
+            self._switching = False
+        self.export_dirty = session.export_dirty
+        if self.pupils_nb.select() != session.tab:
+            self.pupils_nb.select(session.tab)
+
+        self._ts_index = None
+        self.refresh_selected_tree()
+        self.on_tree_select(None)
+        self._thumb_queue = []
+        # Période commune aux onglets: pages et images masquées refaites pour cet élève
+        filtered = self.period_var.get().strip() not in ("", ALL_PERIODS)
+        if filtered or session.pages_pending or session.preview_size != self._preview_canvas_size():
+            if filtered or session.preview_size != self._preview_canvas_size():
+                self._page_domains = None
+            self.scheduler.invalidate("pages")
+        self.scheduler.invalidate("page", "cover")
+        self._retain_images()
+        self._schedule_thumbnails()
+
+    def close_pupil(self):
+        """Ferme l'onglet de l'élève affiché (son état est libéré)."""
+        if not self._is_blank_pupil() and not messagebox.askyesno(
+                "Fermer l'élève", f"Fermer {pupil_label(self.nom_var.get(), self.prenom_var.get())} ?\n"
+                                  "Les modifications non sauvegardées seront perdues."):
+            return
+        closing = self.session
+        index = self.sessions.index(closing)
+        if len(self.sessions) == 1:
+            self.new_pupil()
+        else:
+            self.switch_pupil(self.sessions[index + 1 if index + 1 < len(self.sessions) else index - 1])
+        self.sessions.remove(closing)
+        del self._pupil_tabs[closing.tab]
+        self.pupils_nb.forget(closing.tab)
+
     # ---- Sauvegarde / Chargement ----
 
     def save_project(self):
@@ -1087,132 +1692,107 @@ class CompetenceApp:
                                             filetypes=[("JSON", "*.json")])
         if not path:
             return
-        data = {
-            "available": self.available,
-            "domain_order": self.domain_order,
-            "selected": [
-                (it.domain, it.subdomain, it.text, it.ts, it.batch_id) for it in self.selected_items
-            ],
-            "domains": {
-                d: {
-                    "color": self.domain_states[d].color,
-                    "font_body": self.domain_states[d].font_body,
-                } for d in self.domain_order
-            },
-            "page_images": [
-                {
-                    "domain": d,
-                    "page_index": pi,
-                    "images": [
-                        {"path": im["path"], "pos": im["pos"], "size": im["size"]}
-                        for im in imgs
-                    ]
-                }
-                for (d, pi), imgs in self.page_images.items()
-            ],
-            "infos": {
-                "nom": self.nom_var.get(),
-                "prenom": self.prenom_var.get(),
-                "naissance": self.naissance_var.get(),
-                "photo": self.photo_path,
-                "personal_completed": self.personal_completed,
-                "month": self.month_var.get(),
-                "year": self.year_var.get(),
-            },
-            "sections": {
-                key: {
-                    "completed": self.sections_data[key]["completed"],
-                    "fields": self.sections_data[key]["fields"],
-                    "photo": self.sections_data[key]["photo"],
-                    "bilan1": self.sections_data[key]["bilan1"],
-                    "bilan2": self.sections_data[key]["bilan2"],
-                    "bilan2_enabled": self.sections_data[key]["bilan2_enabled"],
-                } for key in SECTION_KEYS
-            }
-        }
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            self.to_project().save(path)
+            self.project_path = path
             messagebox.showinfo("Sauvegarde", f"Projet sauvegardé : {path}")
         except Exception as e:
             messagebox.showerror("Sauvegarde", str(e))
 
     def load_project(self):
-        path = filedialog.askopenfilename(title="Charger projet", filetypes=[("JSON", "*.json")])
-        if not path:
-            return
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception as e:
-            messagebox.showerror("Chargement", str(e))
-            return
-
-        # Restaurer domaines/compétences
-        self.available = OrderedDict()
-        for d, submap in data.get("available", {}).items():
-            self.available[d] = OrderedDict()
-            for sd, lst in submap.items():
-                self.available[d][sd] = list(lst)
-
-        self.domain_order = data.get("domain_order", [])
+        """Ouvre un ou plusieurs projets, chacun dans son onglet (l'onglet courant s'il est vide)."""
+        paths = filedialog.askopenfilenames(title="Charger projet(s)", filetypes=[("JSON", "*.json")])
+        loaded = 0
+        for path in paths:
+            try:
+                project = Project.load(path)
+            except Exception as e:
+                messagebox.showerror("Chargement", f"{os.path.basename(path)} : {e}")
+                continue
+            if not self._is_blank_pupil():
+                self.new_pupil()
+            self.apply_project(project)
+            self.project_path = path
+            self.history.clear()
+            loaded += 1
+        if loaded:
+            messagebox.showinfo("Chargement", "Projet chargé avec succès" if loaded == 1
+                                else f"{loaded} projets chargés, un onglet par élève")
+
+    def to_project(self):
+        """Instantané de l'état courant (sans Tk) pour la sauvegarde et les rendus."""
+        project = Project()
+        project.available = self.available
+        project.domain_order = self.domain_order
+        project.domain_states = self.domain_states
+        project.selected_items = self.selected_items
+        project.page_images = {
+            key: [{"path": im["path"], "pos": im["pos"], "size": im["size"]} for im in imgs]
+            for key, imgs in self.page_images.items()
+        }
+        project.nom = self.nom_var.get()
+        project.prenom = self.prenom_var.get()
+        project.naissance = self.naissance_var.get()
+        project.genre = self._genre()
+        project.photo_path = self.photo_path
+        project.personal_completed = self.personal_completed
+        project.month = self.month_var.get()
+        project.year = self.year_var.get()
+        project.sections_data = self.sections_data
+        project.preview_size = self._preview_canvas_size()
+        project.export_dirty = self.export_dirty
+        return project
+
+    def apply_project(self, project):
+        # Restaurer domaines/compétences: le référentiel déjà chargé (partagé par les onglets)
+        # est gardé, le projet s'y aligne; sinon celui du projet devient le référentiel partagé
+        shared = bool(self.available)
+        if shared:
+            adopt_referential(project, self.available, self._referential_order(), self.theme)
+        else:
+            self.available.update(project.available)
+        self.domain_order = project.domain_order
         self.domain_states.clear()
-        domdata = data.get("domains", {})
-        for idx, d in enumerate(self.domain_order):
-            color = domdata.get(d, {}).get("color", DOMAIN_COLORS[idx % len(DOMAIN_COLORS)])
-            ds = DomainState(d, color)
-            ds.font_body = tuple(domdata.get(d, {}).get("font_body", DEFAULT_BODY_FONT))
-            self.domain_states[d] = ds
-
-        self.selected_items = []
-        self.added_set = set()
-        for tup in data.get("selected", []):
-            # rétrocompat: (d, sd, txt) ou (d, sd, txt, ts, batch)
-            if len(tup) == 3:
-                d, sd, txt = tup
-                ts = None
-                batch_id = None
-            else:
-                d, sd, txt, ts, batch_id = tup
-            it = CompetenceItem(d, sd, txt, ts=ts, batch_id=batch_id)
-            self.selected_items.append(it)
-            self.added_set.add(it.key())
+        self.domain_states.update(project.domain_states)
+
+        self.selected_items = list(project.selected_items)
+        self.added_set = {it.key() for it in self.selected_items}
+        self._ts_index = None
+        self.add_batch_counter = project.next_batch_id() - 1
 
         # Infos
-        infos = data.get("infos", {})
-        self.nom_var.set(infos.get("nom", ""))
-        self.prenom_var.set(infos.get("prenom", ""))
-        self.naissance_var.set(infos.get("naissance", ""))
-        self.photo_path = infos.get("photo", None)
-        self.personal_completed = bool(infos.get("personal_completed", False))
-        self.month_var.set(infos.get("month", ""))
-        self.year_var.set(infos.get("year", ""))
+        self.nom_var.set(project.nom)
+        self.prenom_var.set(project.prenom)
+        self.naissance_var.set(project.naissance)
+        self.genre_var.set(GENRES.get(project.genre, GENRES[""]))
+        self.photo_path = project.photo_path
+        self.personal_completed = project.personal_completed
+        self.month_var.set(project.month)
+        self.year_var.set(project.year)
 
         # Sections
-        secdata = data.get("sections", {})
         for key in SECTION_KEYS:
-            sd = secdata.get(key, {})
-            comp = bool(sd.get("completed", False))
+            sd = project.sections_data[key]
+            comp = sd["completed"]
             self.sections_data[key]["completed"] = comp
             if key in self.sections_widgets:
                 self.sections_widgets[key]["completed_var"].set(comp)
             # fields
-            fields = sd.get("fields", {})
             for fname in SECTION_FIELDS.keys():
-                val = fields.get(fname, "")
+                val = sd["fields"].get(fname, "")
                 self.sections_data[key]["fields"][fname] = val
                 if key in self.sections_widgets:
                     ent, var = self.sections_widgets[key]["entries"][fname]
                     var.set(val)
             # photo
-            p = sd.get("photo", None)
+            p = sd["photo"]
             self.sections_data[key]["photo"] = p
             if key in self.sections_widgets:
                 self.sections_widgets[key]["photo_label"].configure(text=os.path.basename(p) if p else "Aucune photo")
             # bilans
-            self.sections_data[key]["bilan1"] = sd.get("bilan1", "")
-            self.sections_data[key]["bilan2"] = sd.get("bilan2", "")
-            self.sections_data[key]["bilan2_enabled"] = bool(sd.get("bilan2_enabled", False))
+            self.sections_data[key]["bilan1"] = sd["bilan1"]
+            self.sections_data[key]["bilan2"] = sd["bilan2"]
+            self.sections_data[key]["bilan2_enabled"] = sd["bilan2_enabled"]
             if key in self.sections_widgets:
                 self.sections_widgets[key]["bilan2_var"].set(self.sections_data[key]["bilan2_enabled"])
                 if self.sections_data[key]["bilan2_enabled"]:
@@ -1221,41 +1801,132 @@ class CompetenceApp:
                     self.sections_widgets[key]["bilan2_btn"].state(["disabled"])
 
         # Rebuild pages first to know page indices
-        self.build_available_tree()
+        if not shared:
+            self._share_referential()
+            self.build_available_tree()
         self.refresh_selected_tree()
         self.rebuild_pages_and_refresh()
 
-        # Restaurer images par page
+        # Restaurer images par page (pixels décodés à l'affichage de chaque page; le cache
+        # est partagé par les onglets et borné par son budget)
         self.page_images.clear()
-        for rec in data.get("page_images", []):
-            d = rec.get("domain")
-            pi = int(rec.get("page_index", 0))
-            imgs = []
-            for im in rec.get("images", []):
-                p = im.get("path")
-                pos = im.get("pos", [60, HEADER_HEIGHT + 30])
-                size = im.get("size", [120, 120])
-                try:
-                    pil = Image.open(p).resize((int(size[0]), int(size[1])), Image.LANCZOS)
-                    tkimg = ImageTk.PhotoImage(pil)
-                    imgs.append({
-                        "path": p, "pil": pil, "tk": tkimg,
-                        "pos": [int(pos[0]), int(pos[1])],
-                        "size": [int(size[0]), int(size[1])]
-                    })
-                except Exception:
-                    pass
+        for key, recs in project.page_images.items():
+            imgs = [{"path": im["path"], "pos": list(im["pos"]), "size": [int(im["size"][0]), int(im["size"][1])]}
+                    for im in recs if im["path"] and os.path.exists(im["path"])]
             if imgs:
-                self.page_images[(d, pi)] = imgs
+                self.page_images[key] = imgs
 
         self.update_preview()
-        messagebox.showinfo("Chargement", "Projet chargé avec succès")
+        self.export_dirty = project.export_dirty
+
+    # ---- Validation groupée ----
+
+    def bulk_validate_dialog(self):
+        """Valide les mêmes compétences, à la même date, pour plusieurs projets élèves."""
+        if not self.available:
+            messagebox.showinfo("Info", "Chargez d'abord le fichier de compétences.")
+            return
+        keys = referential_keys(self.available, self.domain_order)
+
+        top = tk.Toplevel(self.root)
+        top.title("Validation groupée")
+        top.transient(self.root)
+        top.grab_set()
+        top.geometry("900x600")
+
+        frm = ttk.Frame(top)
+        frm.pack(fill="both", expand=True, padx=8, pady=8)
+        frm.columnconfigure(0, weight=3)
+        frm.columnconfigure(1, weight=2)
+        frm.rowconfigure(1, weight=1)
+
+        ttk.Label(frm, text="Compétences (sélection multiple)").grid(row=0, column=0, sticky="w")
+        comps = tk.Listbox(frm, selectmode="extended", exportselection=False)
+        comps.grid(row=1, column=0, sticky="nsew", padx=(0, 6))
+        for d, sd, text in keys:
+            comps.insert(tk.END, f"{sd} — {text}")
+
+        ttk.Label(frm, text="Élèves (projets .json)").grid(row=0, column=1, sticky="w")
+        pupils = tk.Listbox(frm, selectmode="extended", exportselection=False)
+        pupils.grid(row=1, column=1, sticky="nsew")
+        paths = []
+
+        def add_pupils():
+            for p in filedialog.askopenfilenames(parent=top, title="Projets élèves",
+                                                 filetypes=[("JSON", "*.json")]):
+                if p not in paths:
+                    paths.append(p)
+                    pupils.insert(tk.END, os.path.basename(p))
+
+        def remove_pupils():
+            for i in reversed(pupils.curselection()):
+                pupils.delete(i)
+                paths.pop(i)
+
+        side = ttk.Frame(frm)
+        side.grid(row=2, column=1, sticky="we", pady=4)
+        ttk.Button(side, text="Ajouter…", command=add_pupils).pack(side="left", padx=2)
+        ttk.Button(side, text="Retirer", command=remove_pupils).pack(side="left", padx=2)
+
+        date_row = ttk.Frame(frm)
+        date_row.grid(row=2, column=0, sticky="w", pady=4)
+        month_var = tk.StringVar(value=self.month_var.get())
+        year_var = tk.StringVar(value=self.year_var.get())
+        ttk.Label(date_row, text="Mois").pack(side="left")
+        ttk.Entry(date_row, textvariable=month_var, width=12).pack(side="left", padx=4)
+        ttk.Label(date_row, text="Année").pack(side="left")
+        ttk.Entry(date_row, textvariable=year_var, width=6).pack(side="left", padx=4)
+
+        def on_ok():
+            chosen = [keys[i] for i in comps.curselection()]
+            ts = self._timestamp(month_var.get(), year_var.get())
+            if not chosen or not paths:
+                messagebox.showinfo("Info", "Sélectionnez au moins une compétence et un élève.", parent=top)
+                return
+            if ts is None:
+                messagebox.showinfo("Horodatage", "Date illisible (ex: Février 2025).", parent=top)
+                return
+            # Les projets ouverts dans un onglet, affiché ou non, sont modifiés en mémoire
+            # (leur prochaine sauvegarde écraserait le fichier)
+            opened = {}
+            for session in self.sessions:
+                path = self.project_path if session is self.session else session.project_path
+                if path:
+                    opened[os.path.abspath(path)] = session
+            others = [p for p in paths if os.path.abspath(p) not in opened]
+            try:
+                result = bulk_add(others, chosen, ts, self.available)
+            except Exception as e:
+                messagebox.showerror("Validation groupée", str(e), parent=top)
+                return
+            lines = [str(result)]
+            for p in paths:
+                session = opened.get(os.path.abspath(p))
+                if session is None:
+                    continue
+                if session is self.session:
+                    n = self._add_competences(chosen, ts)
+                    label = pupil_label(self.nom_var.get(), self.prenom_var.get())
+                else:
+                    n = self._add_competences_in_background(session, chosen, ts)
+                    label = session.label
+                lines.append(f"{label} (ouvert): {n} compétence(s) ajoutée(s), à sauvegarder.")
+            if result.changed:
+                lines.append("Livrets à réexporter:")
+                lines.extend(f"  {os.path.basename(p)}" for p in result.changed)
+            top.destroy()
+            messagebox.showinfo("Validation groupée", "\n".join(lines))
+
+        btns = ttk.Frame(frm)
+        btns.grid(row=3, column=0, columnspan=2, sticky="e", pady=(6, 0))
+        ttk.Button(btns, text="Valider", command=on_ok).pack(side="right", padx=4)
+        ttk.Button(btns, text="Annuler", command=top.destroy).pack(side="right", padx=4)
 
     # ---- Export PowerPoint ----
 
     def export_ppt(self):
-        # Tente de (re)charger DOMAINES.txt pour descriptions
-        self._load_domaines_descriptions()
+        # Thème à jour (recompilé seulement si DOMAINES.txt / COULEURS_DOMAINES.txt ont changé)
+        self._refresh_theme()
 
         # Propose PRENOM_NOM.pptx comme nom initial
         suggested = self._default_ppt_filename()
@@ -1268,631 +1939,106 @@ class CompetenceApp:
         if not path:
             return
         try:
-            prs = Presentation()
-            # Page 1: Couverture
-            self._is_cover_export = True
-            self.build_cover_slide(prs)
-            self._is_cover_export = False
+            # python-pptx (et lxml) n'est chargé qu'au premier export
+            from export_pptx import PptxExporter
 
-            # Pages domaines
+            # Pages domaines (taille d'aperçu courante)
             self.rebuild_pages_and_refresh()
-
-            for d in self.domain_order:
-                pages = self.domain_page_map.get(d, [])
-                if not pages:
-                    continue
-                ds = self.domain_states[d]
-                # paramètres d'échelle basés sur la taille réelle de l'aperçu
-                cw, ch = self._preview_canvas_size()
-                preview_y_start = HEADER_HEIGHT + 14
-                preview_y_bottom_margin = 20
-                content_preview_height_px = max(1, ch - preview_y_start - preview_y_bottom_margin)
-
-                for pi, page in enumerate(pages):
-                    j = 0
-                    current_sd = None
-                    first_slide_for_page = True
-
-                    while j < len(page):
-                        slide = prs.slides.add_slide(prs.slide_layouts[6])  # blanc
-
-                        # Description du domaine (si disponible)
-                        domain_desc = (self.domain_descriptions.get(d) or "").strip()
-
-                        # Bandeau domaine dynamique
-                        banner_h = self.add_domain_banner(slide, prs, d, ds.color, domain_desc)
-
-                        # Zone de contenu
-                        left = Inches(0.6)
-                        content_top = banner_h + Inches(0.1)
-                        width = prs.slide_width - Inches(1.2)
-                        height = prs.slide_height - content_top - Inches(0.9)
-
-                        body_font_size = ds.font_body[1]
-                        max_text_width_px = cw - 2 * TEXT_MARGIN_X - 10
-                        y_px = preview_y_start
-                        max_y_px = preview_y_start + content_preview_height_px
-                        last_ts_slide = None
-
-                        # Si on continue un sous-domaine sur une nouvelle diapo, réafficher son en-tête
-                        # sans dupliquer si l'élément suivant est déjà ce même entête
-                        header_drawn_this_slide = False
-                        if current_sd:
-                            if not (j < len(page) and page[j][0] and page[j][1] == current_sd):
-                                needed = 22
-                                if y_px + needed <= max_y_px:
-                                    tb = slide.shapes.add_textbox(
-                                        left,
-                                        content_top + (y_px - preview_y_start) / content_preview_height_px * height,
-                                        width, Inches(0.4)
-                                    )
-                                    tf = tb.text_frame
-                                    tf.clear()
-                                    p = tf.paragraphs[0]
-                                    p.text = current_sd
-                                    p.font.size = Pt(DEFAULT_BODY_SIZE_PT + 1)
-                                    p.font.bold = DEFAULT_SUBHEADER_BOLD
-                                    p.font.underline = DEFAULT_SUBHEADER_UNDERLINE
-                                    r, g, b = self.hex_to_rgb(self.domain_states[d].color)
-                                    p.font.color.rgb = RGBColor(r, g, b)
-                                    y_px += 22
-                                    header_drawn_this_slide = True
-
-                        while j < len(page):
-                            is_header, sub, payload = page[j]
-                            if is_header:
-                                # si le même header a déjà été peint en tête de diapo, le sauter
-                                if sub == current_sd and header_drawn_this_slide:
-                                    j += 1
-                                    continue
-                                needed = 22
-                                if y_px + needed > max_y_px:
-                                    # Nouvelle diapo, on reprendra ce header
-                                    current_sd = sub
-                                    break
-                                # Titre sous-domaine
-                                tb = slide.shapes.add_textbox(
-                                    left,
-                                    content_top + (y_px - preview_y_start) / content_preview_height_px * height,
-                                    width, Inches(0.4)
-                                )
-                                tf = tb.text_frame
-                                tf.clear()
-                                p = tf.paragraphs[0]
-                                p.text = sub
-                                p.font.size = Pt(DEFAULT_BODY_SIZE_PT + 1)
-                                p.font.bold = DEFAULT_SUBHEADER_BOLD
-                                p.font.underline = DEFAULT_SUBHEADER_UNDERLINE
-                                r, g, b = self.hex_to_rgb(self.domain_states[d].color)
-                                p.font.color.rgb = RGBColor(r, g, b)
-                                y_px += 22
-                                current_sd = sub
-                                header_drawn_this_slide = True
-                                j += 1
-                            else:
-                                # Calcul de la hauteur nécessaire
-                                ts = (payload.ts or "").strip()
-                                prenom = (self.prenom_var.get() or "").strip()
-                                full_text = f"• {prenom} {payload.text}".strip()
-                                wrapped_lines = self.wrap_text(full_text, max_text_width_px, ("Arial", body_font_size))
-                                lines_h_px = len(wrapped_lines) * (body_font_size + LINE_SPACING)
-                                banner_h_px = 20 if (ts and ts != last_ts_slide) else 0
-                                needed = banner_h_px + lines_h_px + SUBHEADER_SPACING
-
-                                if y_px + needed > max_y_px:
-                                    # Nouvelle diapo pour ce même élément
-                                    break
-
-                                # Bandeau date si nécessaire
-                                if banner_h_px:
-                                    band_shape = slide.shapes.add_shape(
-                                        MSO_SHAPE.RECTANGLE,
-                                        left,
-                                        content_top + (y_px - preview_y_start) / content_preview_height_px * height,
-                                        width, Inches(0.28)
-                                    )
-                                    band_shape.fill.solid()
-                                    band_shape.fill.fore_color.rgb = RGBColor(0, 0, 0)
-                                    try:
-                                        band_shape.line.fill.background()
-                                    except Exception:
-                                        pass
-                                    tb = slide.shapes.add_textbox(
-                                        left,
-                                        content_top + (y_px - preview_y_start) / content_preview_height_px * height,
-                                        width, Inches(0.28)
-                                    )
-                                    tf = tb.text_frame
-                                    tf.clear()
-                                    p = tf.paragraphs[0]
-                                    p.text = ts
-                                    p.alignment = PP_PARAGRAPH_ALIGNMENT.CENTER
-                                    p.font.size = Pt(10)
-                                    p.font.bold = False
-                                    p.font.color.rgb = RGBColor(255, 255, 255)
-                                    y_px += banner_h_px
-                                    last_ts_slide = ts
-
-                                # Texte de la compétence
-                                bullet_h = max(Inches(0.3), (lines_h_px / content_preview_height_px) * height)
-                                tb = slide.shapes.add_textbox(
-                                    left + Inches(0.2),
-                                    content_top + (y_px - preview_y_start) / content_preview_height_px * height,
-                                    width - Inches(0.2), bullet_h
-                                )
-                                tf = tb.text_frame
-                                tf.clear()
-                                first_line = True
-                                for li, line in enumerate(wrapped_lines):
-                                    p = tf.paragraphs[0] if first_line else tf.add_paragraph()
-                                    p.text = line
-                                    p.font.size = Pt(body_font_size)
-                                    p.font.bold = False
-                                    p.font.color.rgb = RGBColor(0, 0, 0)
-                                    if li == 0:
-                                        p.level = 0
-                                    first_line = False
-                                y_px += lines_h_px
-                                y_px += SUBHEADER_SPACING
-                                j += 1
-
-                        # Exporter images de la première diapo de cette page d'aperçu uniquement
-                        if first_slide_for_page:
-                            self.export_page_images(slide, prs, d, pi)
-                            first_slide_for_page = False
-
-                    # fin while j < len(page)
-
-            # Diapos "Synthèse" par SECTION complétée
-            for key in SECTION_KEYS:
-                if self.sections_data[key]["completed"]:
-                    self.build_section_synthesis_slide(prs, key)
-
-            prs.save(path)
-            messagebox.showinfo("Succès", f"PowerPoint sauvegardé : {path}")
+            self.ensure_pages()
+            exporter = PptxExporter(
+                self._export_project(), measurer=self,
+                canvas_size=self._preview_canvas_size(),
+                theme=self.theme,
+                compact=self.compact_export_var.get(),
+                domain_page_map=self.domain_page_map,
+            )
+            report = exporter.save(path)
+            self.export_dirty = False
+            saved_kb = report.saved / 1024 if report else 0
+            messagebox.showinfo("Succès", f"PowerPoint sauvegardé : {path}\n"
+                                f"({exporter.rebuilt} diapo(s) regénérée(s), {exporter.reused} reprise(s) ; "
+                                f"fichier allégé de {saved_kb:.0f} Ko)")
         except Exception as e:
             messagebox.showerror("Export", f"Échec de l'export : {e}")
 
-    def build_cover_slide(self, prs):
-        slide = prs.slides.add_slide(prs.slide_layouts[6])  # blanc
-
-        sw = prs.slide_width
-        sh = prs.slide_height
-        margin = Inches(0.6)
+    # ---- Import d'une liste d'élèves (roster.py) ----
 
-        # Bannière top (image si dispo)
-        top_path = self._find_image_variant(os.path.join("img", "banniere-top.png"))
-        used_banner_h = Inches(0.8)
-        if top_path and os.path.exists(top_path):
-            try:
-                pic = slide.shapes.add_picture(top_path, Inches(0), Inches(0), width=sw)
-                used_banner_h = pic.height
-            except Exception:
-                rect = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(0), Inches(0), sw, Inches(0.8))
-                rect.fill.solid()
-                r, g, b = self.hex_to_rgb(COVER_HEADER_COLOR)
-                rect.fill.fore_color.rgb = RGBColor(r, g, b)
-                rect.line.fill.background()
-                tb = slide.shapes.add_textbox(Inches(0), Inches(0), sw, Inches(0.8))
-                tf = tb.text_frame
-                tf.clear()
-                p = tf.paragraphs[0]
-                p.text = "PROFIL DE L'ELEVE"
-                p.font.size = Pt(28)
-                p.font.bold = True
-                p.font.color.rgb = RGBColor(255, 255, 255)
-                p.alignment = PP_PARAGRAPH_ALIGNMENT.CENTER
-                used_banner_h = Inches(0.8)
-        else:
-            rect = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(0), Inches(0), sw, Inches(0.8))
-            rect.fill.solid()
-            r, g, b = self.hex_to_rgb(COVER_HEADER_COLOR)
-            rect.fill.fore_color.rgb = RGBColor(r, g, b)
-            rect.line.fill.background()
-            tb = slide.shapes.add_textbox(Inches(0), Inches(0), sw, Inches(0.8))
-            tf = tb.text_frame
-            tf.clear()
-            p = tf.paragraphs[0]
-            p.text = "PROFIL DE L'ELEVE"
-            p.font.size = Pt(28)
-            p.font.bold = True
-            p.font.color.rgb = RGBColor(255, 255, 255)
-            p.alignment = PP_PARAGRAPH_ALIGNMENT.CENTER
-            used_banner_h = Inches(0.8)
-
-        content_top = used_banner_h + Inches(0.15)
-
-        # Colonne principale: fond olive + infos personnelles
-        left_left = margin
-        left_w = sw - 2 * margin
-        left_top = content_top
-        left_h = Inches(1.8)
-
-        rect_bg = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, left_left, left_top, left_w, left_h)
-        rect_bg.fill.solid()
-        rect_bg.fill.fore_color.theme_color = MSO_THEME_COLOR.ACCENT_3
-        rect_bg.line.fill.background()
-
-        tb2 = slide.shapes.add_textbox(left_left + Inches(0.15), left_top + Inches(0.12), left_w - Inches(0.3), left_h - Inches(0.24))
-        tf2 = tb2.text_frame
-        tf2.clear()
-        lines = []
-        if self.nom_var.get().strip():
-            lines.append(f"Nom: {self.nom_var.get().strip()}")
-        if self.prenom_var.get().strip():
-            lines.append(f"Prénom: {self.prenom_var.get().strip()}")
-        if self.naissance_var.get().strip():
-            lines.append(f"Date de naissance: {self.naissance_var.get().strip()}")
-
-        first = True
-        for line in lines:
-            if first:
-                p = tf2.paragraphs[0]
-                p.text = line
-                first = False
-            else:
-                p = tf2.add_paragraph()
-                p.text = line
-            p.font.size = Pt(14)
-            p.font.bold = True
-            p.font.color.rgb = RGBColor(255, 255, 255)
-
-        # Photo élève (en haut à droite)
-        if self.photo_path and os.path.exists(self.photo_path):
-            try:
-                max_photo_h = Inches(1.4)
-                pic = slide.shapes.add_picture(self.photo_path, Inches(0), Inches(0), height=max_photo_h)
-                pic.left = left_left + left_w - pic.width - Inches(0.2)
-                pic.top = left_top + Inches(0.2)
-            except Exception:
-                pass
-
-        # Présentation HORIZONTALE des sections
-        row_top = left_top + left_h + Inches(0.2)
-        col_count = len(SECTION_KEYS)
-        if col_count < 1:
-            self.add_bottom_banner(slide, prs)
+    def import_roster_dialog(self):
+        """Crée un projet par élève d'une liste CSV, avec le projet ouvert comme modèle."""
+        csv_path = filedialog.askopenfilename(title="Liste des élèves",
+                                              filetypes=[("CSV", "*.csv"), ("Tous", "*.*")])
+        if not csv_path:
             return
-        col_w = (sw - 2 * margin) / col_count
-        col_text_h = Inches(1.0)
-        col_photo_h = Inches(1.6)
-
-        for idx, key in enumerate(SECTION_KEYS):
-            col_left = margin + col_w * idx
-            section_title = SECTION_LABELS[key]
-            fields = self.sections_data[key]["fields"]
-
-            # Bloc titre + 3 lignes
-            tb = slide.shapes.add_textbox(col_left, row_top, col_w, col_text_h)
-            tf = tb.text_frame
-            tf.clear()
-            p = tf.paragraphs[0]
-            p.text = section_title
-            p.font.bold = True
-            p.font.size = Pt(12)
-
-            for fname, flabel in SECTION_FIELDS.items():
-                val = fields.get(fname, "").strip()
-                if not val:
-                    continue
-                sp = tf.add_paragraph()
-                sp.text = f"{flabel}: {val}"
-                sp.level = 1
-                sp.font.size = Pt(10)
-
-            # Emplacement photo sous le bloc texte
-            ph_top = row_top + col_text_h + Inches(0.05)
-            ph_w = col_w
-            ph_h = col_photo_h
-
-            ph_rect = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, col_left, ph_top, ph_w, ph_h)
-            ph_rect.fill.solid()
-            ph_rect.fill.fore_color.rgb = RGBColor(245, 245, 245)
-            ph_rect.line.fill.background()
-
-            sec_photo = self.sections_data[key]["photo"]
-            if sec_photo and os.path.exists(sec_photo):
-                try:
-                    with Image.open(sec_photo) as im:
-                        iw, ih = im.size
-                        box_w = ph_w
-                        box_h = ph_h
-                        img_ratio = iw / ih if ih else 1.0
-                        box_ratio = box_w / box_h if box_h else 1.0
-                        if img_ratio >= box_ratio:
-                            pic = slide.shapes.add_picture(sec_photo, col_left, ph_top, width=box_w)
-                            pic.top = ph_top + (box_h - pic.height) // 2
-                        else:
-                            pic = slide.shapes.add_picture(sec_photo, col_left, ph_top, height=box_h)
-                            pic.left = col_left + (box_w - pic.width) // 2
-                except Exception:
-                    pass
-
-        self.add_bottom_banner(slide, prs)
+        out_dir = filedialog.askdirectory(title="Dossier des projets élèves")
+        if not out_dir:
+            return
+        try:
+            result = import_roster(csv_path, out_dir, self.to_project())
+        except (ValueError, OSError) as e:
+            messagebox.showerror("Import", f"Liste illisible : {e}")
+            return
+        lines = [str(result)]
+        lines += [f"Ligne {line} : {message}" for line, message in result.errors[:20]]
+        if len(result.errors) > 20:
+            lines.append("…")
+        show = messagebox.showwarning if result.errors else messagebox.showinfo
+        show("Import de la liste", "\n".join(lines))
+
+    # ---- Export HTML et PDF (sans PowerPoint) ----
+
+    def export_html(self):
+        self._refresh_theme()
+        folder = filedialog.askdirectory(title="Dossier du livret HTML")
+        if not folder:
+            return
+        try:
+            from export_html import HtmlExporter
+            path = HtmlExporter(self._export_project(), theme=self.theme).save(folder)
+            messagebox.showinfo("Succès", f"Livret HTML sauvegardé : {path}")
+        except Exception as e:
+            messagebox.showerror("Export", f"Échec de l'export HTML : {e}")
 
-    def add_domain_banner(self, slide, prs, domain_name, color_hex, domain_desc=""):
-        """
-        Crée le bandeau supérieur de domaine (rectangle coloré + titre + description).
-        Le bandeau s'AGRANDIT automatiquement pour que la description ne déborde pas.
-        Retourne la hauteur du bandeau.
-        """
-        sw = prs.slide_width
-
-        # Paramètres de mise en page
-        title_left = Inches(0.4)
-        title_top = Inches(0.05)
-        title_height = Inches(0.6)
-        text_width = sw - Inches(0.8)
-        desc_font_pt = 8
-
-        # Estimation du nombre de lignes pour la description, en se basant sur l'aperçu
-        def compute_desc_lines(desc_text: str) -> list[str]:
-            if not desc_text.strip():
-                return []
-            # approx: largeur disponible proportionnelle au canvas de preview
-            cw, _ = self._preview_canvas_size()
-            max_width_px = max(50, int(cw) - 40)
-            return self.wrap_text(desc_text, max_width_px, ("Arial", desc_font_pt))
-
-        desc_lines = compute_desc_lines(domain_desc)
-        # Hauteur des lignes en pouces: approx 1.25 x taille (en points/72)
-        line_height_in = (desc_font_pt / 72.0) * 1.25
-        desc_height = Inches(line_height_in * max(1, len(desc_lines))) if desc_lines else Inches(0)
-
-        # Position par défaut de la description (sous le titre)
-        desc_top = Inches(0.65)
-
-        # Hauteur du bandeau minimum
-        min_banner_h = Inches(1.2)
-        # Hauteur nécessaire pour contenir la description (si présente)
-        needed_banner_h = desc_top + desc_height + Inches(0.1)
-        banner_h = max(min_banner_h, needed_banner_h)
-
-        # Rectangle bandeau
-        rect = slide.shapes.add_shape(
-            MSO_SHAPE.RECTANGLE,
-            Inches(0), Inches(0),
-            sw, banner_h
-        )
-        rect.fill.solid()
-        r, g, b = self.hex_to_rgb(color_hex)
-        rect.fill.fore_color.rgb = RGBColor(r, g, b)
-        rect.line.fill.background()
-
-        # Titre du domaine
-        tb = slide.shapes.add_textbox(
-            title_left, title_top,
-            text_width, title_height
+    def export_pdf(self):
+        self._refresh_theme()
+        suggested = os.path.splitext(self._default_ppt_filename())[0] + ".pdf"
+        path = filedialog.asksaveasfilename(
+            title="Créer PDF",
+            defaultextension=".pdf",
+            filetypes=[("PDF", "*.pdf")],
+            initialfile=suggested
         )
-        tf = tb.text_frame
-        tf.clear()
-        p = tf.paragraphs[0]
-        p.text = domain_name
-        p.font.size = Pt(DEFAULT_TITLE_SIZE_PT)
-        p.font.bold = True
-        p.font.color.rgb = RGBColor(255, 255, 255)
-
-        # Description
-        if desc_lines:
-            desc_tb = slide.shapes.add_textbox(title_left, desc_top, text_width, desc_height)
-            desc_tf = desc_tb.text_frame
-            desc_tf.clear()
-            desc_tf.word_wrap = True
-            first = True
-            for line in desc_lines:
-                if first:
-                    pd = desc_tf.paragraphs[0]
-                    first = False
-                else:
-                    pd = desc_tf.add_paragraph()
-                pd.text = line
-                pd.font.size = Pt(desc_font_pt)
-                pd.font.bold = False
-                pd.alignment = PP_PARAGRAPH_ALIGNMENT.LEFT
-                pd.font.color.rgb = RGBColor(255, 255, 255)
-
-        return banner_h
-
-    def export_page_images(self, slide, prs, domain, page_index):
-        # Map coordonnées apercu -> slide pour la page (domain, page_index)
-        key = (domain, page_index)
-
-        sw = prs.slide_width
-        sh = prs.slide_height
-
-        cw, ch = self._preview_canvas_size()
-
-        for img in self.page_images.get(key, []):
-            lx = int(img["pos"][0] / cw * sw)
-            ly = int(img["pos"][1] / ch * sh)
-            w = int(img["size"][0] / cw * sw)
-            h = int(img["size"][1] / ch * sh)
-            try:
-                if w > 0 and h > 0:
-                    slide.shapes.add_picture(img["path"], lx, ly, width=w, height=h)
-            except Exception:
-                pass
-
-    # ---- Diapo Synthèse par SECTION ----
-
-    def build_section_synthesis_slide(self, prs, key):
-        slide = prs.slides.add_slide(prs.slide_layouts[6])  # blanc
-
-        sw = prs.slide_width
-        sh = prs.slide_height
-
-        # Titre "Synthèse"
-        band_h = Inches(0.8)
-        rect = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(0), Inches(0), sw, band_h)
-        rect.fill.solid()
-        rect.fill.fore_color.rgb = RGBColor(255, 0, 0)  # rouge
-        rect.line.fill.background()
-
-        tb = slide.shapes.add_textbox(Inches(0), Inches(0), sw, band_h)
-        tf = tb.text_frame
-        tf.clear()
-        p = tf.paragraphs[0]
-        p.text = "Synthèse"
-        p.font.size = Pt(20)
-        p.font.bold = False
-        p.font.color.rgb = RGBColor(0, 0, 0)
-        p.alignment = PP_PARAGRAPH_ALIGNMENT.CENTER
-
-        # Sous-titre = intitulé de la SECTION
-        subtitle = SECTION_LABELS.get(key, key)
-        tb2 = slide.shapes.add_textbox(Inches(0.6), band_h + Inches(0.2), sw - Inches(1.2), Inches(0.6))
-        tf2 = tb2.text_frame
-        tf2.clear()
-        p2 = tf2.paragraphs[0]
-        p2.text = subtitle
-        p2.font.size = Pt(18)
-        p2.font.bold = False
-        p2.alignment = PP_PARAGRAPH_ALIGNMENT.CENTER
-
-        # Zones de bilans
-        top_content = band_h + Inches(1.0)
-        left = Inches(0.6)
-        width = sw - Inches(1.2)
-        available_h = sh - top_content - Inches(0.9)
-
-        bilan1 = (self.sections_data[key]["bilan1"] or "").strip()
-        use_bilan2 = bool(self.sections_data[key]["bilan2_enabled"])
-        bilan2 = (self.sections_data[key]["bilan2"] or "").strip() if use_bilan2 else ""
-
-        if use_bilan2:
-            box_h = available_h / 2.0 - Inches(0.2)
-            # Bilan 1
-            self._add_bilan_box(slide, left, top_content, width, box_h, "Bilan", bilan1)
-            # Bilan 2
-            self._add_bilan_box(slide, left, top_content + box_h + Inches(0.2), width, box_h, "Bilan", bilan2)
-        else:
-            self._add_bilan_box(slide, left, top_content, width, available_h, "Bilan", bilan1)
-
-    def _add_bilan_box(self, slide, left, top, width, height, title, content):
-        # Titre "Bilan"
-        title_tb = slide.shapes.add_textbox(left, top, width, Inches(0.4))
-        title_tf = title_tb.text_frame
-        title_tf.clear()
-        pt = title_tf.paragraphs[0]
-        pt.text = title
-        pt.font.size = Pt(14)
-        pt.font.bold = True
-        # Contenu
-        text_tb = slide.shapes.add_textbox(left, top + Inches(0.45), width, max(Inches(0.8), height - Inches(0.45)))
-        text_tf = text_tb.text_frame
-        text_tf.clear()
-        text_tf.word_wrap = True
-        if content:
-            lines = content.splitlines()
-            first = True
-            for line in lines:
-                if first:
-                    p = text_tf.paragraphs[0]
-                    p.text = line
-                    first = False
-                else:
-                    p = text_tf.add_paragraph()
-                    p.text = line
-                p.font.size = Pt(12)
-        else:
-            p = text_tf.paragraphs[0]
-            p.text = ""
-            p.font.size = Pt(12)
-
-    # ---- Bannières top/bas utilitaires ----
-
-    def add_bottom_banner(self, slide, prs):
-        # Affichage uniquement sur la page de garde
-        if not getattr(self, "_is_cover_export", False):
+        if not path:
             return
-        # Ajoute une image de bannière en bas si trouvée
-        path_try = [
-            os.path.join("img", "banniere-bas.png"),
-            os.path.join("img", "banniere-bas.jpg"),
-            os.path.join("img", "banniere-bas.jpeg"),
-        ]
-        img_path = next((p for p in path_try if os.path.exists(p)), None)
-        if not img_path:
+        dpi = simpledialog.askinteger("Résolution", "Résolution du PDF (dpi):",
+                                      initialvalue=DEFAULT_DPI, minvalue=50, maxvalue=600)
+        if not dpi:
             return
         try:
-            sw = prs.slide_width
-            sh = prs.slide_height
-            pic = slide.shapes.add_picture(img_path, Inches(0), sh - Inches(0.5), width=sw)
-            pic.top = sh - pic.height
-        except Exception:
-            pass
-
-    def _find_image_variant(self, path_with_default_ext):
-        # Si le chemin donné existe, l'utiliser, sinon essayer variantes jpg/jpeg
-        if os.path.exists(path_with_default_ext):
-            return path_with_default_ext
-        base, ext = os.path.splitext(path_with_default_ext)
-        for e in [".png", ".jpg", ".jpeg"]:
-            if os.path.exists(base + e):
-                return base + e
-        return None
-
-    # ---- Lecture DOMAINES.txt ----
-
-    def _load_domaines_descriptions(self):
-        path = os.path.join(os.getcwd(), "DOMAINES.txt")
-        if not os.path.exists(path):
-            return
+            renderer = BookletRenderer(
+                self._export_project(), dpi=dpi, measurer=self,
+                canvas_size=self._preview_canvas_size(),
+                theme=self.theme,
+            )
+            n = renderer.save_pdf(path)
+            messagebox.showinfo("Succès", f"PDF sauvegardé ({n} pages) : {path}")
+        except Exception as e:
+            messagebox.showerror("Export", f"Échec de l'export PDF : {e}")
+
+    # ---- Thème (DOMAINES.txt, COULEURS_DOMAINES.txt) ----
+
+    def _refresh_theme(self):
+        # Au démarrage et à l'export; _watch_files suit les modifications entre-temps
         try:
-            domain = None
-            sub = None
-            buf = []
-            self.domain_descriptions.clear()
-            self.subdomain_descriptions.clear()
-
-            def commit():
-                nonlocal domain, sub, buf
-                if not domain:
-                    buf = []
-                    return
-                text = "\n".join(buf).strip()
-                if not text:
-                    buf = []
-                    return
-                if sub:
-                    self.subdomain_descriptions[(domain, sub)] = text
-                else:
-                    self.domain_descriptions[domain] = text
-                buf = []
-
-            with open(path, "r", encoding="utf-8-sig") as f:
-                for raw in f:
-                    line = raw.rstrip("\n")
-                    if not line.strip():
-                        if buf is not None:
-                            buf.append("")
-                        continue
-                    cleaned = line.replace("\u202f", " ").replace("\u00a0", " ").replace("\u2019", "'").strip()
-
-                    if cleaned.startswith("##-"):
-                        # Commit précédent
-                        commit()
-                        # Nouveau domaine
-                        d = cleaned[3:].strip()
-                        if d.lower().startswith("domaine"):
-                            parts = d.split(None, 1)
-                            d = parts[1] if len(parts) > 1 else d
-                        domain = d
-                        sub = None
-                        buf = []
-                    elif cleaned.startswith("#-"):
-                        # Commit précédent (domaine ou sous-domaine précédent)
-                        commit()
-                        s = cleaned[2:].strip()
-                        if s.lower().startswith("sous-domaine:"):
-                            s = s.split(":", 1)[1].strip()
-                        sub = s
-                        buf = []
-                    else:
-                        buf.append(cleaned)
-                commit()
+            self.theme = load_theme()
         except Exception as e:
-            messagebox.showwarning("DOMAINES.txt", f"Impossible de lire DOMAINES.txt : {e}")
+            # Un seul avertissement par erreur, pas un à chaque export tant que rien ne change
+            if str(e) != self._theme_error:
+                self._theme_error = str(e)
+                messagebox.showwarning("Thème", f"Impossible de lire DOMAINES.txt / COULEURS_DOMAINES.txt : {e}")
+            if self.theme is None:
+                self.theme = Theme()
+        else:
+            self._theme_error = None
 
     # ---- Utils ----
 
@@ -1958,7 +2104,31 @@ class CompetenceApp:
 
 # ==== Lancement ====
 
-if __name__ == "__main__":
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Éditeur de livrets de compétences.")
+    parser.add_argument("--diagnostics", action="store_true",
+                        help="mesure la réactivité de l'interface (panneau F12, trace JSON)")
+    parser.add_argument("--trace", metavar="FICHIER",
+                        help="avec --diagnostics: trace JSON enregistrée à la fermeture")
+    args = parser.parse_args(argv)
+
+    diagnostics = None
+    if args.diagnostics:
+        from diagnostics import Diagnostics
+        diagnostics = Diagnostics()
+        diagnostics.install_tk()    # avant la création des widgets
     root = tk.Tk()
     app = CompetenceApp(root)
+    if diagnostics is not None:
+        app.diagnostics = diagnostics
+        diagnostics.attach(app)
+        diagnostics.show_panel()
     root.mainloop()
+    if diagnostics is not None and args.trace:
+        diagnostics.save_trace(args.trace)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
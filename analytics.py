@@ -0,0 +1,393 @@
+"""
+Statistiques d'acquisition sur une classe ou une école.
+
+Les projets élèves (.json) sont chargés dans une matrice NumPy élèves × compétences
+dont chaque case contient le rang du mois d'acquisition (model.parse_timestamp).
+Les colonnes suivent le référentiel COMPETENCES.txt, dans l'ordre du fichier.
+Toutes les requêtes sont vectorisées: « acquis à telle date » revient à comparer
+la matrice au rang du mois demandé.
+
+Exemple: compétences d'EXPLORER LE MONDE acquises par moins de 30 % des MS en mars:
+    python analytics.py eleves/*.json --section MS --at "Mars 2025" \\
+        --domain "EXPLORER LE MONDE" --below 0.3
+"""
+import argparse
+import csv
+import os
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+from model import (
+    Project, SECTION_KEYS, SECTION_LABELS,
+    parse_competences_file, parse_timestamp, format_timestamp,
+)
+from theme import normalize_name
+from periods import parse_period
+
+# Valeurs particulières de la matrice
+NOT_ACQUIRED = np.iinfo(np.int32).max
+UNDATED = 0                 # acquis sans horodatage lisible: compté acquis à toute date
+
+DEFAULT_THRESHOLD = 0.3
+SUMMARY_MAX_ITEMS = 12      # compétences les moins acquises listées sur la diapo
+
+
+class Referential:
+    """Colonnes de la matrice: compétences du référentiel, regroupées par domaine puis sous-domaine."""
+
+    def __init__(self, available, domain_order):
+        self.keys = []                  # (domain, subdomain, text)
+        self.domains = list(domain_order)
+        self.subdomains = []            # (domain, subdomain)
+        domain_ids = []
+        subdomain_ids = []
+        for di, d in enumerate(self.domains):
+            for sd, comps in available.get(d, {}).items():
+                self.subdomains.append((d, sd))
+                for text in comps:
+                    self.keys.append((d, sd, text))
+                    domain_ids.append(di)
+                    subdomain_ids.append(len(self.subdomains) - 1)
+        self.domain_ids = np.array(domain_ids, dtype=np.intp)
+        self.subdomain_ids = np.array(subdomain_ids, dtype=np.intp)
+        self.index = {k: i for i, k in enumerate(self.keys)}
+        # Rapprochement tolérant (apostrophes, casse) des intitulés enregistrés dans les projets
+        self._loose = {tuple(normalize_name(x) for x in k): i for i, k in enumerate(self.keys)}
+
+    @classmethod
+    def from_file(cls, path="COMPETENCES.txt"):
+        return cls(*parse_competences_file(path))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def column(self, domain, subdomain, text):
+        key = (domain, subdomain or domain, text)
+        col = self.index.get(key)
+        if col is None:
+            col = self._loose.get(tuple(normalize_name(x) for x in key))
+        return col
+
+    def domain_columns(self, domain):
+        nd = normalize_name(domain)
+        ids = [i for i, d in enumerate(self.domains) if normalize_name(d) == nd]
+        return np.isin(self.domain_ids, ids)
+
+
+def pupil_name(project, path=None):
+    name = f"{(project.prenom or '').strip()} {(project.nom or '').strip()}".strip()
+    if not name and path:
+        name = os.path.splitext(os.path.basename(path))[0]
+    return name
+
+
+def pupil_section(project):
+    # Section courante: la dernière section complétée (TPS < PS < MS < GS), "" sinon
+    current = ""
+    for key in SECTION_KEYS:
+        if project.sections_data[key]["completed"]:
+            current = key
+    return current
+
+
+def _as_rank(at):
+    if at is None:
+        return NOT_ACQUIRED - 1
+    if isinstance(at, str):
+        rank = parse_timestamp(at)
+        if rank is None:
+            raise ValueError(f"Date illisible: {at!r} (attendu « Mois Année »)")
+        return rank
+    return int(at)
+
+
+def _restrict_to_period(acquired, projects, names, period):
+    # Bornes par élève (une ligne chacune), puis un seul masque sur toute la matrice;
+    # les acquisitions sans date ne font partie d'aucune période
+    lo = np.empty(len(projects), dtype=np.int64)
+    hi = np.empty(len(projects), dtype=np.int64)
+    for row, (project, name) in enumerate(zip(projects, names)):
+        try:
+            p = parse_period(period, project.sections_data)
+        except ValueError as e:
+            raise ValueError(f"{name}: {e}") from None
+        if p is None:
+            # « Toutes les périodes »: rien d'écarté, pas même les acquisitions sans date
+            lo[row], hi[row] = UNDATED, NOT_ACQUIRED
+            continue
+        lo[row] = UNDATED + 1 if p.start is None else p.start
+        hi[row] = NOT_ACQUIRED if p.end is None else p.end
+    outside = (acquired < lo[:, None]) | (acquired > hi[:, None])
+    acquired[outside] = NOT_ACQUIRED
+
+
+class ClassMatrix:
+    """
+    Matrice d'acquisition d'un ensemble d'élèves.
+    acquired[p, c]: rang du mois d'acquisition, UNDATED ou NOT_ACQUIRED.
+    """
+
+    def __init__(self, referential, pupils, sections, acquired, unmatched=0):
+        self.referential = referential
+        self.pupils = list(pupils)
+        self.sections = np.array(sections, dtype="<U3")
+        self.acquired = acquired
+        # compétences des projets absentes du référentiel (ignorées)
+        self.unmatched = unmatched
+
+    @classmethod
+    def from_projects(cls, projects, referential, names=None, period=None):
+        """
+        `projects`: liste de model.Project; `names`: noms affichés (sinon prénom nom).
+        `period` (texte, periods.parse_period): seules les acquisitions de cette période
+        comptent; elle est lue élève par élève (« MS »: l'année de MS de chacun).
+        """
+        acquired = np.full((len(projects), len(referential)), NOT_ACQUIRED, dtype=np.int32)
+        rows, cols, values = [], [], []
+        unmatched = 0
+        for row, project in enumerate(projects):
+            for it in project.selected_items:
+                col = referential.column(it.domain, it.subdomain, it.text)
+                if col is None:
+                    unmatched += 1
+                    continue
+                rank = parse_timestamp(it.ts)
+                rows.append(row)
+                cols.append(col)
+                values.append(UNDATED if rank is None else rank)
+        if rows:
+            # une compétence cochée deux fois garde sa date la plus ancienne
+            np.minimum.at(acquired, (np.array(rows), np.array(cols)), np.array(values, dtype=np.int32))
+        names = names or [pupil_name(p) for p in projects]
+        if period:
+            _restrict_to_period(acquired, projects, names, period)
+        sections = [pupil_section(p) for p in projects]
+        return cls(referential, names, sections, acquired, unmatched)
+
+    @classmethod
+    def load(cls, paths, referential, period=None):
+        projects = [Project.load(path) for path in paths]
+        names = [pupil_name(p, path) for p, path in zip(projects, paths)]
+        return cls.from_projects(projects, referential, names, period)
+
+    @property
+    def n_pupils(self):
+        return len(self.pupils)
+
+    # ---- Sélections ----
+
+    def _rows(self, section=None):
+        if not section:
+            return np.ones(self.n_pupils, dtype=bool)
+        return self.sections == section
+
+    def _columns(self, domain=None):
+        if not domain:
+            return np.ones(len(self.referential), dtype=bool)
+        return self.referential.domain_columns(domain)
+
+    def acquired_at(self, at=None, section=None):
+        """Matrice booléenne « acquis au mois `at` » (toutes dates si None) des élèves retenus."""
+        return self.acquired[self._rows(section)] <= _as_rank(at)
+
+    # ---- Requêtes ----
+
+    def competence_rates(self, at=None, section=None):
+        """Taux d'acquisition par compétence (NaN sans élève)."""
+        acq = self.acquired_at(at, section)
+        if not len(acq):
+            return np.full(len(self.referential), np.nan)
+        return acq.mean(axis=0)
+
+    def group_rates(self, level="domain", at=None, section=None):
+        """Taux moyen par domaine ("domain") ou sous-domaine ("subdomain")."""
+        if level == "domain":
+            ids, names = self.referential.domain_ids, self.referential.domains
+        elif level == "subdomain":
+            ids, names = self.referential.subdomain_ids, self.referential.subdomains
+        else:
+            raise ValueError(f"niveau inconnu: {level!r}")
+        acq = self.acquired_at(at, section)
+        per_column = acq.sum(axis=0)
+        hits = np.bincount(ids, weights=per_column, minlength=len(names))
+        sizes = np.bincount(ids, minlength=len(names)) * acq.shape[0]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rates = hits / sizes
+        return OrderedDict(zip(names, rates))
+
+    def monthly_rates(self, section=None, domain=None):
+        """
+        Taux d'acquisition cumulé mois par mois.
+        Retourne (rangs des mois, taux) pour les mois où au moins une compétence a été acquise.
+        """
+        block = self.acquired[np.ix_(self._rows(section), self._columns(domain))]
+        if not block.size:
+            return np.array([], dtype=np.int32), np.array([])
+        dated = np.sort(block[(block != NOT_ACQUIRED) & (block != UNDATED)], axis=None)
+        months = np.unique(dated)
+        undated = np.count_nonzero(block == UNDATED)
+        counts = np.searchsorted(dated, months, side="right") + undated
+        return months, counts / block.size
+
+    def pupil_progress(self, at=None, domain=None):
+        """Part des compétences (du domaine) acquises par chaque élève."""
+        cols = self._columns(domain)
+        if not cols.any():
+            return np.zeros(self.n_pupils)
+        return (self.acquired[:, cols] <= _as_rank(at)).mean(axis=1)
+
+    def cohort_comparison(self, level="domain", at=None):
+        """{section: {groupe: taux}} pour chaque section représentée (TPS, PS, MS, GS)."""
+        present = set(self.sections.tolist())
+        return OrderedDict(
+            (key, self.group_rates(level, at, key)) for key in SECTION_KEYS if key in present
+        )
+
+    def below(self, threshold=DEFAULT_THRESHOLD, at=None, section=None, domain=None):
+        """Compétences acquises par moins de `threshold` des élèves: [(clé, taux)], du plus faible au plus fort."""
+        rates = self.competence_rates(at, section)
+        mask = self._columns(domain) & (rates < threshold)
+        cols = np.flatnonzero(mask)
+        cols = cols[np.argsort(rates[cols], kind="stable")]
+        return [(self.referential.keys[c], float(rates[c])) for c in cols]
+
+
+# ==== Exports ====
+
+def _fmt_rate(rate):
+    return "" if np.isnan(rate) else f"{rate:.3f}"
+
+
+def write_competences_csv(path, matrix, at=None):
+    """Une ligne par compétence: taux d'acquisition par section et pour l'ensemble."""
+    sections = [k for k in SECTION_KEYS if k in set(matrix.sections.tolist())]
+    per_section = [matrix.competence_rates(at, key) for key in sections]
+    overall = matrix.competence_rates(at)
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(["Domaine", "Sous-domaine", "Compétence"] + sections + ["Ensemble"])
+        for c, (d, sd, text) in enumerate(matrix.referential.keys):
+            w.writerow([d, sd, text] + [_fmt_rate(r[c]) for r in per_section] + [_fmt_rate(overall[c])])
+
+
+def write_pupils_csv(path, matrix, at=None):
+    """Une ligne par élève: section, nombre et part de compétences acquises, part par domaine."""
+    domains = matrix.referential.domains
+    acquired = (matrix.acquired <= _as_rank(at)).sum(axis=1)
+    overall = matrix.pupil_progress(at)
+    per_domain = [matrix.pupil_progress(at, d) for d in domains]
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(["Élève", "Section", "Acquises", "Part"] + domains)
+        for p, name in enumerate(matrix.pupils):
+            w.writerow([name, matrix.sections[p], int(acquired[p]), _fmt_rate(overall[p])]
+                       + [_fmt_rate(r[p]) for r in per_domain])
+
+
+def add_summary_slide(prs, matrix, at=None, section=None, threshold=DEFAULT_THRESHOLD):
+    """
+    Diapo de synthèse: taux par domaine et par section (tableau) puis compétences
+    les moins acquises. python-pptx n'est importé qu'ici.
+    """
+    from pptx.util import Inches, Pt
+
+    slide = prs.slides.add_slide(prs.slide_layouts[6])  # blanc
+    title = "Synthèse des acquisitions"
+    if section:
+        title += f" — {SECTION_LABELS.get(section, section)}"
+    if at is not None:
+        title += f" — {format_timestamp(_as_rank(at))}"
+    tb = slide.shapes.add_textbox(Inches(0.5), Inches(0.3), prs.slide_width - Inches(1.0), Inches(0.6))
+    p = tb.text_frame.paragraphs[0]
+    p.text = title
+    p.font.size = Pt(22)
+    p.font.bold = True
+
+    cohorts = matrix.cohort_comparison("domain", at)
+    columns = list(cohorts) if not section else [section]
+    overall = matrix.group_rates("domain", at, section)
+    rows = list(overall)
+    table = slide.shapes.add_table(len(rows) + 1, len(columns) + 2, Inches(0.5), Inches(1.0),
+                                   prs.slide_width - Inches(1.0), Inches(0.3) * (len(rows) + 1)).table
+    table.columns[0].width = Inches(5.0)
+    headers = ["Domaine"] + columns + ["Ensemble"]
+    for j, text in enumerate(headers):
+        table.cell(0, j).text = text
+    for i, d in enumerate(rows, start=1):
+        values = [cohorts.get(key, {}).get(d, np.nan) for key in columns] + [overall[d]]
+        table.cell(i, 0).text = d
+        for j, rate in enumerate(values, start=1):
+            table.cell(i, j).text = "" if np.isnan(rate) else f"{rate:.0%}"
+    for row in table.rows:
+        for cell in row.cells:
+            for para in cell.text_frame.paragraphs:
+                para.font.size = Pt(10)
+
+    weakest = matrix.below(threshold, at, section)[:SUMMARY_MAX_ITEMS]
+    top = Inches(1.2) + Inches(0.3) * (len(rows) + 1)
+    tb = slide.shapes.add_textbox(Inches(0.5), top, prs.slide_width - Inches(1.0), prs.slide_height - top)
+    tf = tb.text_frame
+    tf.word_wrap = True
+    p = tf.paragraphs[0]
+    p.text = f"Compétences acquises par moins de {threshold:.0%} des élèves ({len(weakest)}):"
+    p.font.size = Pt(12)
+    p.font.bold = True
+    for (d, sd, text), rate in weakest:
+        p = tf.add_paragraph()
+        p.text = f"• {text} ({sd}) — {rate:.0%}"
+        p.font.size = Pt(10)
+    return slide
+
+
+def save_summary_pptx(path, matrix, at=None, section=None, threshold=DEFAULT_THRESHOLD):
+    from pptx import Presentation
+    from pptx_package import optimize_pptx
+
+    prs = Presentation()
+    add_summary_slide(prs, matrix, at, section, threshold)
+    prs.save(path)
+    optimize_pptx(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Statistiques d'acquisition sur un ensemble de projets élèves.")
+    parser.add_argument("projects", nargs="+", help="fichiers projet .json")
+    parser.add_argument("--competences", default="COMPETENCES.txt", help="référentiel (COMPETENCES.txt)")
+    parser.add_argument("--at", help="date d'observation « Mois Année » (par défaut: tout)")
+    parser.add_argument("--section", choices=SECTION_KEYS, help="limiter à une section")
+    parser.add_argument("--period", help="acquisitions d'une période seulement (« 2024-2025 », "
+                                         "« depuis Mars 2025 », « MS » = année de MS de chaque élève)")
+    parser.add_argument("--domain", help="limiter à un domaine")
+    parser.add_argument("--below", type=float, metavar="TAUX",
+                        help="lister les compétences acquises par moins de TAUX (0-1) des élèves")
+    parser.add_argument("--csv", help="CSV des taux par compétence")
+    parser.add_argument("--pupils-csv", help="CSV de progression par élève")
+    parser.add_argument("--pptx", help="diapo de synthèse")
+    args = parser.parse_args(argv)
+
+    try:
+        matrix = ClassMatrix.load(args.projects, Referential.from_file(args.competences), args.period)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"{matrix.n_pupils} élève(s), {len(matrix.referential)} compétence(s)"
+          + (f", {matrix.unmatched} hors référentiel" if matrix.unmatched else ""))
+    for d, rate in matrix.group_rates("domain", args.at, args.section).items():
+        if not args.domain or normalize_name(d) == normalize_name(args.domain):
+            print(f"  {d}: {_fmt_rate(rate)}")
+    if args.below is not None:
+        for (d, sd, text), rate in matrix.below(args.below, args.at, args.section, args.domain):
+            print(f"  {rate:6.1%}  {sd} / {text}")
+    if args.csv:
+        write_competences_csv(args.csv, matrix, args.at)
+    if args.pupils_csv:
+        write_pupils_csv(args.pupils_csv, matrix, args.at)
+    if args.pptx:
+        save_summary_pptx(args.pptx, matrix, args.at, args.section,
+                          args.below if args.below is not None else DEFAULT_THRESHOLD)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
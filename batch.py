@@ -0,0 +1,238 @@
+"""
+Export PowerPoint en lot, avec reprise et saut des élèves inchangés.
+
+Un manifeste (<sortie>/batch-manifest.json) note pour chaque projet l'empreinte de
+ses entrées, le livret produit et l'état (running, done, failed). Il est réécrit
+après chaque élève: une exécution interrompue reprend où elle s'était arrêtée, et un
+élève dont les entrées n'ont pas changé depuis son dernier livret n'est pas refait.
+Un projet illisible est noté failed, avec son erreur, sans arrêter les autres élèves.
+
+Empreinte des entrées: contenu du projet (hors indicateur « à réexporter »),
+référentiel COMPETENCES.txt, thème (DOMAINES.txt, COULEURS_DOMAINES.txt), contenu
+des images (photo, photos de section, images de page, bannières) et options d'export.
+
+Livret: <sortie>/<nom du projet>.pptx. Des projets de même nom dans des dossiers
+différents (eleves/ms-a/x.json, eleves/ms-b/x.json) reçoivent chacun un suffixe tiré
+de leur chemin (x-1f3a9c2e.pptx), stable d'une exécution à l'autre.
+
+    python batch.py eleves/*.json --out livrets/ [--compact] [--workers 4] [--dry-run]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from model import Project
+from theme import DOMAINES_FILE, COULEURS_FILE
+
+MANIFEST_NAME = "batch-manifest.json"
+MANIFEST_FORMAT = 1
+REFERENTIAL_FILE = "COMPETENCES.txt"
+
+_file_hashes = {}   # (chemin, taille, date) -> sha256, pour les images communes (bannières)
+
+
+def file_hash(path):
+    """sha256 du contenu d'un fichier, None s'il est absent."""
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    digest = _file_hashes.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = _file_hashes[key] = h.hexdigest()
+    return digest
+
+
+def project_hash(project):
+    # Contenu canonique: l'indicateur « à réexporter » ne change pas le livret
+    data = project.to_dict()
+    data.pop("export_dirty", None)
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def shared_inputs(base_dir=None):
+    """Empreintes des entrées communes à tous les élèves (référentiel, thème, bannières, version)."""
+    from export_pptx import COVER_BANNERS, EXPORT_FORMAT
+
+    base_dir = base_dir or os.getcwd()
+    return {
+        "referential": file_hash(os.path.join(base_dir, REFERENTIAL_FILE)),
+        "theme": [file_hash(os.path.join(base_dir, DOMAINES_FILE)),
+                  file_hash(os.path.join(base_dir, COULEURS_FILE))],
+        "banners": [file_hash(os.path.join(base_dir, p)) for p in COVER_BANNERS],
+        "export_format": EXPORT_FORMAT,
+    }
+
+
+def input_hash(project, shared, options):
+    images = [file_hash(project.photo_path)]
+    images += [file_hash(section["photo"]) for _, section in sorted(project.sections_data.items())]
+    for key in sorted(project.page_images):
+        images += [file_hash(img["path"]) for img in project.page_images[key]]
+    payload = [project_hash(project), shared, images, options]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def output_path(project_path, out_dir, unique=False):
+    """Livret d'un projet; avec `unique`, nom suffixé par une empreinte du chemin absolu."""
+    stem = os.path.splitext(os.path.basename(project_path))[0]
+    if unique:
+        stem += "-" + hashlib.sha1(os.path.abspath(project_path).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(out_dir, stem + ".pptx")
+
+
+# ==== Manifeste ====
+
+class BatchManifest:
+    """Entrées par projet (chemin absolu): {"hash", "output", "status", "error", "finished"}."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") == MANIFEST_FORMAT:
+                self.entries = data.get("entries", {})
+
+    def reason(self, key, digest, output):
+        """Pourquoi le livret doit être refait (None: à jour)."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return "nouveau"
+        if entry.get("status") == "running":
+            return "interrompu"
+        if entry.get("status") == "failed":
+            return "échec précédent"
+        if entry.get("hash") != digest:
+            return "modifié"
+        if entry.get("output") != output or not os.path.exists(output):
+            return "livret absent"
+        return None
+
+    def set(self, key, **fields):
+        self.entries.setdefault(key, {}).update(fields)
+        self.save()
+
+    def save(self):
+        # Point de reprise: écriture atomique après chaque changement d'état
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"format": MANIFEST_FORMAT, "entries": self.entries}, f, indent=1, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+# ==== Export ====
+
+def export_one(project_path, out_path, compact=False):
+    """Exporte un projet (processus du pool) et efface son indicateur « à réexporter »."""
+    from export_pptx import PptxExporter
+    from render import PilTextMeasurer
+
+    project = Project.load(project_path)
+    exporter = PptxExporter(project, PilTextMeasurer(), compact=compact)
+    exporter.save(out_path)
+    if project.export_dirty:
+        project.export_dirty = False
+        project.save(project_path)
+    return exporter.rebuilt, exporter.reused
+
+
+def plan(paths, out_dir, manifest, compact=False):
+    """
+    Projets à (re)faire: ([(chemin, clé, empreinte, livret, raison)],
+    [(chemin, clé, livret, erreur)] des projets illisibles, qui n'arrêtent pas le lot).
+    """
+    shared = shared_inputs()
+    options = {"compact": bool(compact)}
+    # Un projet donné deux fois n'est exporté qu'une fois
+    paths = list({os.path.abspath(p): p for p in paths}.values())
+    # Noms de fichier partagés par plusieurs projets: livrets suffixés, jamais écrits en même temps
+    names = Counter(output_path(p, out_dir) for p in paths)
+    todo = []
+    unreadable = []
+    for path in paths:
+        key = os.path.abspath(path)
+        out = os.path.abspath(output_path(path, out_dir, unique=names[output_path(path, out_dir)] > 1))
+        try:
+            digest = input_hash(Project.load(path), shared, options)
+        except Exception as e:
+            # Projet corrompu ou en cours d'écriture: échec de cet élève seulement
+            unreadable.append((path, key, out, f"{type(e).__name__}: {e}"))
+            continue
+        reason = manifest.reason(key, digest, out)
+        if reason is not None:
+            todo.append((path, key, digest, out, reason))
+    return todo, unreadable
+
+
+def run_batch(paths, out_dir, compact=False, workers=1, dry_run=False, log=print):
+    """
+    Exporte les projets `paths` dans `out_dir` en sautant ceux qui sont à jour.
+    Retourne (refaits, sautés, échecs).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = BatchManifest(os.path.join(out_dir, MANIFEST_NAME))
+    todo, unreadable = plan(paths, out_dir, manifest, compact)
+    skipped = len({os.path.abspath(p) for p in paths}) - len(todo) - len(unreadable)
+    for path, key, out, error in unreadable:
+        log(f"{path}: illisible ({error})")
+        if not dry_run:
+            manifest.entries[key] = {"hash": None, "output": out, "status": "failed", "error": error}
+    if dry_run:
+        for path, _, _, _, reason in todo:
+            log(f"{path}: à refaire ({reason})")
+        return len(todo), skipped, len(unreadable)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {}
+        for path, key, digest, out, _ in todo:
+            manifest.entries[key] = {"hash": digest, "output": out, "status": "running", "error": None}
+            futures[pool.submit(export_one, path, out, compact)] = (path, key)
+        manifest.save()
+        for future in as_completed(futures):
+            path, key = futures[future]
+            try:
+                rebuilt, reused = future.result()
+            except Exception as e:
+                failed += 1
+                manifest.set(key, status="failed", error=f"{type(e).__name__}: {e}")
+                log(f"{path}: échec ({e})")
+                continue
+            manifest.set(key, status="done", finished=time.strftime("%Y-%m-%dT%H:%M:%S"))
+            log(f"{path}: {rebuilt} diapo(s) regénérée(s), {reused} reprise(s)")
+    return len(todo) - failed, skipped, failed + len(unreadable)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export PowerPoint en lot, avec reprise après interruption.")
+    parser.add_argument("projects", nargs="+", help="fichiers projet .json")
+    parser.add_argument("--out", required=True, help="dossier des livrets (et du manifeste)")
+    parser.add_argument("--compact", action="store_true", help="export compact (une zone de texte par sous-domaine)")
+    parser.add_argument("--workers", type=int, default=1, help="processus d'export en parallèle")
+    parser.add_argument("--dry-run", action="store_true", help="liste les livrets à refaire sans rien exporter")
+    args = parser.parse_args(argv)
+
+    done, skipped, failed = run_batch(args.projects, args.out, args.compact, args.workers, args.dry_run)
+    verb = "à refaire" if args.dry_run else "refait(s)"
+    print(f"{done} livret(s) {verb}, {skipped} à jour, {failed} échec(s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Empreinte mémoire d'une école chargée dans un seul processus (lots, fusion, statistiques).
+
+Charge N élèves (fichiers projet donnés, ou élèves synthétiques tirés de
+COMPETENCES.txt), les pagine et mesure la mémoire allouée (tracemalloc) pour:
+- « avant »: représentation d'origine reproduite ici (objets à __dict__, chaînes
+  dupliquées par élève, entrées de page en tuples nus);
+- « après »: modèle actuel (CompetenceItem/DomainState à __slots__, chaînes
+  partagées, PageEntry et entêtes partagés).
+
+    python benchmarks/bench_memory.py [eleves/*.json] [--pupils 300] [--items 80]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from layout import paginate  # noqa: E402
+from model import Project, parse_competences_file  # noqa: E402
+
+MONTHS_TS = ["Septembre 2024", "Octobre 2024", "Janvier 2025", "Mars 2025", "Juin 2025"]
+
+
+# ==== Représentation d'origine (référence « avant ») ====
+
+class LegacyDomainState:
+    def __init__(self, name, color):
+        self.name = name
+        self.color = color
+        self.font_body = ("Arial", 12)
+
+
+class LegacyItem:
+    def __init__(self, domain, subdomain, text, ts=None, batch_id=None):
+        self.domain = domain
+        self.subdomain = subdomain
+        self.text = text
+        self.ts = ts
+        self.batch_id = batch_id
+
+
+def load_legacy(data, pages_of):
+    # Comme l'ancien Project.from_dict: copies simples des chaînes lues, une par élève
+    available = {d: {sd: list(lst) for sd, lst in submap.items()} for d, submap in data["available"].items()}
+    states = {d: LegacyDomainState(d, v["color"]) for d, v in data["domains"].items()}
+    items = [LegacyItem(*tup) for tup in data["selected"]]
+    by_key = {(it.domain, it.subdomain or "", it.text): it for it in items}
+    # Mêmes pages que le modèle actuel, en tuples nus (is_header, sd, item)
+    pages = {d: [[(e.is_header, e.subdomain, by_key[e.item.key()] if e.item else None) for e in page]
+                 for page in dpages] for d, dpages in pages_of.items()}
+    return available, states, items, pages
+
+
+# ==== Données ====
+
+def wrap_text(text, max_width_px, font):
+    # Mesure approchée (7 px par caractère): la mémoire ne dépend pas de la police
+    per_line = max(1, max_width_px // 7)
+    return [text[i:i + per_line] for i in range(0, len(text), per_line)] or [""]
+
+
+def synthetic_documents(count, items, competences_path, seed=1):
+    """Projets JSON (chaînes) d'élèves synthétiques, comme des fichiers lus un par un."""
+    available, domain_order = parse_competences_file(competences_path)
+    keys = [(d, sd, c) for d in domain_order for sd, comps in available[d].items() for c in comps]
+    rnd = random.Random(seed)
+    docs = []
+    for n in range(count):
+        project = Project()
+        project.available, project.domain_order = available, domain_order
+        project.nom, project.prenom = f"ELEVE{n}", "Prénom"
+        chosen = rnd.sample(keys, min(items, len(keys)))
+        for batch, ts in enumerate(MONTHS_TS, start=1):
+            project.add_competences(chosen[batch - 1::len(MONTHS_TS)], ts, batch_id=batch)
+        docs.append(json.dumps(project.to_dict(), ensure_ascii=False))
+    return docs
+
+
+def measure(build):
+    """Mémoire encore allouée (octets) une fois `build()` terminé et son résultat gardé."""
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Empreinte mémoire du modèle pour une école entière.")
+    parser.add_argument("projects", nargs="*", help="fichiers projet .json (défaut: élèves synthétiques)")
+    parser.add_argument("--pupils", type=int, default=300, help="élèves synthétiques")
+    parser.add_argument("--items", type=int, default=80, help="compétences par élève synthétique")
+    parser.add_argument("--competences-file", default=os.path.join(ROOT, "COMPETENCES.txt"))
+    args = parser.parse_args(argv)
+
+    if args.projects:
+        docs = []
+        for path in args.projects:
+            with open(path, "r", encoding="utf-8") as f:
+                docs.append(f.read())
+    else:
+        docs = synthetic_documents(args.pupils, args.items, args.competences_file)
+
+    def current():
+        school = []
+        for doc in docs:
+            p = Project.from_dict(json.loads(doc))
+            pages, _, _ = paginate(p.selected_items, p.domain_order, p.domain_states,
+                                   p.prenom, wrap_text, (900, 520))
+            school.append((p, pages))
+        return school
+
+    # Pages de référence calculées hors mesure: seule la représentation compte
+    reference = [paginate(p.selected_items, p.domain_order, p.domain_states, p.prenom, wrap_text, (900, 520))[0]
+                 for p in (Project.from_dict(json.loads(doc)) for doc in docs)]
+
+    def legacy():
+        return [load_legacy(json.loads(doc), pages) for doc, pages in zip(docs, reference)]
+
+    before = measure(legacy)
+    after = measure(current)
+    count = len(docs)
+    items = sum(len(json.loads(doc)["selected"]) for doc in docs)
+    print(f"{count} élève(s), {items} compétence(s)")
+    for label, size in (("avant", before), ("après", after)):
+        print(f"  {label:6s} {size / 2**20:8.2f} Mo  ({size / count / 1024:6.1f} Ko par élève)")
+    print(f"  gain   {(1 - after / before) * 100:7.1f} %")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Budget de démarrage de l'interface.
+
+Mesure, dans des processus neufs:
+- le temps d'import d'Interface (python -X importtime), avec les modules les plus coûteux;
+- les modules lourds chargés trop tôt (python-pptx, lxml, pont PIL/Tk, NumPy);
+- si un écran est disponible, le temps jusqu'à la première fenêtre affichée.
+
+    python benchmarks/bench_startup.py [--runs 5] [--budget-ms 120] [--window-budget-ms 1500]
+
+Code de sortie 1 si un budget est dépassé ou si un module différé est importé au démarrage.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules qui ne doivent être chargés qu'à la première utilisation
+DEFERRED_MODULES = ("pptx", "lxml", "PIL.ImageTk", "numpy", "export_pptx", "export_html", "analytics",
+                    "diagnostics")
+
+WINDOW_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import tkinter as tk
+import Interface
+root = tk.Tk()
+app = Interface.CompetenceApp(root)
+root.update()
+print(f"{(time.perf_counter() - t0) * 1000:.1f}")
+root.destroy()
+"""
+
+
+def import_profile():
+    """(temps cumulé d'import d'Interface en ms, {module: cumul ms}) pour un processus neuf."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import Interface"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        modules[name] = int(cumulative_us) / 1000.0
+    return modules.get("Interface", 0.0), modules
+
+
+def window_time():
+    # Temps jusqu'à la première fenêtre (None sans écran)
+    proc = subprocess.run([sys.executable, "-c", WINDOW_SNIPPET], cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Budget de temps de démarrage de l'interface.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=120.0, help="budget d'import d'Interface")
+    parser.add_argument("--window-budget-ms", type=float, default=1500.0, help="budget jusqu'à la première fenêtre")
+    parser.add_argument("--top", type=int, default=10, help="modules les plus coûteux affichés")
+    args = parser.parse_args(argv)
+
+    totals = []
+    profile = {}
+    for _ in range(args.runs):
+        total, profile = import_profile()
+        totals.append(total)
+    median = statistics.median(totals)
+    ok = median <= args.budget_ms
+
+    print(f"import Interface: médiane {median:.1f} ms sur {args.runs} run(s) (budget {args.budget_ms:.0f} ms)")
+    top_level = {name: ms for name, ms in profile.items() if name != "Interface" and "." not in name}
+    for name, ms in sorted(top_level.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    loaded = [m for m in DEFERRED_MODULES if m in profile]
+    if loaded:
+        ok = False
+        print("modules différés importés au démarrage: " + ", ".join(loaded))
+
+    window = window_time()
+    if window is None:
+        print("première fenêtre: non mesurée (pas d'écran)")
+    else:
+        print(f"première fenêtre: {window:.1f} ms (budget {args.window_budget_ms:.0f} ms)")
+        ok = ok and window <= args.window_budget_ms
+
+    print("OK" if ok else "BUDGET DÉPASSÉ")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Validation groupée: mêmes compétences, même date, pour plusieurs élèves.
+
+Chaque projet reçoit les compétences choisies en un lot, sans doublon (règle de
+l'interface), et est marqué « à réexporter » (Project.export_dirty). L'écriture se
+fait en deux temps: tous les projets modifiés sont d'abord écrits dans des fichiers
+temporaires, puis remplacés ensemble; au moindre échec d'écriture aucun projet
+n'est modifié.
+
+    python bulk.py eleves/*.json --date "Mars 2025" \\
+        --competence "EXPLORER LE MONDE/SE REPÉRER DANS LE TEMPS/se repère dans la matinée"
+"""
+import argparse
+import os
+import sys
+
+from model import Project, parse_competences_file, parse_timestamp
+
+
+class BulkResult:
+    """Résultat par projet: compétences ajoutées, déjà présentes."""
+
+    def __init__(self):
+        self.added = {}       # path -> [CompetenceItem]
+        self.skipped = {}     # path -> nombre de compétences déjà validées
+
+    @property
+    def changed(self):
+        return [path for path, items in self.added.items() if items]
+
+    def __str__(self):
+        total = sum(len(items) for items in self.added.values())
+        return (f"{total} compétence(s) ajoutée(s) dans {len(self.changed)} projet(s) "
+                f"sur {len(self.added)}, {sum(self.skipped.values())} déjà validée(s)")
+
+
+def referential_keys(available, domain_order):
+    """Toutes les compétences du référentiel: [(domain, subdomain, text)] dans l'ordre du fichier."""
+    return [(d, sd, text) for d in domain_order for sd, comps in available.get(d, {}).items() for text in comps]
+
+
+def check_competences(keys, available):
+    # Compétences inconnues du référentiel: erreur plutôt qu'un ajout silencieux
+    unknown = [k for k in keys if k[2] not in available.get(k[0], {}).get(k[1], [])]
+    if unknown:
+        raise ValueError("Compétence(s) absente(s) du référentiel: "
+                         + "; ".join(" / ".join(k) for k in unknown))
+
+
+def save_projects(projects):
+    """
+    Enregistre {path: Project} en un seul lot: écriture de tous les fichiers temporaires,
+    puis remplacement. Si une écriture échoue, les temporaires sont supprimés et aucun
+    projet n'est touché.
+    """
+    written = []
+    try:
+        for path, project in projects.items():
+            written.append((project.write_temp(path), path))
+    except BaseException:
+        for tmp, _ in written:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        raise
+    for tmp, path in written:
+        os.replace(tmp, path)
+
+
+def bulk_add(paths, keys, ts, available=None, dry_run=False):
+    """
+    Ajoute `keys` [(domain, subdomain, text)] datées `ts` ("Mois Année") aux projets `paths`.
+    `available` (référentiel) sert à vérifier les compétences. Retourne un BulkResult.
+    """
+    if parse_timestamp(ts) is None:
+        raise ValueError(f"Date illisible: {ts!r} (attendu « Mois Année »)")
+    keys = list(keys)
+    if available is not None:
+        check_competences(keys, available)
+
+    result = BulkResult()
+    modified = {}
+    for path in paths:
+        project = Project.load(path)
+        added = project.add_competences(keys, ts)
+        result.added[path] = added
+        result.skipped[path] = len(keys) - len(added)
+        if added:
+            modified[path] = project
+    if modified and not dry_run:
+        save_projects(modified)
+    return result
+
+
+def dirty_projects(paths):
+    """Projets modifiés depuis leur dernier export PowerPoint."""
+    return [path for path in paths if Project.load(path).export_dirty]
+
+
+def parse_key(spec):
+    # "DOMAINE/SOUS-DOMAINE/intitulé" (sous-domaine vide: celui du domaine)
+    parts = spec.split("/", 2)
+    if len(parts) != 3:
+        raise argparse.ArgumentTypeError(f"attendu DOMAINE/SOUS-DOMAINE/intitulé: {spec!r}")
+    domain, sub, text = (p.strip() for p in parts)
+    return domain, sub or domain, text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validation groupée de compétences pour plusieurs élèves.")
+    parser.add_argument("projects", nargs="+", help="fichiers projet .json")
+    parser.add_argument("--date", help="horodatage « Mois Année »")
+    parser.add_argument("--competence", action="append", type=parse_key, default=[],
+                        metavar="DOMAINE/SOUS-DOMAINE/INTITULÉ")
+    parser.add_argument("--competences-file", default="COMPETENCES.txt", help="référentiel (COMPETENCES.txt)")
+    parser.add_argument("--dry-run", action="store_true", help="n'écrit rien")
+    parser.add_argument("--list-dirty", action="store_true", help="lister les livrets à réexporter")
+    args = parser.parse_args(argv)
+
+    if args.list_dirty:
+        for path in dirty_projects(args.projects):
+            print(path)
+        return 0
+    if not args.date or not args.competence:
+        parser.error("indiquer --date et au moins une --competence")
+
+    available, _ = parse_competences_file(args.competences_file)
+    try:
+        result = bulk_add(args.projects, args.competence, args.date, available, dry_run=args.dry_run)
+    except ValueError as e:
+        parser.exit(2, f"{e}\n")
+    for path in args.projects:
+        print(f"{path}: +{len(result.added[path])}")
+    print(result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
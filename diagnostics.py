@@ -0,0 +1,294 @@
+"""
+Diagnostic de réactivité de l'interface (mode optionnel: python Interface.py --diagnostics).
+
+- Chaque rappel Tk (commande de bouton, événement lié: <B1-Motion>, <Configure>,
+  <<TreeviewSelect>>..., rappel after()) est chronométré: l'enveloppe des rappels
+  de tkinter (tkinter.CallWrapper) est remplacée avant la construction des widgets.
+- Un battement after() régulier mesure les blocages de la boucle principale: retard
+  au-delà de l'intervalle prévu, attribué à l'interaction en cours.
+- Les fonctions coûteuses connues (mesure du texte, pagination, dessins, décodage
+  d'images, arbres) sont comptées et chronométrées par interaction: une interaction
+  est un rappel d'événement et tout le travail qui le suit jusqu'au suivant
+  (redessin différé compris).
+- Un petit panneau affiche ces données; la trace JSON se joint aux rapports d'anomalie.
+"""
+import json
+import platform
+import sys
+import time
+import tkinter as tk
+from collections import deque
+from tkinter import ttk, filedialog
+
+HEARTBEAT_MS = 50
+STALL_MS = 100              # retard du battement compté comme blocage
+SAMPLES_MAX = 1000          # durées gardées par rappel (percentiles)
+HISTORY_MAX = 500           # interactions et blocages gardés dans la trace
+PANEL_REFRESH_MS = 1000
+TRACE_FORMAT = 1
+
+
+def summarize(values):
+    """{count, mean, p50, p95, max} en ms (None si aucune mesure)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    n = len(ordered)
+    return {
+        "count": n,
+        "mean": round(sum(ordered) / n, 2),
+        "p50": round(ordered[n // 2], 2),
+        "p95": round(ordered[min(n - 1, int(n * 0.95))], 2),
+        "max": round(ordered[-1], 2),
+    }
+
+
+def deferred_target(func):
+    """Cible d'un rappel after() (tkinter l'enveloppe dans une fonction interne), sinon None."""
+    code = getattr(func, "__code__", None)
+    if code is None or not func.__qualname__.startswith("Misc.after"):
+        return None
+    try:
+        return func.__closure__[code.co_freevars.index("func")].cell_contents
+    except (ValueError, TypeError, IndexError):
+        return None
+
+
+def callback_name(func, args):
+    """Nom lisible d'un rappel: méthode qualifiée, et type d'événement s'il y en a un."""
+    name = getattr(func, "__qualname__", None) or repr(func)
+    if args and isinstance(args[0], tk.Event):
+        event = args[0]
+        kind = getattr(event.type, "name", None) or str(event.type)
+        name = f"{name} <{kind}>"
+    return name
+
+
+class Interaction:
+    __slots__ = ("name", "start", "duration_ms", "counters", "sections_ms")
+
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start
+        self.duration_ms = 0.0
+        self.counters = {}          # nom -> appels (wrap, redraw:pages, decode...)
+        self.sections_ms = {}       # nom -> ms cumulées
+
+    def to_dict(self, origin):
+        return {"name": self.name, "t": round(self.start - origin, 3), "ms": round(self.duration_ms, 2),
+                "counters": self.counters, "sections_ms": {k: round(v, 2) for k, v in self.sections_ms.items()}}
+
+
+class Diagnostics:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.callbacks = {}         # nom -> deque(durées ms)
+        self.sections = {}          # nom -> deque(durées ms)
+        self.counters = {}          # nom -> total
+        self.interactions = deque(maxlen=HISTORY_MAX)
+        self.stalls = deque(maxlen=HISTORY_MAX)
+        self.current = None         # Interaction en cours
+        self.root = None
+        self.app = None
+        self._depth = 0             # rappels imbriqués (fenêtre modale, update())
+        self._beat_due = None
+        self._panel = None
+
+    # ---- Mesures ----
+
+    def _samples(self, table, name):
+        samples = table.get(name)
+        if samples is None:
+            samples = table[name] = deque(maxlen=SAMPLES_MAX)
+        return samples
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+        if self.current is not None:
+            self.current.counters[name] = self.current.counters.get(name, 0) + n
+
+    def run_callback(self, func, args):
+        """Exécute un rappel Tk en le chronométrant."""
+        target = deferred_target(func)
+        name = "after: " + callback_name(target, ()) if target is not None else callback_name(func, args)
+        start = time.perf_counter()
+        outer = self._depth == 0
+        if outer and target is None:
+            # Commande ou événement: nouvelle interaction. Les rappels after() (redessins
+            # différés, miniatures) restent rattachés à l'interaction qui les a demandés.
+            self.current = Interaction(name, start)
+            self.interactions.append(self.current)
+        self._depth += 1
+        try:
+            return func(*args)
+        finally:
+            self._depth -= 1
+            elapsed = (time.perf_counter() - start) * 1000
+            self._samples(self.callbacks, name).append(elapsed)
+            if outer and self.current is not None:
+                self.current.duration_ms += elapsed
+
+    def instrument(self, obj, attr, name=None):
+        """
+        Remplace obj.attr (ou obj[attr] pour un dictionnaire) par une version comptée et
+        chronométrée (section `name`).
+        """
+        mapping = isinstance(obj, dict)
+        func = obj[attr] if mapping else getattr(obj, attr)
+        name = name or attr
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = (time.perf_counter() - start) * 1000
+                self._samples(self.sections, name).append(elapsed)
+                self.count(name)
+                if self.current is not None:
+                    self.current.sections_ms[name] = self.current.sections_ms.get(name, 0.0) + elapsed
+
+        if mapping:
+            obj[attr] = timed
+        else:
+            setattr(obj, attr, timed)
+
+    # ---- Battement (blocages de la boucle) ----
+
+    def _beat(self):
+        now = time.perf_counter()
+        if self._beat_due is not None:
+            lag_ms = (now - self._beat_due) * 1000
+            if lag_ms >= STALL_MS:
+                during = self.current.name if self.current is not None else None
+                self.stalls.append({"t": round(now - self.origin, 3), "lag_ms": round(lag_ms, 1),
+                                    "during": during})
+        self._beat_due = time.perf_counter() + HEARTBEAT_MS / 1000
+        self.root.after(HEARTBEAT_MS, self._beat)
+
+    # ---- Installation ----
+
+    def install_tk(self):
+        """À appeler avant la création des widgets: chronomètre tous les rappels Tk."""
+        diagnostics = self
+
+        class TimedCallWrapper(tk.CallWrapper):
+            def __call__(self, *args):
+                try:
+                    if self.subst:
+                        args = self.subst(*args)
+                    if deferred_target(self.func) == diagnostics._beat:
+                        return self.func(*args)
+                    return diagnostics.run_callback(self.func, args)
+                except SystemExit:
+                    raise
+                except BaseException:
+                    self.widget._report_exception()
+
+        tk.CallWrapper = TimedCallWrapper
+
+    def attach(self, app):
+        """Instrumente l'application et lance le battement."""
+        self.root = app.root
+        self.app = app
+        for attr, name in (("_wrap_text_uncached", "wrap"),
+                           ("refresh_selected_tree", "selected_tree"), ("build_available_tree", "available_tree"),
+                           ("_render_next_thumbnail", "thumbnail")):
+            self.instrument(app, attr, name)
+        # Pagination: app._rebuild_pages est déjà retenu par le planificateur (redraw:pages);
+        # layout.paginate est relu dans le module de l'application à chaque appel
+        self.instrument(sys.modules[type(app).__module__], "paginate")
+        # Redessins: les travaux du planificateur, par partie
+        for part in list(app.scheduler.handlers):
+            self.instrument(app.scheduler.handlers, part, f"redraw:{part}")
+        self.instrument(app.image_cache, "_decode", "decode")
+        self.root.after(HEARTBEAT_MS, self._beat)
+        self.root.bind_all("<F12>", lambda e: self.show_panel())
+
+    # ---- Trace ----
+
+    def trace(self):
+        return {
+            "format": TRACE_FORMAT,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "uptime_s": round(time.perf_counter() - self.origin, 1),
+            "python": sys.version.split()[0],
+            "tk": tk.TkVersion,
+            "platform": platform.platform(),
+            "callbacks": {name: summarize(v) for name, v in self.callbacks.items()},
+            "sections": {name: summarize(v) for name, v in self.sections.items()},
+            "counters": dict(self.counters),
+            "stalls": list(self.stalls),
+            "interactions": [i.to_dict(self.origin) for i in self.interactions],
+            "scheduler": self.app.scheduler.stats(),
+            "image_cache": {"used_mb": round(self.app.image_cache.used_bytes / 2**20, 1),
+                            "hits": self.app.image_cache.hits, "misses": self.app.image_cache.misses,
+                            "evictions": self.app.image_cache.evictions},
+        }
+
+    def save_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.trace(), f, indent=1, ensure_ascii=False)
+
+    def reset(self):
+        self.callbacks.clear()
+        self.sections.clear()
+        self.counters.clear()
+        self.interactions.clear()
+        self.stalls.clear()
+        self.current = None
+
+    # ---- Panneau ----
+
+    def show_panel(self):
+        if self._panel is not None and self._panel.winfo_exists():
+            self._panel.lift()
+            return
+        top = self._panel = tk.Toplevel(self.root)
+        top.title("Diagnostic de réactivité")
+        top.geometry("760x520")
+        self._summary_var = tk.StringVar()
+        ttk.Label(top, textvariable=self._summary_var, justify="left").pack(fill="x", padx=8, pady=6)
+
+        columns = ("count", "mean", "p95", "max")
+        tree = self._tree = ttk.Treeview(top, columns=columns, show="tree headings")
+        tree.heading("#0", text="Rappel / section")
+        tree.column("#0", width=380)
+        for col, label in zip(columns, ("Appels", "Moyenne (ms)", "p95 (ms)", "Max (ms)")):
+            tree.heading(col, text=label)
+            tree.column(col, width=80, anchor="e")
+        tree.pack(fill="both", expand=True, padx=8)
+
+        btns = ttk.Frame(top)
+        btns.pack(fill="x", padx=8, pady=6)
+        ttk.Button(btns, text="Enregistrer la trace JSON", command=self._save_dialog).pack(side="right", padx=4)
+        ttk.Button(btns, text="Remettre à zéro", command=self.reset).pack(side="right", padx=4)
+        self._refresh_panel()
+
+    def _save_dialog(self):
+        path = filedialog.asksaveasfilename(parent=self._panel, title="Trace de diagnostic",
+                                            defaultextension=".json", filetypes=[("JSON", "*.json")],
+                                            initialfile="diagnostic.json")
+        if path:
+            self.save_trace(path)
+
+    def _refresh_panel(self):
+        if self._panel is None or not self._panel.winfo_exists():
+            return
+        worst = max(self.stalls, key=lambda s: s["lag_ms"], default=None)
+        last = self.interactions[-1] if self.interactions else None
+        lines = [f"Blocages (> {STALL_MS} ms): {len(self.stalls)}"
+                 + (f", pire {worst['lag_ms']:.0f} ms pendant {worst['during']}" if worst else "")]
+        if last is not None:
+            counters = ", ".join(f"{k}: {v}" for k, v in sorted(last.counters.items())) or "aucun travail"
+            lines.append(f"Dernière interaction: {last.name} ({last.duration_ms:.1f} ms) — {counters}")
+        self._summary_var.set("\n".join(lines))
+
+        tree = self._tree
+        tree.delete(*tree.get_children())
+        for title, table in (("Rappels Tk", self.callbacks), ("Sections", self.sections)):
+            parent = tree.insert("", "end", text=title, open=True)
+            stats = [(name, summarize(v)) for name, v in table.items()]
+            for name, s in sorted(stats, key=lambda kv: kv[1]["max"], reverse=True):
+                tree.insert(parent, "end", text=name, values=(s["count"], s["mean"], s["p95"], s["max"]))
+        self._panel.after(PANEL_REFRESH_MS, self._refresh_panel)
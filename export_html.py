@@ -0,0 +1,295 @@
+"""
+Export HTML statique du livret, léger et lisible sur téléphone.
+
+Mêmes contenus que l'export PowerPoint: page de garde (informations, photo, sections),
+pages de domaine (bandeau coloré avec la description de DOMAINES.txt, entêtes de
+sous-domaine, bandeaux de date, compétences, images de page) et bilans de synthèse.
+Le texte suit la largeur de l'écran au lieu d'être paginé.
+
+Deux sorties:
+- dossier: index.html + img/ avec chaque image en plusieurs largeurs (srcset,
+  chargement différé); les dérivés déjà présents ne sont pas recalculés;
+- fichier .html unique: une seule largeur par image, intégrée en base64.
+
+    python export_html.py projet.json --out livret/         (dossier)
+    python export_html.py projet.json --out livret.html     (fichier unique)
+"""
+import argparse
+import base64
+import hashlib
+import html
+import io
+import os
+import sys
+
+from PIL import Image, ImageOps
+
+from model import Project, SECTION_KEYS, SECTION_LABELS, SECTION_FIELDS
+from layout import group_items
+from templates import personalize
+from theme import load_theme
+from periods import parse_period, filter_project
+
+# Largeurs des dérivés (px) en sortie dossier; le fichier unique n'en garde qu'une
+IMAGE_WIDTHS = (320, 640, 1280)
+SINGLE_FILE_WIDTH = 640
+JPEG_QUALITY = 78
+IMG_DIR = "img"
+BANNER_TOP = os.path.join("img", "banniere-top.png")
+
+STYLE = """
+:root{--c:#444;font-family:system-ui,-apple-system,"Segoe UI",Roboto,Arial,sans-serif;color:#222;line-height:1.4}
+body{margin:0;background:#f4f4f4}
+main{max-width:48rem;margin:0 auto;background:#fff}
+section{padding:0 1rem 1rem;border-bottom:1px solid #ddd}
+img{max-width:100%;height:auto;display:block}
+.top{width:100%}
+.infos{background:#9bbb59;color:#fff;padding:.8rem 1rem;border-radius:.4rem;display:flex;gap:1rem;align-items:flex-start;margin-top:1rem}
+.infos p{margin:.1rem 0;font-weight:bold}
+.infos img{max-width:7rem;margin-left:auto;border-radius:.3rem}
+.sections{display:grid;grid-template-columns:repeat(auto-fit,minmax(9rem,1fr));gap:.8rem;margin-top:1rem}
+.sections h3{font-size:.9rem;margin:.2rem 0}
+.sections p{font-size:.8rem;margin:0}
+.banner{background:var(--c);color:#fff;margin:0 -1rem 1rem;padding:.8rem 1rem}
+.banner h2{margin:0;font-size:1.2rem}
+.banner p{margin:.3rem 0 0;font-size:.8rem}
+h3.sub{font-size:1rem;text-decoration:underline;margin:1rem 0 .3rem}
+.band{display:inline-block;background:#eee;font-size:.75rem;padding:.05rem .5rem;margin:.4rem 0 .1rem;border-radius:.2rem}
+ul{margin:.2rem 0;padding-left:1.2rem}
+li{margin:.15rem 0}
+.gallery{display:grid;grid-template-columns:repeat(auto-fit,minmax(10rem,1fr));gap:.5rem;margin-top:1rem}
+.synthesis h2{background:#f00;color:#000;text-align:center;font-weight:normal;margin:0 -1rem;padding:.6rem}
+.synthesis h3{text-align:center;font-weight:normal}
+.bilan{border:1px solid #ccc;border-radius:.3rem;padding:.6rem;margin:.6rem 0}
+.bilan h4{margin:0 0 .3rem}
+@media print{
+ body{background:#fff}
+ main{max-width:none}
+ section{border:0;break-before:page;padding:0}
+ section:first-child{break-before:auto}
+ .banner,.synthesis h2,.infos,.band{-webkit-print-color-adjust:exact;print-color-adjust:exact}
+ .banner{margin:0 0 1rem}
+ li,.bilan,figure{break-inside:avoid}
+ .gallery img{max-height:8cm;width:auto}
+}
+"""
+
+
+def _e(text):
+    return html.escape(text or "")
+
+
+class HtmlExporter:
+    """
+    `out` de save(): un dossier (index.html + dérivés d'images) ou un fichier .html
+    autonome.
+    """
+
+    def __init__(self, project, theme=None, widths=IMAGE_WIDTHS):
+        self.project = project
+        self.theme = theme or load_theme()
+        self.widths = tuple(sorted(widths))
+        self._single_file = False
+        self._out_dir = None
+        self._images = {}   # chemin source -> balise <img> déjà produite (sans alt/classe)
+
+    def save(self, out):
+        """Écrit le livret; retourne le chemin du fichier HTML."""
+        self._single_file = out.lower().endswith((".html", ".htm"))
+        if self._single_file:
+            path = out
+        else:
+            self._out_dir = out
+            os.makedirs(os.path.join(out, IMG_DIR), exist_ok=True)
+            path = os.path.join(out, "index.html")
+        self._images = {}
+        document = self.render()
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(document)
+        os.replace(tmp, path)
+        return path
+
+    # ---- Document ----
+
+    def render(self):
+        p = self.project
+        title = " ".join(filter(None, (p.prenom.strip(), p.nom.strip()))) or "Livret"
+        body = [self.cover_html()]
+        body += [self.domain_html(d, submap) for d, submap in group_items(p.selected_items, p.domain_order).items()
+                 if submap]
+        body += [self.synthesis_html(key) for key in SECTION_KEYS if p.sections_data[key]["completed"]]
+        return ("<!DOCTYPE html>\n<html lang=\"fr\"><head><meta charset=\"utf-8\">"
+                "<meta name=\"viewport\" content=\"width=device-width,initial-scale=1\">"
+                f"<title>{_e(title)}</title><style>{STYLE.strip()}</style></head>\n"
+                "<body><main>\n" + "\n".join(body) + "\n</main></body></html>\n")
+
+    def cover_html(self):
+        p = self.project
+        parts = ["<section class=\"cover\">"]
+        if os.path.exists(BANNER_TOP):
+            parts.append(self.image_tag(BANNER_TOP, "", css_class="top", lazy=False, sizes="48rem"))
+        lines = [("Nom", p.nom), ("Prénom", p.prenom), ("Date de naissance", p.naissance)]
+        infos = "".join(f"<p>{label}: {_e(value.strip())}</p>" for label, value in lines if value.strip())
+        photo = self.image_tag(p.photo_path, "Photo", lazy=False, sizes="7rem") if p.photo_path else ""
+        parts.append(f"<div class=\"infos\"><div>{infos}</div>{photo}</div>")
+
+        parts.append("<div class=\"sections\">")
+        for key in SECTION_KEYS:
+            section = p.sections_data[key]
+            fields = "".join(f"<p>{_e(label)}: {_e(section['fields'].get(name, '').strip())}</p>"
+                             for name, label in SECTION_FIELDS.items() if section["fields"].get(name, "").strip())
+            photo = self.image_tag(section["photo"], SECTION_LABELS[key], sizes="12rem") if section["photo"] else ""
+            parts.append(f"<div><h3>{_e(SECTION_LABELS[key])}</h3>{fields}{photo}</div>")
+        parts.append("</div></section>")
+        return "\n".join(parts)
+
+    def domain_html(self, domain, submap):
+        p = self.project
+        ds = p.domain_states.get(domain)
+        color = ds.color if ds else "#444444"
+        parts = [f"<section class=\"domain\" style=\"--c:{_e(color)}\">",
+                 f"<header class=\"banner\"><h2>{_e(domain)}</h2>"]
+        description = self.theme.description(domain)
+        if description:
+            parts.append(f"<p>{_e(description)}</p>")
+        parts.append("</header>")
+
+        for sd, items in submap.items():
+            sub_color = self.theme.subdomain_color(domain, sd, color)
+            parts.append(f"<h3 class=\"sub\" style=\"color:{_e(sub_color)}\">{_e(sd)}</h3>")
+            # Bandeau de date à chaque changement d'horodatage, comme sur les diapos
+            last_ts = None
+            in_list = False
+            for it in items:
+                ts = (it.ts or "").strip()
+                if ts and ts != last_ts:
+                    if in_list:
+                        parts.append("</ul>")
+                        in_list = False
+                    parts.append(f"<p class=\"band\">{_e(ts)}</p>")
+                    last_ts = ts
+                if not in_list:
+                    parts.append("<ul>")
+                    in_list = True
+                line = personalize(p.prenom, it.text, p.genre).lstrip("• ")
+                parts.append(f"<li>{_e(line)}</li>")
+            if in_list:
+                parts.append("</ul>")
+
+        images = [img for (d, _), lst in sorted(p.page_images.items(), key=lambda kv: kv[0][1])
+                  if d == domain for img in lst]
+        if images:
+            parts.append("<div class=\"gallery\">")
+            parts += [self.image_tag(img["path"], "", sizes="(max-width:48rem) 50vw, 24rem") for img in images]
+            parts.append("</div>")
+        parts.append("</section>")
+        return "\n".join(parts)
+
+    def synthesis_html(self, key):
+        section = self.project.sections_data[key]
+        bilans = [section["bilan1"]]
+        if section["bilan2_enabled"]:
+            bilans.append(section["bilan2"])
+        parts = ["<section class=\"synthesis\"><h2>Synthèse</h2>",
+                 f"<h3>{_e(SECTION_LABELS.get(key, key))}</h3>"]
+        for text in bilans:
+            paragraphs = "".join(f"<p>{_e(line)}</p>" for line in (text or "").strip().splitlines() if line.strip())
+            parts.append(f"<div class=\"bilan\"><h4>Bilan</h4>{paragraphs}</div>")
+        parts.append("</section>")
+        return "\n".join(parts)
+
+    # ---- Images ----
+
+    def image_tag(self, path, alt, css_class=None, lazy=True, sizes="100vw"):
+        """<img> avec ses dérivés (srcset) ou intégrée (fichier unique); "" si illisible."""
+        if not path or not os.path.exists(path):
+            return ""
+        tag = self._images.get(path)
+        if tag is None:
+            try:
+                tag = self._inline_image(path) if self._single_file else self._image_variants(path)
+            except OSError:
+                tag = ""
+            self._images[path] = tag
+        if not tag:
+            return ""
+        if not self._single_file:
+            tag += f" sizes=\"{sizes}\""
+        attrs = f" alt=\"{_e(alt)}\"" + (f" class=\"{css_class}\"" if css_class else "")
+        attrs += " loading=\"lazy\" decoding=\"async\"" if lazy else ""
+        return f"<img {tag}{attrs}>"
+
+    @staticmethod
+    def _open(path):
+        with Image.open(path) as src:
+            # Copie redressée selon l'orientation EXIF (photos de téléphone)
+            im = ImageOps.exif_transpose(src)
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if "transparency" in im.info or im.mode in ("LA", "PA") else "RGB")
+        return im
+
+    @staticmethod
+    def _encode(im, width):
+        # Redimensionne à `width` (sans agrandir); JPEG sauf transparence (PNG)
+        if im.width > width:
+            im = im.resize((width, max(1, round(im.height * width / im.width))), Image.LANCZOS)
+        buf = io.BytesIO()
+        if im.mode == "RGBA":
+            im.save(buf, "PNG", optimize=True)
+            return buf.getvalue(), "png", im.size
+        im.save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        return buf.getvalue(), "jpeg", im.size
+
+    def _image_variants(self, path):
+        st = os.stat(path)
+        key = hashlib.sha1(f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8")).hexdigest()[:10]
+        stem = os.path.splitext(os.path.basename(path))[0][:40]
+        im = None
+        srcset = []
+        size = None
+        for width in self.widths:
+            existing = [n for n in (f"{stem}-{key}-{width}.jpg", f"{stem}-{key}-{width}.png")
+                        if os.path.exists(os.path.join(self._out_dir, IMG_DIR, n))]
+            if existing:
+                name = existing[0]
+                with Image.open(os.path.join(self._out_dir, IMG_DIR, name)) as done:
+                    out_size = done.size
+            else:
+                if im is None:
+                    im = self._open(path)
+                data, fmt, out_size = self._encode(im, width)
+                name = f"{stem}-{key}-{width}.{'jpg' if fmt == 'jpeg' else 'png'}"
+                with open(os.path.join(self._out_dir, IMG_DIR, name), "wb") as f:
+                    f.write(data)
+            srcset.append(f"{IMG_DIR}/{name} {out_size[0]}w")
+            size = out_size
+            if out_size[0] < width:
+                break   # image source plus petite: les largeurs suivantes seraient identiques
+        w, h = size
+        return f"src=\"{srcset[min(1, len(srcset) - 1)].split(' ')[0]}\" srcset=\"{', '.join(srcset)}\" width=\"{w}\" height=\"{h}\""
+
+    def _inline_image(self, path):
+        data, fmt, (w, h) = self._encode(self._open(path), SINGLE_FILE_WIDTH)
+        return f"src=\"data:image/{fmt};base64,{base64.b64encode(data).decode('ascii')}\" width=\"{w}\" height=\"{h}\""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export HTML statique d'un livret (téléphone, impression).")
+    parser.add_argument("project", help="fichier projet .json")
+    parser.add_argument("--out", required=True, help="dossier de sortie, ou fichier .html unique")
+    parser.add_argument("--period", help="compétences d'une période seulement "
+                                         "(« depuis Mars 2025 », « 2024-2025 », « MS »...)")
+    args = parser.parse_args(argv)
+    project = Project.load(args.project)
+    try:
+        period = parse_period(args.period, project.sections_data)
+    except ValueError as e:
+        parser.error(str(e))
+    path = HtmlExporter(filter_project(project, period)).save(args.out)
+    print(f"{path}: {os.path.getsize(path) // 1024} Ko")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,832 @@
+"""
+Export PowerPoint du livret, indépendant de Tk.
+
+Construit la présentation d'un projet (model.Project) à partir de la mise en page
+partagée (layout.domain_slides) et du thème (theme.load_theme). L'interface l'utilise
+avec sa mesure de texte Tk et la taille réelle de son aperçu; les traitements sans
+écran utilisent render.PilTextMeasurer.
+
+Deux sorties pour les pages de domaine:
+- classique: une zone de texte par entête, par bandeau de date (plus un rectangle)
+  et par compétence;
+- compacte: une seule zone de texte par suite de blocs d'un même sous-domaine,
+  bandeaux de date en paragraphes surlignés; beaucoup moins de formes, positions
+  toujours issues de la pagination.
+
+Réexport incrémental: chaque diapo a une empreinte de contenu (éléments et positions
+de la pagination, style du domaine, thème, images avec taille et date de fichier).
+Les empreintes sont notées à côté du fichier (<livret>.pptx.manifest.json); au
+réexport, les diapos dont l'empreinte n'a pas changé sont reprises telles quelles de
+l'ancien fichier (pptx_package.transplant_slides), seules les autres sont reconstruites.
+
+Pages de domaine en parallèle (save(workers=N)): une fois la pagination faite, les
+domaines sont indépendants. Chaque domaine à reconstruire est construit dans un
+processus de travail (petite présentation ne contenant que ses diapos, images
+comprises), puis ses diapos sont insérées à leur place dans le livret, comme les
+diapos reprises. Le démarrage du pool coûte plus que ce qu'il fait gagner sur un
+livret ordinaire: l'interface exporte en séquentiel (workers=1).
+"""
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Inches, Pt
+from pptx.dml.color import RGBColor
+from pptx.enum.text import PP_PARAGRAPH_ALIGNMENT
+from pptx.enum.shapes import MSO_SHAPE
+from pptx.enum.dml import MSO_THEME_COLOR
+from pptx.oxml.ns import qn
+
+from model import SECTION_KEYS, SECTION_LABELS, SECTION_FIELDS
+from layout import (
+    PREVIEW_WIDTH, PREVIEW_HEIGHT, BANNER_DESC_FONT_PT, BANNER_DESC_TOP_IN,
+    preview_metrics, paginate, domain_slides, banner_desc_height_in, content_box_in, block_top,
+)
+from render import find_image_variant
+from pptx_package import (
+    DEFAULT_LEVEL, PackageReport, read_package, write_package, package_size, optimize_parts,
+    slide_part_names, transplant_slides,
+)
+from theme import load_theme
+
+DEFAULT_TITLE_SIZE_PT = 20
+DEFAULT_BODY_SIZE_PT = 12
+DEFAULT_SUBHEADER_BOLD = True
+DEFAULT_SUBHEADER_UNDERLINE = True
+COVER_HEADER_COLOR = "#6e6e6e"
+DATE_BAND_SIZE_PT = 10
+# Hauteur de ligne PowerPoint (interligne simple) rapportée à la taille de police
+LINE_HEIGHT_FACTOR = 1.2
+
+WHITE = RGBColor(255, 255, 255)
+BLACK = RGBColor(0, 0, 0)
+
+# À incrémenter quand le rendu d'une diapo change: invalide toutes les empreintes
+EXPORT_FORMAT = 2
+MANIFEST_SUFFIX = ".manifest.json"
+# En dessous, lancer des processus coûte plus que construire les diapos sur place
+PARALLEL_MIN_SLIDES = 8
+COVER_BANNERS = (
+    os.path.join("img", "banniere-top.png"),
+    os.path.join("img", "banniere-bas.png"),
+    os.path.join("img", "banniere-bas.jpg"),
+    os.path.join("img", "banniere-bas.jpeg"),
+)
+
+
+def file_signature(path):
+    """(chemin, taille, date) d'un fichier repris dans une diapo; None s'il est absent."""
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_size, st.st_mtime_ns)
+
+
+def _digest(parts):
+    return hashlib.sha1(repr((EXPORT_FORMAT,) + tuple(parts)).encode("utf-8")).hexdigest()
+
+
+def manifest_path(path):
+    return path + MANIFEST_SUFFIX
+
+
+def read_manifest(path):
+    """
+    Empreintes des diapos du livret `path` dans l'ordre, ou None si le manifeste est
+    absent, illisible ou ne correspond plus au fichier (modifié hors de l'application).
+    """
+    try:
+        with open(manifest_path(path), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        st = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    if (manifest.get("format") != EXPORT_FORMAT or manifest.get("size") != st.st_size
+            or manifest.get("mtime_ns") != st.st_mtime_ns):
+        return None
+    return manifest.get("slides")
+
+
+def build_domain_fragment(project, theme, canvas_size, compact, slide_layouts, banners):
+    """
+    Processus de travail: présentation (octets .pptx) des diapos `slide_layouts` d'un
+    domaine. La pagination et les bandeaux (`banners`: {domaine: BannerLayout}) sont
+    déjà calculés: aucune mesure de texte n'est nécessaire ici.
+    """
+    exporter = PptxExporter(project, None, canvas_size, theme, compact)
+    exporter.banner_layouts = banners
+    prs = Presentation()
+    for slide_layout in slide_layouts:
+        exporter.build_domain_slide(prs, slide_layout)
+    buf = io.BytesIO()
+    prs.save(buf)
+    return buf.getvalue()
+
+
+def write_manifest(path, fingerprints):
+    st = os.stat(path)
+    data = {"format": EXPORT_FORMAT, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "slides": list(fingerprints)}
+    with open(manifest_path(path), "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+
+
+class PptxExporter:
+    """
+    `measurer` fournit wrap_text(text, max_width_px, font_tuple); `domain_page_map` peut
+    être passé s'il est déjà calculé (interface), sinon la pagination est refaite.
+    """
+
+    def __init__(self, project, measurer, canvas_size=None, theme=None, compact=False,
+                 domain_page_map=None):
+        self.project = project
+        self.measurer = measurer
+        self.canvas_size = canvas_size or project.preview_size or (PREVIEW_WIDTH, PREVIEW_HEIGHT)
+        self.theme = theme or load_theme()
+        self.compact = compact
+        self.domain_page_map = domain_page_map
+        self._is_cover_export = False
+        # Bandeaux déjà calculés par le processus principal (export parallèle)
+        self.banner_layouts = {}
+        # Bilan du dernier save(): diapos reconstruites / reprises de l'ancien fichier
+        self.rebuilt = 0
+        self.reused = 0
+
+    def domain_slides(self):
+        p = self.project
+        if self.domain_page_map is None:
+            self.domain_page_map, _, _ = paginate(p.selected_items, p.domain_order, p.domain_states,
+                                                  p.prenom, self.measurer.wrap_text, self.canvas_size, p.genre)
+        return domain_slides(self.domain_page_map, p.domain_order, p.domain_states,
+                             p.prenom, self.measurer.wrap_text, self.canvas_size, p.genre)
+
+    def slide_plan(self):
+        """
+        [(empreinte, construction(prs), DomainSlide ou None)] pour chaque diapo, dans
+        l'ordre du livret.
+        """
+        plan = [(self.cover_fingerprint(), self._build_cover, None)]
+        # Pages domaines
+        for slide_layout in self.domain_slides():
+            plan.append((self.domain_fingerprint(slide_layout),
+                         lambda prs, sl=slide_layout: self.build_domain_slide(prs, sl), slide_layout))
+        # Diapos "Synthèse" par SECTION complétée
+        for key in SECTION_KEYS:
+            if self.project.sections_data[key]["completed"]:
+                plan.append((self.synthesis_fingerprint(key),
+                             lambda prs, k=key: self.build_section_synthesis_slide(prs, k), None))
+        return plan
+
+    def _build_cover(self, prs):
+        self._is_cover_export = True
+        try:
+            self.build_cover_slide(prs)
+        finally:
+            self._is_cover_export = False
+
+    def build(self, plan=None, reuse=()):
+        """
+        Construit la présentation. Les diapos d'indice dans `reuse` restent vides: elles
+        seront remplacées par celles de l'ancien fichier ou d'un processus de travail.
+        """
+        prs = Presentation()
+        for i, (_, build_slide, _) in enumerate(plan or self.slide_plan()):
+            if i in reuse:
+                prs.slides.add_slide(prs.slide_layouts[6])
+            else:
+                build_slide(prs)
+        return prs
+
+    def save(self, path, optimize=True, level=DEFAULT_LEVEL, incremental=True, workers=1):
+        """
+        Enregistre le livret. Avec `incremental`, les diapos inchangées depuis le dernier
+        export vers `path` sont reprises de ce fichier. Avec `workers` > 1, les pages de
+        domaine à reconstruire sont construites dans des processus, un domaine par tâche.
+        Par défaut le fichier est allégé (pptx_package). Retourne le PackageReport de
+        l'optimisation, ou None.
+        """
+        plan = self.slide_plan()
+        fingerprints = [fp for fp, _, _ in plan]
+        previous = read_manifest(path) if incremental and os.path.exists(path) else None
+        old_index = {fp: i for i, fp in enumerate(previous or [])}
+        reuse = {i: old_index[fp] for i, fp in enumerate(fingerprints) if fp in old_index}
+        self.reused = len(reuse)
+        self.rebuilt = len(plan) - self.reused
+
+        fragments = self._start_fragments(plan, reuse, workers)
+        prs = self.build(plan, reuse.keys() | {i for group in fragments for i in group})
+        if not optimize and not reuse and not fragments:
+            prs.save(path)
+            write_manifest(path, fingerprints)
+            return None
+
+        buf = io.BytesIO()
+        prs.save(buf)
+        parts = read_package(buf)
+        if reuse:
+            old_parts = read_package(path)
+            new_names = slide_part_names(parts)
+            old_names = slide_part_names(old_parts)
+            transplant_slides(parts, old_parts, {new_names[i]: old_names[j] for i, j in reuse.items()})
+        if fragments:
+            new_names = slide_part_names(parts)
+            for group, future in fragments.items():
+                fragment = read_package(io.BytesIO(future.result()))
+                transplant_slides(parts, fragment, dict(zip((new_names[i] for i in group),
+                                                            slide_part_names(fragment))))
+        # Taille avant optimisation du livret assemblé, écrit comme write_package: même
+        # mesure quelle que soit la façon dont les diapos ont été construites
+        bytes_before = package_size(parts, level) if optimize else None
+        removed, merged = optimize_parts(parts) if optimize else ([], 0)
+        write_package(parts, path, level)
+        write_manifest(path, fingerprints)
+        if not optimize:
+            return None
+        return PackageReport(bytes_before, os.path.getsize(path), removed, merged)
+
+    def _start_fragments(self, plan, reuse, workers):
+        """
+        Lance la construction parallèle des pages de domaine à reconstruire:
+        {(indices des diapos d'un domaine): Future des octets du fragment}.
+        """
+        todo = [(i, layout) for i, (_, _, layout) in enumerate(plan) if layout is not None and i not in reuse]
+        if workers <= 1 or len(todo) < PARALLEL_MIN_SLIDES:
+            return {}
+        groups = [list(g) for _, g in groupby(todo, key=lambda entry: entry[1].domain)]
+        if len(groups) < 2:
+            return {}
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(groups)))
+        try:
+            fragments = {}
+            for group in groups:
+                domain = group[0][1].domain
+                # Le bandeau dépend de la mesure de texte (Tk dans l'interface): calculé ici
+                banner = self.theme.banner(domain, self.measurer.wrap_text, self.canvas_size)
+                fragments[tuple(i for i, _ in group)] = pool.submit(
+                    build_domain_fragment, self.project, self.theme, self.canvas_size, self.compact,
+                    [layout for _, layout in group], {domain: banner})
+            return fragments
+        finally:
+            # Les tâches soumises continuent; le pool se ferme quand elles sont finies
+            pool.shutdown(wait=False)
+
+    # ---- Empreintes ----
+
+    def cover_fingerprint(self):
+        p = self.project
+        sections = [(key, p.sections_data[key]["completed"], repr(p.sections_data[key]["fields"]),
+                     file_signature(p.sections_data[key]["photo"])) for key in SECTION_KEYS]
+        banners = [file_signature(find_image_variant(COVER_BANNERS[0]))]
+        banners += [file_signature(path) for path in COVER_BANNERS[1:]]
+        return _digest(["cover", p.nom, p.prenom, p.naissance, file_signature(p.photo_path),
+                        sections, banners, self.theme.signature])
+
+    def domain_fingerprint(self, slide_layout):
+        d = slide_layout.domain
+        ds = self.project.domain_states[d]
+        blocks = [(b.kind, b.y_px, b.text, tuple(b.lines)) for b in slide_layout.blocks]
+        images = []
+        if slide_layout.first_for_page:
+            for img in self.project.page_images.get((d, slide_layout.page_index), []):
+                images.append((file_signature(img["path"]), tuple(img["pos"]), tuple(img["size"])))
+        return _digest(["domain", d, ds.color, tuple(ds.font_body), self.theme.signature,
+                        tuple(self.canvas_size), self.compact, blocks, images])
+
+    def synthesis_fingerprint(self, key):
+        section = self.project.sections_data[key]
+        return _digest(["synthesis", key, section["bilan1"], section["bilan2"],
+                        bool(section["bilan2_enabled"])])
+
+    # ---- Pages de domaine ----
+
+    def build_domain_slide(self, prs, slide_layout):
+        d = slide_layout.domain
+        ds = self.project.domain_states[d]
+        slide = prs.slides.add_slide(prs.slide_layouts[6])  # blanc
+
+        # Bandeau domaine dynamique (description du thème)
+        banner_h = self.add_domain_banner(slide, prs, d, ds.color)
+
+        # Zone de contenu
+        left_in, top_in, width_in, height_in = content_box_in(banner_h.inches)
+        geometry = (left_in, top_in, width_in, height_in)
+        if self.compact:
+            self._add_compact_blocks(slide, slide_layout, ds, geometry)
+        else:
+            self._add_blocks(slide, slide_layout, ds, geometry)
+
+        # Exporter images de la première diapo de cette page d'aperçu uniquement
+        if slide_layout.first_for_page:
+            self.export_page_images(slide, prs, d, slide_layout.page_index)
+        return slide
+
+    def _subheader_color(self, domain, ds, sub):
+        return self.theme.rgb_color(self.theme.subdomain_color(domain, sub, ds.color))
+
+    def _add_blocks(self, slide, slide_layout, ds, geometry):
+        # Sortie classique: une forme par bloc
+        d = slide_layout.domain
+        left_in, top_in, width_in, height_in = geometry
+        left = Inches(left_in)
+        width = Inches(width_in)
+        body_font_size = ds.font_body[1]
+        _, content_h_px, _ = preview_metrics(self.canvas_size)
+
+        for block in slide_layout.blocks:
+            top = Inches(block_top(block.y_px, self.canvas_size, top_in, height_in))
+            if block.kind == "header":
+                # Titre sous-domaine
+                tb = slide.shapes.add_textbox(left, top, width, Inches(0.4))
+                tf = tb.text_frame
+                tf.clear()
+                p = tf.paragraphs[0]
+                p.text = block.text
+                p.font.size = Pt(DEFAULT_BODY_SIZE_PT + 1)
+                p.font.bold = DEFAULT_SUBHEADER_BOLD
+                p.font.underline = DEFAULT_SUBHEADER_UNDERLINE
+                p.font.color.rgb = self._subheader_color(d, ds, block.text)
+            elif block.kind == "band":
+                # Bandeau date
+                self._add_band_shape(slide, left, top, width)
+                tb = slide.shapes.add_textbox(left, top, width, Inches(0.28))
+                tf = tb.text_frame
+                tf.clear()
+                p = tf.paragraphs[0]
+                p.text = block.text
+                p.alignment = PP_PARAGRAPH_ALIGNMENT.CENTER
+                p.font.size = Pt(DATE_BAND_SIZE_PT)
+                p.font.bold = False
+                p.font.color.rgb = WHITE
+            else:
+                # Texte de la compétence
+                bullet_h = max(Inches(0.3), Inches(block.h_px / content_h_px * height_in))
+                tb = slide.shapes.add_textbox(left + Inches(0.2), top, width - Inches(0.2), bullet_h)
+                tf = tb.text_frame
+                tf.clear()
+                for li, line in enumerate(block.lines):
+                    p = tf.paragraphs[0] if li == 0 else tf.add_paragraph()
+                    p.text = line
+                    p.font.size = Pt(body_font_size)
+                    p.font.bold = False
+                    p.font.color.rgb = BLACK
+                    if li == 0:
+                        p.level = 0
+
+    @staticmethod
+    def _add_band_shape(slide, left, top, width):
+        # Fond noir d'un bandeau de date (pleine largeur, comme dans l'aperçu)
+        band_shape = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, left, top, width, Inches(0.28))
+        band_shape.fill.solid()
+        band_shape.fill.fore_color.rgb = BLACK
+        try:
+            band_shape.line.fill.background()
+        except Exception:
+            pass
+        return band_shape
+
+    @staticmethod
+    def _shade_band_run(run, size):
+        """
+        Bandeau de date dans le texte: texte blanc surligné de noir (<a:highlight>) et
+        cerné de noir (<a:ln>), lisible aussi dans les lecteurs qui ignorent le surlignage.
+        """
+        run.font.size = Pt(size)
+        run.font.color.rgb = WHITE
+        rPr = run._r.get_or_add_rPr()
+        ln = rPr.makeelement(qn("a:ln"), {"w": str(Pt(0.75))})
+        fill = ln.makeelement(qn("a:solidFill"), {})
+        fill.append(fill.makeelement(qn("a:srgbClr"), {"val": "000000"}))
+        ln.append(fill)
+        rPr.insert(0, ln)       # <a:ln> précède les autres propriétés du run
+        highlight = rPr.makeelement(qn("a:highlight"), {})
+        highlight.append(highlight.makeelement(qn("a:srgbClr"), {"val": "000000"}))
+        rPr.insert_element_before(highlight, "a:uLnTx", "a:uLn", "a:uFillTx", "a:uFill", "a:latin",
+                                  "a:ea", "a:cs", "a:sym", "a:hlinkClick", "a:hlinkMouseOver",
+                                  "a:rtl", "a:extLst")
+
+    def _add_compact_blocks(self, slide, slide_layout, ds, geometry):
+        """
+        Sortie compacte: chaque suite de blocs d'un même sous-domaine devient une seule
+        zone de texte, bandeaux de date compris (_shade_band_run). L'espace avant chaque
+        paragraphe recale son ordonnée sur celle que donne la pagination.
+        """
+        d = slide_layout.domain
+        left_in, top_in, width_in, height_in = geometry
+        runs = []
+        for block in slide_layout.blocks:
+            if block.kind == "header" or not runs:
+                runs.append([])
+            runs[-1].append(block)
+
+        def top_pt(block):
+            return block_top(block.y_px, self.canvas_size, top_in, height_in) * 72.0
+
+        _, content_h_px, _ = preview_metrics(self.canvas_size)
+        body_font_size = ds.font_body[1]
+        indent = Inches(0.2)
+        for run in runs:
+            first_top = top_pt(run[0])
+            last = run[-1]
+            bottom = top_pt(last) + last.h_px / content_h_px * height_in * 72.0
+            tb = slide.shapes.add_textbox(Inches(left_in), Pt(first_top), Inches(width_in),
+                                          Pt(max(bottom - first_top, 0.3 * 72.0)))
+            tf = tb.text_frame
+            tf.clear()
+            # même marge haute que les zones individuelles: le premier paragraphe part de first_top
+            cursor = first_top
+            first = True
+            for block in run:
+                if block.kind == "header":
+                    lines, size = [block.text], DEFAULT_BODY_SIZE_PT + 1
+                elif block.kind == "band":
+                    lines, size = [block.text], DATE_BAND_SIZE_PT
+                else:
+                    lines, size = block.lines, body_font_size
+                for li, line in enumerate(lines):
+                    p = tf.paragraphs[0] if first else tf.add_paragraph()
+                    first = False
+                    if li == 0:
+                        target = top_pt(block)
+                        if target > cursor:
+                            p.space_before = Pt(target - cursor)
+                            cursor = target
+                    p.text = line
+                    p.font.size = Pt(size)
+                    if block.kind == "header":
+                        p.font.bold = DEFAULT_SUBHEADER_BOLD
+                        p.font.underline = DEFAULT_SUBHEADER_UNDERLINE
+                        p.font.color.rgb = self._subheader_color(d, ds, block.text)
+                    elif block.kind == "band":
+                        p.alignment = PP_PARAGRAPH_ALIGNMENT.CENTER
+                        p.font.bold = False
+                        p.font.color.rgb = WHITE
+                        self._shade_band_run(p.runs[0], size)
+                    else:
+                        p.font.bold = False
+                        p.font.color.rgb = BLACK
+                        p._p.get_or_add_pPr().set("marL", str(int(indent)))
+                    cursor += size * LINE_HEIGHT_FACTOR
+
+    # ---- Couverture ----
+
+    def build_cover_slide(self, prs):
+        proj = self.project
+        slide = prs.slides.add_slide(prs.slide_layouts[6])  # blanc
+
+        sw = prs.slide_width
+        sh = prs.slide_height
+        margin = Inches(0.6)
+
+        # Bannière top (image si dispo)
+        top_path = find_image_variant(os.path.join("img", "banniere-top.png"))
+        used_banner_h = Inches(0.8)
+        if top_path and os.path.exists(top_path):
+            try:
+                pic = slide.shapes.add_picture(top_path, Inches(0), Inches(0), width=sw)
+                used_banner_h = pic.height
+            except Exception:
+                rect = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(0), Inches(0), sw, Inches(0.8))
+                rect.fill.solid()
+                rect.fill.fore_color.rgb = self.theme.rgb_color(COVER_HEADER_COLOR)
+                rect.line.fill.background()
+                tb = slide.shapes.add_textbox(Inches(0), Inches(0), sw, Inches(0.8))
+                tf = tb.text_frame
+                tf.clear()
+                p = tf.paragraphs[0]
+                p.text = "PROFIL DE L'ELEVE"
+                p.font.size = Pt(28)
+                p.font.bold = True
+                p.font.color.rgb = WHITE
+                p.alignment = PP_PARAGRAPH_ALIGNMENT.CENTER
+                used_banner_h = Inches(0.8)
+        else:
+            rect = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(0), Inches(0), sw, Inches(0.8))
+            rect.fill.solid()
+            rect.fill.fore_color.rgb = self.theme.rgb_color(COVER_HEADER_COLOR)
+            rect.line.fill.background()
+            tb = slide.shapes.add_textbox(Inches(0), Inches(0), sw, Inches(0.8))
+            tf = tb.text_frame
+            tf.clear()
+            p = tf.paragraphs[0]
+            p.text = "PROFIL DE L'ELEVE"
+            p.font.size = Pt(28)
+            p.font.bold = True
+            p.font.color.rgb = WHITE
+            p.alignment = PP_PARAGRAPH_ALIGNMENT.CENTER
+            used_banner_h = Inches(0.8)
+
+        content_top = used_banner_h + Inches(0.15)
+
+        # Colonne principale: fond olive + infos personnelles
+        left_left = margin
+        left_w = sw - 2 * margin
+        left_top = content_top
+        left_h = Inches(1.8)
+
+        rect_bg = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, left_left, left_top, left_w, left_h)
+        rect_bg.fill.solid()
+        rect_bg.fill.fore_color.theme_color = MSO_THEME_COLOR.ACCENT_3
+        rect_bg.line.fill.background()
+
+        tb2 = slide.shapes.add_textbox(left_left + Inches(0.15), left_top + Inches(0.12), left_w - Inches(0.3), left_h - Inches(0.24))
+        tf2 = tb2.text_frame
+        tf2.clear()
+        lines = []
+        if proj.nom.strip():
+            lines.append(f"Nom: {proj.nom.strip()}")
+        if proj.prenom.strip():
+            lines.append(f"Prénom: {proj.prenom.strip()}")
+        if proj.naissance.strip():
+            lines.append(f"Date de naissance: {proj.naissance.strip()}")
+
+        first = True
+        for line in lines:
+            if first:
+                p = tf2.paragraphs[0]
+                p.text = line
+                first = False
+            else:
+                p = tf2.add_paragraph()
+                p.text = line
+            p.font.size = Pt(14)
+            p.font.bold = True
+            p.font.color.rgb = WHITE
+
+        # Photo élève (en haut à droite)
+        if proj.photo_path and os.path.exists(proj.photo_path):
+            try:
+                max_photo_h = Inches(1.4)
+                pic = slide.shapes.add_picture(proj.photo_path, Inches(0), Inches(0), height=max_photo_h)
+                pic.left = left_left + left_w - pic.width - Inches(0.2)
+                pic.top = left_top + Inches(0.2)
+            except Exception:
+                pass
+
+        # Présentation HORIZONTALE des sections
+        row_top = left_top + left_h + Inches(0.2)
+        col_count = len(SECTION_KEYS)
+        if col_count < 1:
+            self.add_bottom_banner(slide, prs)
+            return
+        col_w = (sw - 2 * margin) / col_count
+        col_text_h = Inches(1.0)
+        col_photo_h = Inches(1.6)
+
+        for idx, key in enumerate(SECTION_KEYS):
+            col_left = margin + col_w * idx
+            section_title = SECTION_LABELS[key]
+            fields = proj.sections_data[key]["fields"]
+
+            # Bloc titre + 3 lignes
+            tb = slide.shapes.add_textbox(col_left, row_top, col_w, col_text_h)
+            tf = tb.text_frame
+            tf.clear()
+            p = tf.paragraphs[0]
+            p.text = section_title
+            p.font.bold = True
+            p.font.size = Pt(12)
+
+            for fname, flabel in SECTION_FIELDS.items():
+                val = fields.get(fname, "").strip()
+                if not val:
+                    continue
+                sp = tf.add_paragraph()
+                sp.text = f"{flabel}: {val}"
+                sp.level = 1
+                sp.font.size = Pt(10)
+
+            # Emplacement photo sous le bloc texte
+            ph_top = row_top + col_text_h + Inches(0.05)
+            ph_w = col_w
+            ph_h = col_photo_h
+
+            ph_rect = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, col_left, ph_top, ph_w, ph_h)
+            ph_rect.fill.solid()
+            ph_rect.fill.fore_color.rgb = RGBColor(245, 245, 245)
+            ph_rect.line.fill.background()
+
+            sec_photo = proj.sections_data[key]["photo"]
+            if sec_photo and os.path.exists(sec_photo):
+                try:
+                    with Image.open(sec_photo) as im:
+                        iw, ih = im.size
+                        box_w = ph_w
+                        box_h = ph_h
+                        img_ratio = iw / ih if ih else 1.0
+                        box_ratio = box_w / box_h if box_h else 1.0
+                        if img_ratio >= box_ratio:
+                            pic = slide.shapes.add_picture(sec_photo, col_left, ph_top, width=box_w)
+                            pic.top = ph_top + (box_h - pic.height) // 2
+                        else:
+                            pic = slide.shapes.add_picture(sec_photo, col_left, ph_top, height=box_h)
+                            pic.left = col_left + (box_w - pic.width) // 2
+                except Exception:
+                    pass
+
+        self.add_bottom_banner(slide, prs)
+
+    def add_domain_banner(self, slide, prs, domain_name, color_hex):
+        """
+        Crée le bandeau supérieur de domaine (rectangle coloré + titre + description).
+        Le bandeau s'AGRANDIT automatiquement pour que la description ne déborde pas.
+        Retourne la hauteur du bandeau.
+        """
+        sw = prs.slide_width
+
+        # Paramètres de mise en page
+        title_left = Inches(0.4)
+        title_top = Inches(0.05)
+        title_height = Inches(0.6)
+        text_width = sw - Inches(0.8)
+        desc_font_pt = BANNER_DESC_FONT_PT
+        desc_top_in = BANNER_DESC_TOP_IN
+
+        # Lignes de description et hauteur pré-calculées par le thème (une fois par domaine)
+        banner = self.banner_layouts.get(domain_name)
+        if banner is None:
+            banner = self.theme.banner(domain_name, self.measurer.wrap_text, self.canvas_size)
+        desc_lines = banner.lines
+        desc_height = Inches(banner_desc_height_in(desc_lines))
+        banner_h = Inches(banner.height_in)
+
+        # Rectangle bandeau
+        rect = slide.shapes.add_shape(
+            MSO_SHAPE.RECTANGLE,
+            Inches(0), Inches(0),
+            sw, banner_h
+        )
+        rect.fill.solid()
+        rect.fill.fore_color.rgb = self.theme.rgb_color(color_hex)
+        rect.line.fill.background()
+
+        # Titre du domaine
+        tb = slide.shapes.add_textbox(
+            title_left, title_top,
+            text_width, title_height
+        )
+        tf = tb.text_frame
+        tf.clear()
+        p = tf.paragraphs[0]
+        p.text = domain_name
+        p.font.size = Pt(DEFAULT_TITLE_SIZE_PT)
+        p.font.bold = True
+        p.font.color.rgb = WHITE
+
+        # Description
+        if desc_lines:
+            desc_tb = slide.shapes.add_textbox(title_left, Inches(desc_top_in), text_width, desc_height)
+            desc_tf = desc_tb.text_frame
+            desc_tf.clear()
+            desc_tf.word_wrap = True
+            first = True
+            for line in desc_lines:
+                if first:
+                    pd = desc_tf.paragraphs[0]
+                    first = False
+                else:
+                    pd = desc_tf.add_paragraph()
+                pd.text = line
+                pd.font.size = Pt(desc_font_pt)
+                pd.font.bold = False
+                pd.alignment = PP_PARAGRAPH_ALIGNMENT.LEFT
+                pd.font.color.rgb = WHITE
+
+        return banner_h
+
+    def export_page_images(self, slide, prs, domain, page_index):
+        # Map coordonnées apercu -> slide pour la page (domain, page_index)
+        key = (domain, page_index)
+
+        sw = prs.slide_width
+        sh = prs.slide_height
+
+        cw, ch = self.canvas_size
+
+        for img in self.project.page_images.get(key, []):
+            lx = int(img["pos"][0] / cw * sw)
+            ly = int(img["pos"][1] / ch * sh)
+            w = int(img["size"][0] / cw * sw)
+            h = int(img["size"][1] / ch * sh)
+            try:
+                if w > 0 and h > 0:
+                    slide.shapes.add_picture(img["path"], lx, ly, width=w, height=h)
+            except Exception:
+                pass
+
+    # ---- Diapo Synthèse par SECTION ----
+
+    def build_section_synthesis_slide(self, prs, key):
+        proj = self.project
+        slide = prs.slides.add_slide(prs.slide_layouts[6])  # blanc
+
+        sw = prs.slide_width
+        sh = prs.slide_height
+
+        # Titre "Synthèse"
+        band_h = Inches(0.8)
+        rect = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(0), Inches(0), sw, band_h)
+        rect.fill.solid()
+        rect.fill.fore_color.rgb = RGBColor(255, 0, 0)  # rouge
+        rect.line.fill.background()
+
+        tb = slide.shapes.add_textbox(Inches(0), Inches(0), sw, band_h)
+        tf = tb.text_frame
+        tf.clear()
+        p = tf.paragraphs[0]
+        p.text = "Synthèse"
+        p.font.size = Pt(20)
+        p.font.bold = False
+        p.font.color.rgb = BLACK
+        p.alignment = PP_PARAGRAPH_ALIGNMENT.CENTER
+
+        # Sous-titre = intitulé de la SECTION
+        subtitle = SECTION_LABELS.get(key, key)
+        tb2 = slide.shapes.add_textbox(Inches(0.6), band_h + Inches(0.2), sw - Inches(1.2), Inches(0.6))
+        tf2 = tb2.text_frame
+        tf2.clear()
+        p2 = tf2.paragraphs[0]
+        p2.text = subtitle
+        p2.font.size = Pt(18)
+        p2.font.bold = False
+        p2.alignment = PP_PARAGRAPH_ALIGNMENT.CENTER
+
+        # Zones de bilans
+        top_content = band_h + Inches(1.0)
+        left = Inches(0.6)
+        width = sw - Inches(1.2)
+        available_h = sh - top_content - Inches(0.9)
+
+        bilan1 = (proj.sections_data[key]["bilan1"] or "").strip()
+        use_bilan2 = bool(proj.sections_data[key]["bilan2_enabled"])
+        bilan2 = (proj.sections_data[key]["bilan2"] or "").strip() if use_bilan2 else ""
+
+        if use_bilan2:
+            box_h = available_h / 2.0 - Inches(0.2)
+            # Bilan 1
+            self._add_bilan_box(slide, left, top_content, width, box_h, "Bilan", bilan1)
+            # Bilan 2
+            self._add_bilan_box(slide, left, top_content + box_h + Inches(0.2), width, box_h, "Bilan", bilan2)
+        else:
+            self._add_bilan_box(slide, left, top_content, width, available_h, "Bilan", bilan1)
+
+    def _add_bilan_box(self, slide, left, top, width, height, title, content):
+        # Titre "Bilan"
+        title_tb = slide.shapes.add_textbox(left, top, width, Inches(0.4))
+        title_tf = title_tb.text_frame
+        title_tf.clear()
+        pt = title_tf.paragraphs[0]
+        pt.text = title
+        pt.font.size = Pt(14)
+        pt.font.bold = True
+        # Contenu
+        text_tb = slide.shapes.add_textbox(left, top + Inches(0.45), width, max(Inches(0.8), height - Inches(0.45)))
+        text_tf = text_tb.text_frame
+        text_tf.clear()
+        text_tf.word_wrap = True
+        if content:
+            lines = content.splitlines()
+            first = True
+            for line in lines:
+                if first:
+                    p = text_tf.paragraphs[0]
+                    p.text = line
+                    first = False
+                else:
+                    p = text_tf.add_paragraph()
+                    p.text = line
+                p.font.size = Pt(12)
+        else:
+            p = text_tf.paragraphs[0]
+            p.text = ""
+            p.font.size = Pt(12)
+
+    # ---- Bannières top/bas utilitaires ----
+
+    def add_bottom_banner(self, slide, prs):
+        # Affichage uniquement sur la page de garde
+        if not getattr(self, "_is_cover_export", False):
+            return
+        # Ajoute une image de bannière en bas si trouvée
+        path_try = [
+            os.path.join("img", "banniere-bas.png"),
+            os.path.join("img", "banniere-bas.jpg"),
+            os.path.join("img", "banniere-bas.jpeg"),
+        ]
+        img_path = next((p for p in path_try if os.path.exists(p)), None)
+        if not img_path:
+            return
+        try:
+            sw = prs.slide_width
+            sh = prs.slide_height
+            pic = slide.shapes.add_picture(img_path, Inches(0), sh - Inches(0.5), width=sw)
+            pic.top = sh - pic.height
+        except Exception:
+            pass
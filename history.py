@@ -0,0 +1,107 @@
+"""
+Historique annuler / rétablir de l'interface.
+
+Chaque action enregistre un pas (annuler, rétablir) dont les fonctions ne capturent
+que ce qui a changé: compétences ajoutées ou retirées avec leur position, ancienne
+et nouvelle position d'une image, état d'une seule section, style d'un domaine...
+La mémoire d'un pas est proportionnelle au changement, pas au livret, ce qui permet
+de garder des centaines de pas.
+"""
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_DEPTH = 500
+
+
+class Step:
+    __slots__ = ("label", "undo", "redo", "merge_key")
+
+    def __init__(self, label, undo, redo, merge_key=None):
+        self.label = label
+        self.undo = undo
+        self.redo = redo
+        self.merge_key = merge_key
+
+
+class History:
+    """
+    Piles annuler / rétablir bornées à `depth` pas (les plus anciens sont oubliés).
+    Les pas enregistrés pendant un annuler/rétablir sont ignorés: les effets de bord
+    de la restauration (traces Tk...) n'entrent pas dans l'historique.
+    """
+
+    def __init__(self, depth=DEFAULT_DEPTH):
+        self._undo = deque(maxlen=depth)
+        self._redo = []
+        self._replaying = False
+        self._can_merge = False
+
+    def record(self, label, undo, redo, merge_key=None):
+        """
+        Enregistre une action déjà appliquée. Deux actions successives de même
+        `merge_key` (frappe dans un même champ) forment un seul pas.
+        """
+        if self._replaying:
+            return
+        self._redo.clear()
+        if (merge_key is not None and self._can_merge and self._undo
+                and self._undo[-1].merge_key == merge_key):
+            self._undo[-1].redo = redo
+            return
+        self._undo.append(Step(label, undo, redo, merge_key))
+        self._can_merge = True
+
+    def undo(self):
+        """Annule le dernier pas; retourne son libellé (None si rien à annuler)."""
+        if not self._undo:
+            return None
+        step = self._undo.pop()
+        self._replay(step.undo)
+        self._redo.append(step)
+        return step.label
+
+    def redo(self):
+        if not self._redo:
+            return None
+        step = self._redo.pop()
+        self._replay(step.redo)
+        self._undo.append(step)
+        return step.label
+
+    def _replay(self, fn):
+        self._can_merge = False
+        self._replaying = True
+        try:
+            fn()
+        finally:
+            self._replaying = False
+
+    @contextmanager
+    def paused(self):
+        """Les actions faites dans ce bloc ne sont pas enregistrées (l'appelant enregistre un seul pas)."""
+        previous = self._replaying
+        self._replaying = True
+        try:
+            yield
+        finally:
+            self._replaying = previous
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._can_merge = False
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo_label(self):
+        return self._undo[-1].label if self._undo else None
+
+    def redo_label(self):
+        return self._redo[-1].label if self._redo else None
+
+    def __len__(self):
+        return len(self._undo)
@@ -0,0 +1,125 @@
+"""
+Mémoire des images de page de l'interface.
+
+Les fiches d'images (page_images) ne gardent que chemin, position et taille; les
+pixels sont tenus ici, sous un budget mémoire:
+- pixels Pillow (image source réduite, puis une copie par taille affichée) dans un
+  cache LRU: une page quittée se reconstruit à la demande, sans relire le disque tant
+  qu'elle tient dans le budget;
+- images Tk (PhotoImage) uniquement pour ce qui est à l'écran (page courante,
+  couverture): retain() libère les autres.
+Les pages voisines sont préchargées (prefetch) en pixels Pillow, sans image Tk.
+"""
+from collections import OrderedDict
+
+from PIL import Image
+
+DEFAULT_BUDGET_MB = 96
+SOURCE_MAX_SIDE = 1600      # image source décodée au plus à cette taille (px)
+
+
+def image_bytes(image):
+    return image.width * image.height * len(image.getbands())
+
+
+def fit_size(size, max_side):
+    """Taille `size` réduite (jamais agrandie) pour tenir dans un carré de `max_side` px."""
+    w, h = size
+    scale = min(1.0, max_side / max(w, h, 1))
+    return max(1, round(w * scale)), max(1, round(h * scale))
+
+
+class PageImageCache:
+    """
+    Pixels des images affichées, sous budget (`budget_mb`). `photo_factory`
+    convertit une image Pillow en image Tk (ImageTk.PhotoImage).
+    Les erreurs de lecture (fichier absent, illisible) sont levées à l'appelant.
+    """
+
+    def __init__(self, photo_factory, budget_mb=DEFAULT_BUDGET_MB):
+        self.photo_factory = photo_factory
+        self.budget = int(budget_mb * 2**20)
+        self._pixels = OrderedDict()    # (chemin, taille|None) -> image Pillow, du moins au plus récent
+        self._photos = {}               # (chemin, taille) -> PhotoImage à l'écran
+        self._pixel_bytes = 0
+        self._photo_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def used_bytes(self):
+        return self._pixel_bytes + self._photo_bytes
+
+    def source(self, path):
+        """Image source, réduite à SOURCE_MAX_SIDE (base de toutes les tailles affichées)."""
+        return self._get((path, None), lambda: self._decode(path))
+
+    def source_size(self, path):
+        return self.source(path).size
+
+    def pixels(self, path, size):
+        size = (int(size[0]), int(size[1]))
+        return self._get((path, size), lambda: self.source(path).resize(size, Image.LANCZOS))
+
+    def photo(self, path, size):
+        """Image Tk de `path` à la taille `size`, gardée jusqu'au prochain retain() qui l'exclut."""
+        key = (path, (int(size[0]), int(size[1])))
+        photo = self._photos.get(key)
+        if photo is None:
+            photo = self._photos[key] = self.photo_factory(self.pixels(*key))
+            # Tk garde sa propre copie des pixels (RGBA)
+            self._photo_bytes += key[1][0] * key[1][1] * 4
+            self._enforce()
+        return photo
+
+    def retain(self, keys):
+        """Libère les images Tk qui ne sont pas dans `keys` [(chemin, taille)]."""
+        keep = {(path, (int(size[0]), int(size[1]))) for path, size in keys}
+        for key in [k for k in self._photos if k not in keep]:
+            del self._photos[key]
+            self._photo_bytes -= key[1][0] * key[1][1] * 4
+        self._enforce()
+
+    def prefetch(self, keys):
+        """Décode à l'avance les pixels de `keys` [(chemin, taille)] (pages voisines)."""
+        for path, size in keys:
+            try:
+                self.pixels(path, size)
+            except Exception:
+                pass    # signalé à l'affichage de la page, s'il a lieu
+
+    def clear(self):
+        self._pixels.clear()
+        self._photos.clear()
+        self._pixel_bytes = self._photo_bytes = 0
+
+    def _decode(self, path):
+        with Image.open(path) as im:
+            # Décodage JPEG réduit directement à la taille utile
+            im.draft("RGB", (SOURCE_MAX_SIDE, SOURCE_MAX_SIDE))
+            alpha = "A" in im.getbands() or "transparency" in im.info
+            image = im.convert("RGBA" if alpha else "RGB")
+        image.thumbnail((SOURCE_MAX_SIDE, SOURCE_MAX_SIDE), Image.LANCZOS)
+        return image
+
+    def _get(self, key, build):
+        image = self._pixels.get(key)
+        if image is not None:
+            self.hits += 1
+            self._pixels.move_to_end(key)
+            return image
+        self.misses += 1
+        image = build()
+        self._pixels[key] = image
+        self._pixel_bytes += image_bytes(image)
+        self._enforce()
+        return image
+
+    def _enforce(self):
+        # Les images Tk à l'écran ne sont jamais évincées; les pixels les plus anciens oui
+        # (on garde toujours le dernier, en cours d'utilisation)
+        while self.used_bytes > self.budget and len(self._pixels) > 1:
+            _, image = self._pixels.popitem(last=False)
+            self._pixel_bytes -= image_bytes(image)
+            self.evictions += 1
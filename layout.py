@@ -0,0 +1,332 @@
+"""
+Mise en page du livret indépendante de Tk.
+
+La pagination simule la hauteur réelle (entêtes, texte wrap, espacements, bandeaux
+de date) dans l'espace en pixels du canevas d'aperçu. La mesure du texte est
+injectée (`wrap_text(text, max_width_px, font_tuple)`) : tkfont dans l'interface,
+Pillow en mode sans écran (voir render.PilTextMeasurer).
+
+Les diapos de domaine produites ici sont consommées à l'identique par l'export
+PowerPoint et par le rendu Pillow (PNG/PDF).
+"""
+import hashlib
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+from model import DomainState, domain_color
+from templates import personalize, wrap_competence
+
+# ==== Géométrie de l'aperçu ====
+
+PREVIEW_WIDTH = 900
+PREVIEW_HEIGHT = 520
+HEADER_HEIGHT = 48
+SUBHEADER_HEIGHT = 22       # hauteur d'un entête de sous-domaine (px d'aperçu)
+DATE_BAND_HEIGHT = 20       # hauteur d'un bandeau de date (px d'aperçu)
+SUBHEADER_SPACING = 6
+LINE_SPACING = 6
+TEXT_MARGIN_X = 24
+TEXT_MARGIN_Y = 18
+PREVIEW_Y_BOTTOM_MARGIN = 20
+
+# Diapositive PowerPoint par défaut (python-pptx, 4:3) en pouces
+SLIDE_WIDTH_IN = 10.0
+SLIDE_HEIGHT_IN = 7.5
+
+# Bandeau de domaine (export) en pouces / points
+BANNER_MIN_HEIGHT_IN = 1.2
+BANNER_DESC_TOP_IN = 0.65
+BANNER_DESC_FONT_PT = 8
+
+
+def preview_metrics(canvas_size):
+    """(y de départ du contenu, hauteur de contenu, largeur max du texte) en px d'aperçu."""
+    cw, ch = canvas_size
+    y_start = HEADER_HEIGHT + 14
+    content_h = max(1, ch - y_start - PREVIEW_Y_BOTTOM_MARGIN)
+    max_text_width = cw - 2 * TEXT_MARGIN_X - 10
+    return y_start, content_h, max_text_width
+
+
+def competence_line(prenom, text, genre=""):
+    # Ligne telle qu'exportée: puce + prénom + intitulé accordé (templates.py)
+    return personalize(prenom, text, genre)
+
+
+def item_height(item, prenom, wrap_text, max_text_width, body_font_size, last_ts, genre=""):
+    """
+    Hauteur (px d'aperçu) d'une compétence.
+    Retourne (wrapped_lines, lines_h_px, banner_h_px, ts).
+    """
+    ts = (item.ts or "").strip()
+    wrapped_lines = wrap_competence(prenom, item.text, wrap_text, max_text_width, ("Arial", body_font_size), genre)
+    lines_h_px = len(wrapped_lines) * (body_font_size + LINE_SPACING)
+    banner_h_px = DATE_BAND_HEIGHT if (ts and ts != last_ts) else 0
+    return wrapped_lines, lines_h_px, banner_h_px, ts
+
+
+def group_items(selected_items, domain_order):
+    # domain -> OrderedDict{subdomain -> [items]} dans l'ordre fixe des domaines
+    by_domain = OrderedDict((d, OrderedDict()) for d in domain_order)
+    for it in selected_items:
+        d = it.domain
+        sd = it.subdomain or d
+        by_domain.setdefault(d, OrderedDict())
+        by_domain[d].setdefault(sd, [])
+        by_domain[d][sd].append(it)
+    return by_domain
+
+
+# Entrée de page d'aperçu: entête de sous-domaine (item None) ou compétence.
+# Un tuple nommé (pas de __dict__), dépliable comme (is_header, subdomain, item).
+PageEntry = namedtuple("PageEntry", "is_header subdomain item")
+
+
+@lru_cache(maxsize=1024)
+def header_entry(subdomain):
+    # Entêtes identiques d'une page, d'un domaine et d'un élève à l'autre: un seul objet
+    return PageEntry(True, subdomain, None)
+
+
+def paginate_domain(submap, prenom, wrap_text, canvas_size, body_font_size, genre=""):
+    """
+    Découpe un domaine (subdomain -> [items]) en pages d'aperçu.
+    Une page est une liste de PageEntry (is_header, subdomain, item|None).
+    """
+    preview_y_start, content_h, max_text_width_px = preview_metrics(canvas_size)
+    max_y = preview_y_start + content_h
+    pages = []
+    current_page = []
+    y_px = preview_y_start
+    last_ts_on_slide = None
+    current_sd = None
+
+    def start_new_page(carry_sd=None):
+        nonlocal current_page, y_px, last_ts_on_slide
+        if current_page:
+            pages.append(current_page)
+        current_page = []
+        y_px = preview_y_start
+        last_ts_on_slide = None
+        if carry_sd:
+            current_page.append(header_entry(carry_sd))
+            y_px += SUBHEADER_HEIGHT
+
+    for sd, items in submap.items():
+        # Entête de sous-domaine
+        if (y_px + SUBHEADER_HEIGHT > max_y) and current_page:
+            start_new_page(carry_sd=None)
+        current_page.append(header_entry(sd))
+        y_px += SUBHEADER_HEIGHT
+        current_sd = sd
+
+        # Items
+        for it in items:
+            _, lines_h_px, banner_h_px, ts = item_height(
+                it, prenom, wrap_text, max_text_width_px, body_font_size, last_ts_on_slide, genre)
+            needed = banner_h_px + lines_h_px + SUBHEADER_SPACING
+
+            if (y_px + needed > max_y) and current_page:
+                # nouvelle page, répéter le header du sous-domaine
+                start_new_page(carry_sd=current_sd)
+
+            current_page.append(PageEntry(False, sd, it))
+            y_px += needed
+            last_ts_on_slide = ts
+
+    if current_page:
+        pages.append(current_page)
+    return pages
+
+
+def paginate(selected_items, domain_order, domain_states, prenom, wrap_text, canvas_size, genre="",
+             previous=None, domains=None):
+    """
+    Pagination de tous les domaines.
+    Retourne (domain_page_map, item_page_index, flat_pages).
+    Complète domain_states pour les domaines sans état.
+    Avec `previous` (domain_page_map précédent) et `domains`, seuls ces domaines sont
+    repaginés; les pages des autres sont reprises telles quelles.
+    """
+    domain_page_map = {}
+    item_page_index = {}
+    by_domain = group_items(selected_items, domain_order)
+
+    for d in domain_order:
+        ds = domain_states.get(d)
+        if not ds:
+            ds = DomainState(d, domain_color(len(domain_states)))
+            domain_states[d] = ds
+
+        if previous is not None and domains is not None and d not in domains and d in previous:
+            pages = previous[d]
+        else:
+            pages = paginate_domain(by_domain.get(d, {}), prenom, wrap_text, canvas_size, ds.font_body[1], genre)
+        domain_page_map[d] = pages
+
+        # indexer items -> page
+        for pi, page in enumerate(pages):
+            for is_header, sd, payload in page:
+                if not is_header and payload is not None:
+                    item_page_index[payload.key()] = (d, pi)
+
+    # Liste plate de navigation (tous domaines)
+    flat_pages = []
+    for d in domain_order:
+        for pi in range(len(domain_page_map.get(d, []))):
+            flat_pages.append((d, pi))
+
+    return domain_page_map, item_page_index, flat_pages
+
+
+# ==== Diapos de domaine (export / rendu) ====
+
+class SlideBlock:
+    """Bloc positionné sur une diapo: 'header' (sous-domaine), 'band' (date) ou 'item'."""
+
+    def __init__(self, kind, y_px, text, lines=None, h_px=0, item=None):
+        self.kind = kind
+        self.y_px = y_px      # ordonnée en px d'aperçu
+        self.text = text      # sous-domaine, date ou intitulé
+        self.lines = lines or []
+        self.h_px = h_px
+        self.item = item
+
+
+class DomainSlide:
+    def __init__(self, domain, page_index, first_for_page):
+        self.domain = domain
+        self.page_index = page_index
+        # Les images d'une page d'aperçu ne vont que sur sa première diapo
+        self.first_for_page = first_for_page
+        self.blocks = []
+
+
+def split_page_into_slides(domain, page_index, page, prenom, wrap_text, canvas_size, body_font_size, genre=""):
+    """
+    Répartit une page d'aperçu sur une ou plusieurs diapos (en pratique une seule,
+    la pagination étant faite avec la même simulation de hauteur).
+    """
+    preview_y_start, content_h, max_text_width_px = preview_metrics(canvas_size)
+    max_y_px = preview_y_start + content_h
+    slides = []
+    j = 0
+    current_sd = None
+
+    while j < len(page):
+        slide = DomainSlide(domain, page_index, first_for_page=not slides)
+        y_px = preview_y_start
+        last_ts_slide = None
+        placed_item = False
+
+        # Si on continue un sous-domaine sur une nouvelle diapo, réafficher son en-tête
+        # sans dupliquer si l'élément suivant est déjà ce même entête
+        header_drawn_this_slide = False
+        if current_sd:
+            if not (page[j][0] and page[j][1] == current_sd):
+                if y_px + SUBHEADER_HEIGHT <= max_y_px:
+                    slide.blocks.append(SlideBlock("header", y_px, current_sd, h_px=SUBHEADER_HEIGHT))
+                    y_px += SUBHEADER_HEIGHT
+                    header_drawn_this_slide = True
+
+        while j < len(page):
+            is_header, sub, payload = page[j]
+            if is_header:
+                # si le même header a déjà été peint en tête de diapo, le sauter
+                if sub == current_sd and header_drawn_this_slide:
+                    j += 1
+                    continue
+                if y_px + SUBHEADER_HEIGHT > max_y_px:
+                    # Nouvelle diapo, on reprendra ce header
+                    current_sd = sub
+                    break
+                slide.blocks.append(SlideBlock("header", y_px, sub, h_px=SUBHEADER_HEIGHT))
+                y_px += SUBHEADER_HEIGHT
+                current_sd = sub
+                header_drawn_this_slide = True
+                j += 1
+            else:
+                wrapped_lines, lines_h_px, banner_h_px, ts = item_height(
+                    payload, prenom, wrap_text, max_text_width_px, body_font_size, last_ts_slide, genre)
+                needed = banner_h_px + lines_h_px + SUBHEADER_SPACING
+
+                # Un élément plus haut qu'une diapo entière est placé quand même
+                if y_px + needed > max_y_px and placed_item:
+                    break
+
+                if banner_h_px:
+                    slide.blocks.append(SlideBlock("band", y_px, ts, h_px=banner_h_px))
+                    y_px += banner_h_px
+                    last_ts_slide = ts
+
+                slide.blocks.append(SlideBlock("item", y_px, payload.text, lines=wrapped_lines,
+                                               h_px=lines_h_px, item=payload))
+                y_px += lines_h_px + SUBHEADER_SPACING
+                placed_item = True
+                j += 1
+
+        slides.append(slide)
+    return slides
+
+
+def domain_slides(domain_page_map, domain_order, domain_states, prenom, wrap_text, canvas_size, genre=""):
+    """Toutes les diapos de domaine, dans l'ordre d'export."""
+    slides = []
+    for d in domain_order:
+        pages = domain_page_map.get(d, [])
+        if not pages:
+            continue
+        body_font_size = domain_states[d].font_body[1]
+        for pi, page in enumerate(pages):
+            slides.extend(split_page_into_slides(d, pi, page, prenom, wrap_text, canvas_size, body_font_size, genre))
+    return slides
+
+
+def banner_description_lines(domain_desc, wrap_text, canvas_size):
+    # Largeur disponible proportionnelle au canvas d'aperçu
+    if not (domain_desc or "").strip():
+        return []
+    max_width_px = max(50, int(canvas_size[0]) - 40)
+    return wrap_text(domain_desc, max_width_px, ("Arial", BANNER_DESC_FONT_PT))
+
+
+def banner_desc_height_in(desc_lines):
+    # Hauteur des lignes en pouces: approx 1.25 x taille (en points/72)
+    line_height_in = (BANNER_DESC_FONT_PT / 72.0) * 1.25
+    return line_height_in * max(1, len(desc_lines)) if desc_lines else 0.0
+
+
+def banner_height_in(desc_lines):
+    """Hauteur (pouces) du bandeau de domaine: il s'agrandit pour contenir la description."""
+    return max(BANNER_MIN_HEIGHT_IN, BANNER_DESC_TOP_IN + banner_desc_height_in(desc_lines) + 0.1)
+
+
+def content_box_in(banner_h_in, slide_w_in=SLIDE_WIDTH_IN, slide_h_in=SLIDE_HEIGHT_IN):
+    """(left, top, width, height) de la zone de contenu d'une diapo de domaine, en pouces."""
+    content_top = banner_h_in + 0.1
+    return 0.6, content_top, slide_w_in - 1.2, slide_h_in - content_top - 0.9
+
+
+def block_top(y_px, canvas_size, content_top, content_height):
+    # Ordonnée d'aperçu -> ordonnée sur la diapo (même unité que content_top)
+    preview_y_start, content_h, _ = preview_metrics(canvas_size)
+    return content_top + (y_px - preview_y_start) / content_h * content_height
+
+
+def page_fingerprint(domain, page, domain_state, prenom, images=(), canvas_size=None, description="", genre=""):
+    """
+    Empreinte du contenu visible d'une page d'aperçu: change dès qu'un élément, le style
+    du domaine, le prénom, une image ou la géométrie de la page change.
+    """
+    parts = [domain, domain_state.color, tuple(domain_state.font_body), (prenom or "").strip(),
+             tuple(canvas_size) if canvas_size else None, description or ""]
+    if genre:
+        parts.append(genre)
+    for is_header, sd, payload in page:
+        if payload is None:
+            parts.append((is_header, sd))
+        else:
+            parts.append((is_header, sd, payload.text, (payload.ts or "").strip()))
+    for im in images:
+        parts.append((im["path"], tuple(im["pos"]), tuple(im["size"])))
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
@@ -0,0 +1,217 @@
+"""
+Fusion des projets d'un même élève (une année par fichier, de la TPS à la GS).
+
+- Compétences: union par clé (domaine, sous-domaine, intitulé); pour une compétence
+  présente plusieurs fois, l'horodatage le plus ancien l'emporte avec son lot. Les
+  numéros de lot de chaque fichier sont renumérotés pour ne pas se mélanger.
+- Référentiel, ordre et styles des domaines: union dans l'ordre des fichiers.
+- Images de page: union par page, sans doublon de chemin.
+- Informations et sections (champs, photo, bilans): première valeur non vide dans
+  l'ordre des fichiers; une autre valeur non vide différente est un conflit.
+
+Tous les rapprochements passent par des dictionnaires (clé de compétence, identité
+d'élève), sans parcours de listes imbriquées: une archive d'école se fusionne en un
+passage.
+
+    python merge.py tps.json ps.json ms.json gs.json -o livret.json
+    python merge.py archive/*/*.json --out fusion/      (regroupe par élève)
+"""
+import argparse
+import os
+import sys
+from collections import OrderedDict
+
+from model import (
+    Project, CompetenceItem, DomainState, SECTION_KEYS, SECTION_FIELDS,
+    domain_color, parse_timestamp,
+)
+from roster import normalize_header, project_filename
+
+# Compétence non datée: après toutes les compétences datées
+UNDATED_RANK = float("inf")
+
+
+class Conflict:
+    def __init__(self, what, kept, other, source):
+        self.what = what        # "naissance", "MS/bilan1", "date: D / SD / intitulé"...
+        self.kept = kept
+        self.other = other
+        self.source = source    # fichier de la valeur écartée
+
+    def __str__(self):
+        return f"{self.what}: gardé {self.kept!r}, écarté {self.other!r} ({os.path.basename(self.source)})"
+
+
+def pupil_identity(project):
+    """Clé d'élève: nom, prénom (sans casse ni accents) et date de naissance."""
+    return (normalize_header(project.nom), normalize_header(project.prenom), project.naissance.strip())
+
+
+class ProjectMerger:
+    """Fusionne des projets ajoutés un par un (add) en un seul (result)."""
+
+    def __init__(self):
+        self.project = Project()
+        self.conflicts = []
+        self._items = {}        # clé -> (rang, CompetenceItem)
+        self._batches = {}      # (indice du fichier, lot) -> nouveau lot
+        self._images = {}       # (domaine, page) -> {chemins}
+        self._sources = 0
+
+    def add(self, project, source=""):
+        index = self._sources
+        self._sources += 1
+        self._merge_referential(project)
+        self._merge_items(project, index, source)
+        self._merge_images(project)
+        self._merge_infos(project, source)
+        self._merge_sections(project, source)
+        return self
+
+    def _keep(self, what, current, value, source):
+        # Première valeur non vide; une autre valeur non vide est un conflit
+        if not value or value == current:
+            return current
+        if not current:
+            return value
+        self.conflicts.append(Conflict(what, current, value, source))
+        return current
+
+    def _merge_referential(self, project):
+        merged = self.project
+        for d in project.domain_order:
+            if d not in merged.domain_states:
+                merged.domain_order.append(d)
+                src = project.domain_states.get(d)
+                ds = DomainState(d, src.color if src else domain_color(len(merged.domain_states)))
+                if src:
+                    ds.font_body = src.font_body
+                merged.domain_states[d] = ds
+        for d, submap in project.available.items():
+            target = merged.available.setdefault(d, OrderedDict())
+            for sd, comps in submap.items():
+                known = target.setdefault(sd, [])
+                seen = set(known)
+                for c in comps:
+                    if c not in seen:
+                        seen.add(c)
+                        known.append(c)
+
+    def _merge_items(self, project, index, source):
+        for it in project.selected_items:
+            rank = parse_timestamp(it.ts)
+            rank = UNDATED_RANK if rank is None else rank
+            key = it.key()
+            current = self._items.get(key)
+            if current is not None:
+                kept_rank, kept = current
+                if (it.ts or "") != (kept.ts or "") and it.ts and kept.ts:
+                    earliest, other = (it, kept) if rank < kept_rank else (kept, it)
+                    self.conflicts.append(Conflict("date: " + " / ".join(key), earliest.ts, other.ts, source))
+                if rank >= kept_rank:
+                    continue
+            batch = None
+            if it.batch_id is not None:
+                batch = self._batches.setdefault((index, it.batch_id), len(self._batches) + 1)
+            self._items[key] = (rank, CompetenceItem(it.domain, it.subdomain, it.text, it.ts, batch))
+
+    def _merge_images(self, project):
+        for page, images in project.page_images.items():
+            paths = self._images.setdefault(page, set())
+            target = self.project.page_images.setdefault(page, [])
+            for img in images:
+                if img["path"] not in paths:
+                    paths.add(img["path"])
+                    target.append({"path": img["path"], "pos": list(img["pos"]), "size": list(img["size"])})
+
+    def _merge_infos(self, project, source):
+        merged = self.project
+        merged.nom = self._keep("nom", merged.nom, project.nom.strip(), source)
+        merged.prenom = self._keep("prénom", merged.prenom, project.prenom.strip(), source)
+        merged.naissance = self._keep("naissance", merged.naissance, project.naissance.strip(), source)
+        merged.genre = self._keep("genre", merged.genre, project.genre, source)
+        merged.photo_path = self._keep("photo", merged.photo_path, project.photo_path, source)
+        merged.month = merged.month or project.month
+        merged.year = merged.year or project.year
+        merged.personal_completed = merged.personal_completed or project.personal_completed
+        merged.preview_size = merged.preview_size or project.preview_size
+
+    def _merge_sections(self, project, source):
+        for key in SECTION_KEYS:
+            target = self.project.sections_data[key]
+            section = project.sections_data[key]
+            for name in SECTION_FIELDS:
+                target["fields"][name] = self._keep(f"{key}/{name}", target["fields"][name],
+                                                    (section["fields"].get(name) or "").strip(), source)
+            for name in ("photo", "bilan1", "bilan2"):
+                value = section[name].strip() if isinstance(section[name], str) else section[name]
+                target[name] = self._keep(f"{key}/{name}", target[name], value, source)
+            target["completed"] = target["completed"] or section["completed"]
+            target["bilan2_enabled"] = target["bilan2_enabled"] or section["bilan2_enabled"]
+
+    def result(self):
+        """Projet fusionné: compétences dans l'ordre chronologique (non datées en dernier)."""
+        merged = self.project
+        order = sorted(self._items.values(), key=lambda entry: entry[0])
+        merged.selected_items = [item for _, item in order]
+        merged.export_dirty = True
+        return merged
+
+
+def merge_projects(paths):
+    """Fusionne les fichiers `paths` (dans cet ordre). Retourne (Project, [Conflict])."""
+    merger = ProjectMerger()
+    for path in paths:
+        merger.add(Project.load(path), path)
+    return merger.result(), merger.conflicts
+
+
+def group_by_pupil(paths):
+    """{identité d'élève: [chemins]} pour une archive, dans l'ordre des chemins."""
+    groups = OrderedDict()
+    for path in paths:
+        groups.setdefault(pupil_identity(Project.load(path)), []).append(path)
+    return groups
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fusionne les projets d'un même élève (plusieurs années).")
+    parser.add_argument("projects", nargs="+", help="fichiers projet .json, dans l'ordre des années")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("-o", "--output", help="projet fusionné (tous les fichiers sont du même élève)")
+    target.add_argument("--out", help="dossier: regroupe les fichiers par élève et fusionne chaque groupe")
+    args = parser.parse_args(argv)
+
+    if args.output:
+        groups = {None: args.projects}
+    else:
+        os.makedirs(args.out, exist_ok=True)
+        groups = group_by_pupil(args.projects)
+
+    total_conflicts = 0
+    used = set()
+    for paths in groups.values():
+        merged, conflicts = merge_projects(paths)
+        out = args.output
+        if out is None:
+            # Homonymes (dates de naissance différentes): suffixe numéroté
+            name = project_filename(merged.nom, merged.prenom)
+            out = os.path.join(args.out, name)
+            n = 2
+            while out in used:
+                out = os.path.join(args.out, f"{name[:-5]}_{n}.json")
+                n += 1
+            used.add(out)
+        merged.save(out)
+        total_conflicts += len(conflicts)
+        print(f"{out}: {len(paths)} fichier(s), {len(merged.selected_items)} compétence(s), "
+              f"{len(conflicts)} conflit(s)")
+        for conflict in conflicts:
+            print(f"  {conflict}")
+    if len(groups) > 1:
+        print(f"{len(groups)} élève(s), {total_conflicts} conflit(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
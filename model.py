@@ -0,0 +1,466 @@
+"""
+Modèle du livret indépendant de Tk : configuration partagée, structures de données,
+lecture des fichiers de référence (COMPETENCES.txt, DOMAINES.txt) et projet JSON.
+
+Utilisé par l'interface (Interface.py) comme par les traitements sans écran
+(rendu Pillow, exports par lot...).
+"""
+import json
+import os
+import sys
+from collections import OrderedDict
+
+# ==== Configuration partagée ====
+
+DEFAULT_BODY_FONT = ("Arial", 12)
+
+# Palette de couleurs pour domaines
+DOMAIN_COLORS = [
+    "#2E86C1", "#AF7AC5", "#48C9B0", "#F5B041", "#EC7063",
+    "#16A085", "#5D6D7E", "#CA6F1E", "#7D3C98", "#1F618D"
+]
+
+# Sections (maternelle)
+SECTION_KEYS = ["TPS", "PS", "MS", "GS"]
+SECTION_LABELS = {
+    "TPS": "TOUTE PETITE SECTION",
+    "PS": "PETITE SECTION",
+    "MS": "MOYENNE SECTION",
+    "GS": "GRANDE SECTION",
+}
+# Champs par section
+SECTION_FIELDS = OrderedDict([
+    ("annee", "Année scolaire"),
+    ("ecole", "École"),
+    ("enseignants", "Enseignant(s)"),
+])
+
+
+# ==== Structures de données ====
+
+def intern_text(value):
+    """
+    Chaîne partagée (sys.intern): domaines, sous-domaines, dates et intitulés du
+    référentiel se répètent d'un élève à l'autre; une classe ou une école chargée en
+    mémoire (lots, fusion, statistiques) n'en garde qu'un exemplaire.
+    """
+    return sys.intern(value) if type(value) is str else value
+
+
+class DomainState:
+    __slots__ = ("name", "color", "font_body")
+
+    def __init__(self, name, color):
+        self.name = intern_text(name)
+        self.color = color  # hex
+        self.font_body = DEFAULT_BODY_FONT
+
+
+class CompetenceItem:
+    # Sans __dict__: quelques centaines d'octets de moins par compétence
+    __slots__ = ("domain", "subdomain", "text", "ts", "batch_id")
+
+    def __init__(self, domain, subdomain, text, ts=None, batch_id=None):
+        self.domain = intern_text(domain)
+        self.subdomain = intern_text(subdomain)
+        self.text = intern_text(text)
+        # Ajouts: horodatage & lot d'ajout (pour regrouper dans le PPT)
+        self.ts = intern_text(ts)    # "Mois Année"
+        self.batch_id = batch_id  # entier
+
+    def key(self):
+        # clé d'unicité
+        return (self.domain, self.subdomain or "", self.text)
+
+
+def domain_color(index):
+    return DOMAIN_COLORS[index % len(DOMAIN_COLORS)]
+
+
+# ==== Horodatage ("Mois Année") ====
+
+MONTHS = [
+    "Janvier", "Février", "Mars", "Avril", "Mai", "Juin",
+    "Juillet", "Août", "Septembre", "Octobre", "Novembre", "Décembre",
+]
+
+
+def _month_lookup():
+    # Noms complets, sans accents et abréviations courantes ("janv", "févr", "sept"...)
+    lookup = {}
+    for i, name in enumerate(MONTHS, start=1):
+        plain = name.lower().replace("é", "e").replace("û", "u")
+        for alias in (name.lower(), plain, name.lower()[:4], plain[:3], plain[:4]):
+            lookup.setdefault(alias, i)
+    lookup.pop("jui", None)   # juin / juillet
+    lookup["juil"] = 7
+    return lookup
+
+
+_MONTH_LOOKUP = _month_lookup()
+
+
+def parse_timestamp(ts):
+    """
+    Horodatage saisi ("Mars 2024", "mars 2024", "03/2024", "sept. 2023") -> rang du mois
+    (année * 12 + mois - 1), comparable et ordonné. None si illisible ou vide.
+    """
+    text = (ts or "").strip().lower().replace("/", " ").replace("-", " ").replace(".", " ")
+    parts = text.split()
+    if len(parts) != 2:
+        return None
+    month, year = parts
+    if month.isdigit():
+        m = int(month)
+    else:
+        m = _MONTH_LOOKUP.get(month)
+    if not m or not 1 <= m <= 12 or not year.isdigit():
+        return None
+    y = int(year)
+    if y < 100:
+        y += 2000
+    return y * 12 + m - 1
+
+
+def format_timestamp(rank):
+    # Rang du mois -> "Mois Année" (forme saisie dans l'interface)
+    year, m = divmod(int(rank), 12)
+    return f"{MONTHS[m]} {year}"
+
+
+def new_section_data():
+    return {
+        "completed": False,
+        "fields": {fname: "" for fname in SECTION_FIELDS.keys()},
+        "photo": None,
+        "bilan1": "",
+        "bilan2": "",
+        "bilan2_enabled": False,
+    }
+
+
+# ==== Lecture des fichiers de référence ====
+
+def clean_line(line):
+    # Nettoyage unicode (espaces insécables, apostrophe typographique)
+    return line.replace("\u202f", " ").replace("\u00a0", " ").replace("\u2019", "'")
+
+
+def parse_competences_file(path):
+    """
+    Lit COMPETENCES.txt.
+    Retourne (available, domain_order) avec available: domain -> OrderedDict{subdomain -> [competences]}.
+    """
+    available = OrderedDict()
+    domain_order = []
+    current_domain = None
+    current_subdomain = None
+
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for raw in f:
+            line = raw.strip()
+            if not line:
+                continue
+            line = clean_line(line)
+
+            if line.startswith("##-Domaine"):
+                current_domain = intern_text(line.replace("##-Domaine", "").strip())
+                if current_domain not in available:
+                    available[current_domain] = OrderedDict()
+                    domain_order.append(current_domain)
+                current_subdomain = None
+
+            elif line.startswith("#-"):
+                sub = line.replace("#-", "").strip()
+                if sub.lower().startswith("sous-domaine:"):
+                    sub = sub.split(":", 1)[1].strip()
+                current_subdomain = intern_text(sub)
+
+            elif line.startswith("XX"):
+                comp = line.replace("XX", "").strip()
+                if current_domain is None:
+                    current_domain = "Domaine"
+                    if current_domain not in available:
+                        available[current_domain] = OrderedDict()
+                        domain_order.append(current_domain)
+                sd = current_subdomain if current_subdomain else current_domain
+                available[current_domain].setdefault(sd, [])
+                available[current_domain][sd].append(intern_text(comp))
+
+    return available, domain_order
+
+
+def parse_domaines_file(path):
+    """
+    Lit DOMAINES.txt.
+    Retourne (domain_descriptions, subdomain_descriptions):
+    domain -> texte, (domain, subdomain) -> texte.
+    """
+    domain_descriptions = {}
+    subdomain_descriptions = {}
+    domain = None
+    sub = None
+    buf = []
+
+    def commit():
+        nonlocal buf
+        if not domain:
+            buf = []
+            return
+        text = "\n".join(buf).strip()
+        if not text:
+            buf = []
+            return
+        if sub:
+            subdomain_descriptions[(domain, sub)] = text
+        else:
+            domain_descriptions[domain] = text
+        buf = []
+
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for raw in f:
+            line = raw.rstrip("\n")
+            if not line.strip():
+                buf.append("")
+                continue
+            cleaned = clean_line(line).strip()
+
+            if cleaned.startswith("##-"):
+                # Commit précédent
+                commit()
+                # Nouveau domaine
+                d = cleaned[3:].strip()
+                if d.lower().startswith("domaine"):
+                    parts = d.split(None, 1)
+                    d = parts[1] if len(parts) > 1 else d
+                domain = d
+                sub = None
+                buf = []
+            elif cleaned.startswith("#-"):
+                # Commit précédent (domaine ou sous-domaine précédent)
+                commit()
+                s = cleaned[2:].strip()
+                if s.lower().startswith("sous-domaine:"):
+                    s = s.split(":", 1)[1].strip()
+                sub = s
+                buf = []
+            else:
+                buf.append(cleaned)
+        commit()
+
+    return domain_descriptions, subdomain_descriptions
+
+
+def load_domaines_descriptions(base_dir=None):
+    # DOMAINES.txt du répertoire de travail (comme l'interface); ({}, {}) s'il est absent
+    path = os.path.join(base_dir or os.getcwd(), "DOMAINES.txt")
+    if not os.path.exists(path):
+        return {}, {}
+    return parse_domaines_file(path)
+
+
+# ==== Projet (fichier JSON) ====
+
+class Project:
+    """
+    Etat d'un livret élève sans dépendance à Tk, au format des fichiers
+    de projet enregistrés par l'interface (« Sauvegarder projet »).
+    """
+
+    def __init__(self):
+        self.available = OrderedDict()    # domain -> OrderedDict{subdomain -> [competences]}
+        self.domain_order = []
+        self.domain_states = {}           # domain -> DomainState
+        self.selected_items = []          # list[CompetenceItem]
+        self.page_images = {}             # (domain, page_index) -> [{"path", "pos", "size"}]
+        self.nom = ""
+        self.prenom = ""
+        self.naissance = ""
+        self.genre = ""                   # "", "M" ou "F" (accords des intitulés, templates.py)
+        self.photo_path = None
+        self.personal_completed = False
+        self.month = ""
+        self.year = ""
+        self.sections_data = {key: new_section_data() for key in SECTION_KEYS}
+        # Taille du canevas d'aperçu lors de la sauvegarde (positions d'images en px d'aperçu)
+        self.preview_size = None
+        # Livret modifié depuis le dernier export PowerPoint
+        self.export_dirty = False
+
+    @classmethod
+    def from_dict(cls, data):
+        project = cls()
+        for d, submap in data.get("available", {}).items():
+            project.available[intern_text(d)] = OrderedDict()
+            for sd, lst in submap.items():
+                project.available[d][intern_text(sd)] = [intern_text(c) for c in lst]
+
+        project.domain_order = [intern_text(d) for d in data.get("domain_order", [])]
+        domdata = data.get("domains", {})
+        for idx, d in enumerate(project.domain_order):
+            ds = DomainState(d, domdata.get(d, {}).get("color", domain_color(idx)))
+            ds.font_body = tuple(domdata.get(d, {}).get("font_body", DEFAULT_BODY_FONT))
+            project.domain_states[d] = ds
+
+        for tup in data.get("selected", []):
+            # rétrocompat: (d, sd, txt) ou (d, sd, txt, ts, batch)
+            if len(tup) == 3:
+                d, sd, txt = tup
+                ts = None
+                batch_id = None
+            else:
+                d, sd, txt, ts, batch_id = tup
+            project.selected_items.append(CompetenceItem(d, sd, txt, ts=ts, batch_id=batch_id))
+
+        for rec in data.get("page_images", []):
+            d = rec.get("domain")
+            pi = int(rec.get("page_index", 0))
+            imgs = []
+            for im in rec.get("images", []):
+                pos = im.get("pos", [60, 78])  # défaut de l'interface: [60, HEADER_HEIGHT + 30]
+                size = im.get("size", [120, 120])
+                imgs.append({
+                    "path": intern_text(im.get("path")),
+                    "pos": [int(pos[0]), int(pos[1])],
+                    "size": [int(size[0]), int(size[1])],
+                })
+            if imgs:
+                project.page_images[(intern_text(d), pi)] = imgs
+
+        infos = data.get("infos", {})
+        project.nom = infos.get("nom", "")
+        project.prenom = infos.get("prenom", "")
+        project.naissance = infos.get("naissance", "")
+        project.genre = infos.get("genre", "")
+        project.photo_path = infos.get("photo", None)
+        project.personal_completed = bool(infos.get("personal_completed", False))
+        project.month = infos.get("month", "")
+        project.year = infos.get("year", "")
+
+        secdata = data.get("sections", {})
+        for key in SECTION_KEYS:
+            sd = secdata.get(key, {})
+            section = project.sections_data[key]
+            section["completed"] = bool(sd.get("completed", False))
+            fields = sd.get("fields", {})
+            for fname in SECTION_FIELDS.keys():
+                section["fields"][fname] = fields.get(fname, "")
+            section["photo"] = sd.get("photo", None)
+            section["bilan1"] = sd.get("bilan1", "")
+            section["bilan2"] = sd.get("bilan2", "")
+            section["bilan2_enabled"] = bool(sd.get("bilan2_enabled", False))
+
+        size = data.get("preview_size")
+        if size:
+            project.preview_size = (int(size[0]), int(size[1]))
+        project.export_dirty = bool(data.get("export_dirty", False))
+        return project
+
+    def to_dict(self):
+        data = {
+            "available": self.available,
+            "domain_order": self.domain_order,
+            "selected": [
+                (it.domain, it.subdomain, it.text, it.ts, it.batch_id) for it in self.selected_items
+            ],
+            "domains": {
+                d: {
+                    "color": self.domain_states[d].color,
+                    "font_body": self.domain_states[d].font_body,
+                } for d in self.domain_order if d in self.domain_states
+            },
+            "page_images": [
+                {
+                    "domain": d,
+                    "page_index": pi,
+                    "images": [
+                        {"path": im["path"], "pos": im["pos"], "size": im["size"]}
+                        for im in imgs
+                    ]
+                }
+                for (d, pi), imgs in self.page_images.items()
+            ],
+            "infos": {
+                "nom": self.nom,
+                "prenom": self.prenom,
+                "naissance": self.naissance,
+                "photo": self.photo_path,
+                "personal_completed": self.personal_completed,
+                "month": self.month,
+                "year": self.year,
+            },
+            "sections": {
+                key: {
+                    "completed": self.sections_data[key]["completed"],
+                    "fields": self.sections_data[key]["fields"],
+                    "photo": self.sections_data[key]["photo"],
+                    "bilan1": self.sections_data[key]["bilan1"],
+                    "bilan2": self.sections_data[key]["bilan2"],
+                    "bilan2_enabled": self.sections_data[key]["bilan2_enabled"],
+                } for key in SECTION_KEYS
+            }
+        }
+        if self.genre:
+            data["infos"]["genre"] = self.genre
+        if self.preview_size:
+            data["preview_size"] = list(self.preview_size)
+        if self.export_dirty:
+            data["export_dirty"] = True
+        return data
+
+    # ---- Compétences ----
+
+    def added_keys(self):
+        return {it.key() for it in self.selected_items}
+
+    def next_batch_id(self):
+        return max((it.batch_id or 0 for it in self.selected_items), default=0) + 1
+
+    def add_competences(self, keys, ts, batch_id=None, added_keys=None):
+        """
+        Ajoute des compétences (domain, subdomain, text) horodatées `ts`, en un seul lot,
+        sans doublon (même règle que l'interface). Retourne les CompetenceItem ajoutés.
+        `added_keys` (ensemble des clés déjà présentes) est mis à jour s'il est fourni.
+        """
+        if added_keys is None:
+            added_keys = self.added_keys()
+        if batch_id is None:
+            batch_id = self.next_batch_id()
+        added = []
+        for domain, sub, text in keys:
+            item = CompetenceItem(domain, sub, text, ts=ts, batch_id=batch_id)
+            if item.key() in added_keys:
+                continue
+            if domain not in self.domain_order:
+                # référentiel du projet plus ancien que la compétence ajoutée
+                self.domain_order.append(domain)
+                self.domain_states.setdefault(domain, DomainState(domain, domain_color(len(self.domain_states))))
+            submap = self.available.setdefault(domain, OrderedDict())
+            comps = submap.setdefault(sub or domain, [])
+            if text not in comps:
+                comps.append(text)
+            self.selected_items.append(item)
+            added_keys.add(item.key())
+            added.append(item)
+        if added:
+            self.export_dirty = True
+        return added
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, path):
+        # Écriture dans un fichier temporaire puis remplacement: jamais de projet tronqué
+        tmp = self.write_temp(path)
+        os.replace(tmp, path)
+
+    def write_temp(self, path):
+        """Écrit le projet à côté de `path` (fichier .tmp) et retourne ce chemin."""
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp
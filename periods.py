@@ -0,0 +1,179 @@
+"""
+Périodes d'acquisition: exporter « ce qui a été acquis en MS » ou « depuis la dernière
+réunion » sans retirer de compétences.
+
+Les horodatages des compétences, saisis librement (« Mars 2025 », « mars 2025 »,
+« 03/2025 »), sont lus une fois (model.parse_timestamp) dans un index trié par rang de
+mois. Une période (premier et dernier mois, bornes comprises, chacune facultative) se
+résout alors par deux recherches dichotomiques (bisect), sans reparcourir toutes les
+compétences à chaque passage. Une section (TPS, PS, MS, GS) correspond à son année
+scolaire, de septembre à août (champ « Année scolaire » de la section: « 2024-2025 »).
+
+Formes acceptées par parse_period:
+    Mars 2025                       un mois
+    Septembre 2024 - Juin 2025      de ... à ... (aussi « .. » ou « à »)
+    depuis Mars 2025                à partir de ce mois
+    jusqu'à Juin 2025               jusqu'à ce mois compris
+    2024-2025                       une année scolaire
+    MS                              l'année scolaire de la section MS de l'élève
+Les compétences sans date lisible ne font partie d'aucune période.
+"""
+import copy
+import re
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+from model import SECTION_KEYS, parse_timestamp, format_timestamp
+
+SCHOOL_YEAR_FIRST_MONTH = 9     # septembre
+ALL_PERIODS = "Toutes les périodes"
+
+_SCHOOL_YEAR_RE = re.compile(r"^(\d{4})\s*[-/]\s*(\d{2}|\d{4})$")
+_RANGE_RE = re.compile(r"\s+-\s+|\s*\.\.\s*|\s+à\s+", re.IGNORECASE)
+_SINCE_RE = re.compile(r"^(?:depuis|à partir d[e'’]|a partir d[e'’])\s*", re.IGNORECASE)
+_UNTIL_RE = re.compile(r"^(?:jusqu['’]?(?:à|a|en|au))\s+", re.IGNORECASE)
+
+
+class Period:
+    """Mois `start` à `end` (rangs de mois, bornes comprises; None = ouvert)."""
+    __slots__ = ("start", "end", "label")
+
+    def __init__(self, start=None, end=None, label=""):
+        if start is not None and end is not None and start > end:
+            raise ValueError(f"Période vide: {format_timestamp(start)} après {format_timestamp(end)}")
+        self.start = start
+        self.end = end
+        self.label = label
+
+    def __contains__(self, rank):
+        return (rank is not None and (self.start is None or rank >= self.start)
+                and (self.end is None or rank <= self.end))
+
+    def __str__(self):
+        if self.label:
+            return self.label
+        if self.start == self.end:
+            return format_timestamp(self.start)
+        if self.end is None:
+            return f"depuis {format_timestamp(self.start)}"
+        if self.start is None:
+            return f"jusqu'à {format_timestamp(self.end)}"
+        return f"{format_timestamp(self.start)} - {format_timestamp(self.end)}"
+
+
+def month_rank(text):
+    """Rang du mois « Mois Année » (ValueError si illisible)."""
+    rank = parse_timestamp(text)
+    if rank is None:
+        raise ValueError(f"Date illisible: {text!r} (attendu « Mois Année »)")
+    return rank
+
+
+def school_year(text, label=""):
+    """Année scolaire « 2024-2025 » (ou « 2024/25 ») -> Period de septembre à août."""
+    m = _SCHOOL_YEAR_RE.match((text or "").strip())
+    if not m:
+        raise ValueError(f"Année scolaire illisible: {text!r} (attendu « 2024-2025 »)")
+    first = int(m.group(1))
+    second = int(m.group(2))
+    if second < 100:
+        second += first // 100 * 100
+    if second != first + 1:
+        raise ValueError(f"Année scolaire illisible: {text!r} (deux années qui se suivent)")
+    start = first * 12 + SCHOOL_YEAR_FIRST_MONTH - 1
+    return Period(start, start + 11, label or f"{first}-{second}")
+
+
+def section_period(sections_data, key):
+    """Année scolaire de la section `key` (champ « Année scolaire »)."""
+    text = sections_data[key]["fields"].get("annee", "").strip()
+    if not text:
+        raise ValueError(f"Section {key}: « Année scolaire » non renseignée")
+    return school_year(text, label=f"{key} ({text})")
+
+
+def parse_period(text, sections_data=None):
+    """
+    Période saisie (voir le module) -> Period; None pour « toutes les périodes ».
+    Une section se résout avec les sections de l'élève (`sections_data`).
+    """
+    text = (text or "").strip()
+    if not text or text == ALL_PERIODS:
+        return None
+    if text.upper() in SECTION_KEYS:
+        if sections_data is None:
+            raise ValueError(f"Section {text.upper()}: période propre à chaque élève")
+        return section_period(sections_data, text.upper())
+    if _SCHOOL_YEAR_RE.match(text):
+        return school_year(text)
+    m = _SINCE_RE.match(text)
+    if m:
+        return Period(month_rank(text[m.end():]), None, text)
+    m = _UNTIL_RE.match(text)
+    if m:
+        return Period(None, month_rank(text[m.end():]), text)
+    parts = _RANGE_RE.split(text)
+    if len(parts) == 2:
+        return Period(month_rank(parts[0]), month_rank(parts[1]), text)
+    rank = month_rank(text)
+    return Period(rank, rank, text)
+
+
+class TimestampIndex:
+    """
+    Compétences d'un élève triées par mois d'acquisition: `ranks` (croissants) et
+    `positions` (indices dans la liste indexée), pour les recherches de période.
+    """
+    __slots__ = ("ranks", "positions", "undated")
+
+    def __init__(self, items):
+        parsed = {}             # horodatage -> rang: une lecture par date distincte
+        dated = []
+        self.undated = []
+        for pos, it in enumerate(items):
+            if it.ts not in parsed:
+                parsed[it.ts] = parse_timestamp(it.ts)
+            rank = parsed[it.ts]
+            if rank is None:
+                self.undated.append(pos)
+            else:
+                dated.append((rank, pos))
+        dated.sort()
+        self.ranks = [r for r, _ in dated]
+        self.positions = [p for _, p in dated]
+
+    def positions_in(self, period):
+        """Indices des compétences datées de `period` (ordre chronologique)."""
+        lo = 0 if period.start is None else bisect_left(self.ranks, period.start)
+        hi = len(self.ranks) if period.end is None else bisect_right(self.ranks, period.end)
+        return self.positions[lo:hi]
+
+    def select(self, items, period):
+        """Compétences de `items` (la liste indexée) dans `period`, dans leur ordre d'origine."""
+        if period is None:
+            return list(items)
+        return [items[p] for p in sorted(self.positions_in(period))]
+
+
+def partial_domains(items, kept):
+    """Domaines dont une partie des compétences est écartée (pages différentes du livret complet)."""
+    total = Counter(it.domain for it in items)
+    total.subtract(it.domain for it in kept)
+    return {d for d, n in total.items() if n}
+
+
+def filter_project(project, period, index=None):
+    """
+    Copie de `project` limitée aux compétences de `period` (export d'une période). Les
+    images de page ne suivent que les domaines gardés en entier: ailleurs, les pages
+    ne sont plus celles où elles ont été placées.
+    """
+    if period is None:
+        return project
+    index = index or TimestampIndex(project.selected_items)
+    kept = index.select(project.selected_items, period)
+    hidden = partial_domains(project.selected_items, kept)
+    filtered = copy.copy(project)
+    filtered.selected_items = kept
+    filtered.page_images = {key: imgs for key, imgs in project.page_images.items() if key[0] not in hidden}
+    return filtered
@@ -0,0 +1,256 @@
+"""
+Import groupé des photos d'une classe.
+
+Un dossier de photos est rapproché des projets élèves par nom de fichier
+(« DUBOIS_Chloe.jpg », « Chloé Dubois.jpeg »..., l'ordre des mots et les accents
+ne comptent pas) ou par la colonne photo d'une liste CSV (roster.py). Un suffixe de
+section (« DUBOIS_Chloe_MS.jpg ») désigne la photo de cette section; sinon c'est la
+photo de l'élève.
+
+Chaque photo est décodée, redressée (orientation EXIF), recadrée et réduite dans un
+pool de processus, en deux dérivés JPEG:
+- <nom>-export.jpg: taille d'impression, utilisé par le projet et les exports;
+- <nom>-cover.jpg: petite taille, utilisée par l'aperçu de l'interface (preview_path).
+Les projets pointent ensuite vers les dérivés: les originaux ne sont plus relus.
+
+    python photos.py photos_classe/ eleves/*.json [--roster liste.csv] [--workers 4] [--dry-run]
+"""
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+
+from bulk import save_projects
+from model import Project, SECTION_KEYS
+from roster import map_columns, normalize_header, sniff_dialect, open_roster
+
+PHOTO_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+# Photo d'élève: portrait 3:4, visage plutôt dans le haut de l'image
+PUPIL_ASPECT = 3 / 4
+PUPIL_CENTERING = (0.5, 0.4)
+EXPORT_SIZE = 1200      # plus grand côté du dérivé d'export (px)
+COVER_SIZE = 320        # plus grand côté du dérivé d'aperçu (px)
+JPEG_QUALITY = 85
+EXPORT_SUFFIX = "-export.jpg"
+COVER_SUFFIX = "-cover.jpg"
+PHOTOS_DIR = "photos"
+
+
+def preview_path(path):
+    """Dérivé d'aperçu d'une photo importée s'il existe, sinon la photo elle-même."""
+    if path and path.endswith(EXPORT_SUFFIX):
+        cover = path[:-len(EXPORT_SUFFIX)] + COVER_SUFFIX
+        if os.path.exists(cover):
+            return cover
+    return path
+
+
+def name_tokens(text):
+    return frozenset(normalize_header(text).split())
+
+
+def pupil_tokens(project):
+    return name_tokens(f"{project.nom} {project.prenom}")
+
+
+def split_photo_name(filename):
+    """(jetons du nom, section ou None) d'après un nom de fichier photo."""
+    tokens = set(name_tokens(os.path.splitext(os.path.basename(filename))[0]))
+    sections = [key for key in SECTION_KEYS if key.lower() in tokens]
+    section = sections[-1] if len(sections) == 1 else None
+    if section:
+        tokens.discard(section.lower())
+    return frozenset(tokens), section
+
+
+# ==== Dérivés (processus du pool) ====
+
+def make_derivatives(src, out_base, crop_aspect=None):
+    """
+    Décode `src`, le redresse, le recadre au rapport `crop_aspect` (largeur/hauteur,
+    None: pas de recadrage) et écrit out_base-export.jpg et out_base-cover.jpg.
+    Retourne (chemin export, chemin aperçu).
+    """
+    with Image.open(src) as im:
+        # Décodage JPEG réduit directement à la taille utile
+        im.draft("RGB", (EXPORT_SIZE * 2, EXPORT_SIZE * 2))
+        im = ImageOps.exif_transpose(im)
+    im = im.convert("RGB")
+    if crop_aspect:
+        w, h = im.size
+        if w / h > crop_aspect:
+            size = (round(h * crop_aspect), h)
+        else:
+            size = (w, round(w / crop_aspect))
+        im = ImageOps.fit(im, size, Image.LANCZOS, centering=PUPIL_CENTERING)
+
+    paths = []
+    for suffix, side in ((EXPORT_SUFFIX, EXPORT_SIZE), (COVER_SUFFIX, COVER_SIZE)):
+        im.thumbnail((side, side), Image.LANCZOS)
+        path = out_base + suffix
+        tmp = path + ".tmp"
+        im.save(tmp, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        os.replace(tmp, path)
+        paths.append(path)
+    return tuple(paths)
+
+
+# ==== Rapprochement ====
+
+class PhotoMatch:
+    def __init__(self, project_path, section, photo):
+        self.project_path = project_path
+        self.section = section        # None: photo de l'élève
+        self.photo = photo
+
+
+class IngestResult:
+    def __init__(self):
+        self.matches = []           # [PhotoMatch]
+        self.unmatched = []         # photos sans élève
+        self.ambiguous = []         # (photo, [projets]): plusieurs élèves, ou plusieurs photos pour un élève
+        self.without_photo = []     # projets sans photo d'élève (après les dérivés)
+        self.failed = []            # (photo, message)
+
+    def __str__(self):
+        return (f"{len(self.matches)} photo(s) associée(s), {len(self.unmatched)} sans élève, "
+                f"{len(self.ambiguous)} ambiguë(s), {len(self.failed)} illisible(s), "
+                f"{len(self.without_photo)} élève(s) sans photo")
+
+
+def roster_photos(csv_path, photo_dir):
+    """{jetons du nom de l'élève: chemin de photo} d'après la colonne photo d'une liste."""
+    mapping = {}
+    with open_roster(csv_path) as f:
+        reader = csv.reader(f, sniff_dialect(f.read(4096)))
+        f.seek(0)
+        columns = map_columns(next(reader, []))
+        if "photo" not in columns:
+            raise ValueError("colonne photo introuvable dans la liste")
+        for row in reader:
+            if len(row) <= max(columns.values()):
+                continue
+            name = row[columns["photo"]].strip()
+            if name:
+                tokens = name_tokens(f"{row[columns['nom']]} {row[columns['prenom']]}")
+                mapping[tokens] = os.path.join(photo_dir, name)
+    return mapping
+
+
+def match_photos(photo_dir, project_paths, roster=None):
+    """Rapproche les photos de `photo_dir` des projets; retourne un IngestResult (sans dérivés)."""
+    result = IngestResult()
+    # Index par jetons du nom: recherche en O(1) par photo
+    by_tokens = {}
+    for path in project_paths:
+        by_tokens.setdefault(pupil_tokens(Project.load(path)), []).append(path)
+
+    photos = sorted(os.path.join(photo_dir, n) for n in os.listdir(photo_dir)
+                    if n.lower().endswith(PHOTO_EXTENSIONS))
+    assigned = {}
+    if roster:
+        for tokens, photo in roster_photos(roster, photo_dir).items():
+            assigned[photo] = (tokens, None)
+    for photo in photos:
+        if photo not in assigned:
+            assigned[photo] = split_photo_name(photo)
+
+    targets = {}    # (projet, section) -> [photos]
+    for photo, (tokens, section) in assigned.items():
+        candidates = by_tokens.get(tokens, [])
+        if not candidates or not os.path.exists(photo):
+            result.unmatched.append(photo)
+        elif len(candidates) > 1:
+            result.ambiguous.append((photo, candidates))
+        else:
+            targets.setdefault((candidates[0], section), []).append(photo)
+    for (project_path, section), found in targets.items():
+        if len(found) > 1:
+            # Même dérivé pour ces photos: aucune n'est retenue, à départager à la main
+            result.ambiguous.extend((photo, [project_path]) for photo in found)
+        else:
+            result.matches.append(PhotoMatch(project_path, section, found[0]))
+    result.without_photo = pupils_without_photo(project_paths, result.matches)
+    return result
+
+
+def pupils_without_photo(project_paths, matches):
+    """Projets sans photo d'élève parmi `matches`."""
+    with_photo = {m.project_path for m in matches if m.section is None}
+    return [p for p in project_paths if p not in with_photo]
+
+
+def ingest(photo_dir, project_paths, out_dir=None, roster=None, workers=None, dry_run=False):
+    """
+    Associe les photos aux projets, calcule les dérivés en parallèle et enregistre
+    les projets modifiés. Retourne l'IngestResult.
+    """
+    result = match_photos(photo_dir, project_paths, roster)
+    if dry_run or not result.matches:
+        return result
+    out_dir = os.path.abspath(out_dir or os.path.join(os.path.dirname(project_paths[0]), PHOTOS_DIR))
+    os.makedirs(out_dir, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for m in result.matches:
+            base = os.path.splitext(os.path.basename(m.project_path))[0] + (f"_{m.section}" if m.section else "")
+            aspect = PUPIL_ASPECT if m.section is None else None
+            futures.append((m, pool.submit(make_derivatives, m.photo, os.path.join(out_dir, base), aspect)))
+
+        projects = {}
+        done = []
+        for m, future in futures:
+            try:
+                export_path, _ = future.result()
+            except Exception as e:
+                result.failed.append((m.photo, str(e)))
+                continue
+            project = projects.get(m.project_path) or Project.load(m.project_path)
+            projects[m.project_path] = project
+            if m.section is None:
+                project.photo_path = export_path
+            else:
+                project.sections_data[m.section]["photo"] = export_path
+            project.export_dirty = True
+            done.append(m)
+    result.matches = done
+    # Une photo illisible laisse l'élève sans photo
+    result.without_photo = pupils_without_photo(project_paths, done)
+    save_projects(projects)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import groupé des photos d'une classe.")
+    parser.add_argument("photo_dir", help="dossier des photos")
+    parser.add_argument("projects", nargs="+", help="fichiers projet .json")
+    parser.add_argument("--roster", help="liste CSV avec une colonne photo (nom de fichier)")
+    parser.add_argument("--out", help=f"dossier des dérivés (défaut: {PHOTOS_DIR}/ à côté des projets)")
+    parser.add_argument("--workers", type=int, default=None, help="processus (défaut: nombre de cœurs)")
+    parser.add_argument("--dry-run", action="store_true", help="affiche les associations sans rien écrire")
+    args = parser.parse_args(argv)
+
+    try:
+        result = ingest(args.photo_dir, args.projects, args.out, args.roster, args.workers, args.dry_run)
+    except ValueError as e:
+        parser.exit(2, f"{e}\n")
+    for m in result.matches:
+        target = f"section {m.section}" if m.section else "élève"
+        print(f"{os.path.basename(m.photo)} -> {os.path.basename(m.project_path)} ({target})")
+    for photo in result.unmatched:
+        print(f"sans élève: {os.path.basename(photo)}", file=sys.stderr)
+    for photo, candidates in result.ambiguous:
+        names = ", ".join(os.path.basename(c) for c in candidates)
+        print(f"ambiguë: {os.path.basename(photo)} ({names})", file=sys.stderr)
+    for photo, message in result.failed:
+        print(f"illisible: {os.path.basename(photo)}: {message}", file=sys.stderr)
+    print(result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
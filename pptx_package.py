@@ -0,0 +1,397 @@
+"""
+Optimisation d'un fichier .pptx déjà enregistré, au niveau de l'archive zip.
+
+Presentation() part du modèle par défaut de python-pptx: chaque livret embarque les
+onze dispositions de diapo (une seule, « vide », est utilisée), les paramètres
+d'imprimante et des entrées zip à la compression par défaut. optimize_pptx():
+- retire les dispositions non utilisées par une diapo et les parties devenues
+  inaccessibles depuis _rels/.rels;
+- fusionne les médias identiques (même contenu);
+- recompresse les parties XML au niveau zlib demandé (médias déjà compressés stockés);
+- écrit les entrées dans un ordre déterministe, à date fixe.
+
+Les fonctions read_package / write_package / rels_name / resolve_target servent aussi
+aux autres traitements au niveau zip (reprise de diapos d'un export précédent:
+slide_part_names, transplant_slides).
+"""
+import argparse
+import copy
+import hashlib
+import io
+import os
+import posixpath
+import sys
+import tempfile
+import zipfile
+from collections import OrderedDict
+
+from lxml import etree
+
+CONTENT_TYPES = "[Content_Types].xml"
+ROOT_RELS = "_rels/.rels"
+DEFAULT_LEVEL = 9
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+
+NS_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_CT = "http://schemas.openxmlformats.org/package/2006/content-types"
+NS_P = "http://schemas.openxmlformats.org/presentationml/2006/main"
+NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+RT_SLIDE_LAYOUT = NS_R + "/slideLayout"
+PRESENTATION = "ppt/presentation.xml"
+# Relations sans référence dans le XML de la source, inutiles au livret
+DROPPABLE_TYPES = {NS_R + "/printerSettings"}
+
+# Extensions déjà compressées: stockées telles quelles
+STORED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".emf", ".wmf", ".mp3", ".mp4"}
+
+
+class PackageReport:
+    """Résultat d'une optimisation (tailles en octets)."""
+
+    def __init__(self, bytes_before, bytes_after, removed_parts, merged_media):
+        self.bytes_before = bytes_before
+        self.bytes_after = bytes_after
+        self.removed_parts = removed_parts
+        self.merged_media = merged_media
+
+    @property
+    def saved(self):
+        return self.bytes_before - self.bytes_after
+
+    def __str__(self):
+        pct = 100.0 * self.saved / self.bytes_before if self.bytes_before else 0.0
+        return (f"{self.bytes_before} -> {self.bytes_after} octets "
+                f"({self.saved} économisés, {pct:.1f} %), "
+                f"{len(self.removed_parts)} partie(s) retirée(s), {self.merged_media} média(s) fusionné(s)")
+
+
+# ==== Lecture / écriture de l'archive ====
+
+def read_package(path):
+    """Contenu de l'archive (chemin ou fichier binaire): OrderedDict nom d'entrée -> octets."""
+    with zipfile.ZipFile(path) as zf:
+        return OrderedDict((info.filename, zf.read(info)) for info in zf.infolist())
+
+
+def _entry_order(name):
+    # [Content_Types].xml puis _rels/.rels en tête (attendus en premier par certains lecteurs)
+    if name == CONTENT_TYPES:
+        return (0, name)
+    if name == ROOT_RELS:
+        return (1, name)
+    return (2, name)
+
+
+def _write_zip(parts, target, level):
+    with zipfile.ZipFile(target, "w") as zf:
+        for name in sorted(parts, key=_entry_order):
+            info = zipfile.ZipInfo(name, date_time=ZIP_DATE)
+            info.external_attr = 0o644 << 16
+            if posixpath.splitext(name)[1].lower() in STORED_EXTENSIONS:
+                info.compress_type = zipfile.ZIP_STORED
+                zf.writestr(info, parts[name])
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+                zf.writestr(info, parts[name], compresslevel=level)
+
+
+def package_size(parts, level=DEFAULT_LEVEL):
+    """Taille en octets de l'archive qu'écrirait write_package (écrite en mémoire)."""
+    buf = io.BytesIO()
+    _write_zip(parts, buf, level)
+    return buf.tell()
+
+
+def write_package(parts, path, level=DEFAULT_LEVEL):
+    """
+    Écrit l'archive de façon atomique (fichier temporaire puis remplacement),
+    entrées triées et datées à ZIP_DATE.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(suffix=".pptx", dir=directory)
+    os.close(fd)
+    try:
+        _write_zip(parts, tmp, level)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+# ==== Relations ====
+
+def rels_name(part):
+    """Nom de l'entrée .rels d'une partie ("" pour le paquet)."""
+    if not part:
+        return ROOT_RELS
+    directory, base = posixpath.split(part)
+    return posixpath.join(directory, "_rels", base + ".rels")
+
+
+def resolve_target(part, target):
+    # Cible relative à la partie source -> nom d'entrée dans l'archive
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+
+
+def relative_target(part, name):
+    return posixpath.relpath(name, posixpath.dirname(part) or ".")
+
+
+def iter_relationships(parts, part):
+    """(arbre .rels, [éléments Relationship internes]) d'une partie."""
+    data = parts.get(rels_name(part))
+    if data is None:
+        return None, []
+    tree = etree.fromstring(data)
+    rels = [rel for rel in tree.findall(f"{{{NS_REL}}}Relationship")
+            if rel.get("TargetMode") != "External"]
+    return tree, rels
+
+
+def _serialize(tree):
+    return etree.tostring(tree, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def reachable_parts(parts):
+    """Parties accessibles depuis _rels/.rels en suivant les relations internes."""
+    seen = set()
+    stack = [""]
+    while stack:
+        part = stack.pop()
+        _, rels = iter_relationships(parts, part)
+        for rel in rels:
+            name = resolve_target(part, rel.get("Target"))
+            if name in parts and name not in seen:
+                seen.add(name)
+                stack.append(name)
+    return seen
+
+
+# ==== Diapos ====
+
+def slide_part_names(parts):
+    """Parties des diapos dans l'ordre de la présentation (sldIdLst)."""
+    _, rels = iter_relationships(parts, PRESENTATION)
+    targets = {rel.get("Id"): resolve_target(PRESENTATION, rel.get("Target")) for rel in rels}
+    tree = etree.fromstring(parts[PRESENTATION])
+    lst = tree.find(f"{{{NS_P}}}sldIdLst")
+    if lst is None:
+        return []
+    return [targets[entry.get(f"{{{NS_R}}}id")] for entry in lst]
+
+
+def _content_types(parts):
+    tree = etree.fromstring(parts[CONTENT_TYPES])
+    defaults = {d.get("Extension").lower(): d for d in tree.findall(f"{{{NS_CT}}}Default")}
+    overrides = {o.get("PartName").lstrip("/"): o for o in tree.findall(f"{{{NS_CT}}}Override")}
+    return tree, defaults, overrides
+
+
+def _free_name(parts, name):
+    # Nom d'entrée libre dans le même dossier (image3.png -> image3_1.png...)
+    if name not in parts:
+        return name
+    base, ext = posixpath.splitext(name)
+    i = 1
+    while f"{base}_{i}{ext}" in parts:
+        i += 1
+    return f"{base}_{i}{ext}"
+
+
+def transplant_slides(parts, old_parts, mapping):
+    """
+    Remplace des diapos de `parts` par des diapos d'un autre paquet (`old_parts`).
+    `mapping`: {diapo de parts: diapo de old_parts}. La diapo remplacée garde sa
+    disposition; les autres cibles de la diapo reprise (images...) sont copiées sous
+    un nom libre, avec leur type de contenu.
+    """
+    ct_tree, defaults, overrides = _content_types(parts)
+    _, old_defaults, old_overrides = _content_types(old_parts)
+    copied = {}   # partie de old_parts -> nom dans parts
+
+    for new_slide, old_slide in mapping.items():
+        layout_target = None
+        _, new_rels = iter_relationships(parts, new_slide)
+        for rel in new_rels:
+            if rel.get("Type") == RT_SLIDE_LAYOUT:
+                layout_target = rel.get("Target")
+
+        rels_tree, old_rels = iter_relationships(old_parts, old_slide)
+        for rel in old_rels:
+            if rel.get("Type") == RT_SLIDE_LAYOUT:
+                rel.set("Target", layout_target)
+                continue
+            source = resolve_target(old_slide, rel.get("Target"))
+            name = copied.get(source)
+            if name is None:
+                name = _free_name(parts, source)
+                parts[name] = old_parts[source]
+                copied[source] = name
+                ext = posixpath.splitext(name)[1][1:].lower()
+                if source in old_overrides:
+                    override = copy.deepcopy(old_overrides[source])
+                    override.set("PartName", "/" + name)
+                    ct_tree.append(override)
+                elif ext not in defaults and ext in old_defaults:
+                    default = copy.deepcopy(old_defaults[ext])
+                    # les Default précèdent les Override dans [Content_Types].xml
+                    ct_tree.insert(0, default)
+                    defaults[ext] = default
+            rel.set("Target", relative_target(new_slide, name))
+
+        parts[new_slide] = old_parts[old_slide]
+        if rels_tree is not None:
+            parts[rels_name(new_slide)] = _serialize(rels_tree)
+    parts[CONTENT_TYPES] = _serialize(ct_tree)
+
+
+# ==== Passes d'optimisation ====
+
+def _drop_relationships(parts):
+    # Relations inutiles (paramètres d'imprimante...) sur toutes les parties
+    for name in [n for n in parts if n.endswith(".rels")]:
+        tree = etree.fromstring(parts[name])
+        dropped = False
+        for rel in tree.findall(f"{{{NS_REL}}}Relationship"):
+            if rel.get("Type") in DROPPABLE_TYPES:
+                tree.remove(rel)
+                dropped = True
+        if dropped:
+            parts[name] = _serialize(tree)
+
+
+def _prune_layouts(parts):
+    """Retire des masques les dispositions qu'aucune diapo n'utilise (au moins une est gardée)."""
+    used = set()
+    masters = []
+    for name in parts:
+        if name.startswith("ppt/slides/") and name.endswith(".xml") and "/_rels/" not in name:
+            _, rels = iter_relationships(parts, name)
+            used.update(resolve_target(name, r.get("Target")) for r in rels if r.get("Type") == RT_SLIDE_LAYOUT)
+        elif name.startswith("ppt/slideMasters/") and name.endswith(".xml") and "/_rels/" not in name:
+            masters.append(name)
+
+    for master in masters:
+        rels_tree, rels = iter_relationships(parts, master)
+        layout_rels = [r for r in rels if r.get("Type") == RT_SLIDE_LAYOUT]
+        unused = [r for r in layout_rels if resolve_target(master, r.get("Target")) not in used]
+        if len(unused) == len(layout_rels):
+            # masque sans diapo: garder sa première disposition (paquet toujours valide)
+            unused = unused[1:]
+        if not unused:
+            continue
+        unused_ids = {r.get("Id") for r in unused}
+        for r in unused:
+            rels_tree.remove(r)
+        parts[rels_name(master)] = _serialize(rels_tree)
+
+        tree = etree.fromstring(parts[master])
+        lst = tree.find(f"{{{NS_P}}}sldLayoutIdLst")
+        if lst is not None:
+            for entry in list(lst):
+                if entry.get(f"{{{NS_R}}}id") in unused_ids:
+                    lst.remove(entry)
+        parts[master] = _serialize(tree)
+
+
+def _dedupe_media(parts):
+    """Fait pointer les relations vers un seul exemplaire de chaque média identique."""
+    canonical = {}
+    alias = {}
+    for name in sorted(parts):
+        if not name.startswith("ppt/media/"):
+            continue
+        digest = hashlib.sha1(parts[name]).hexdigest()
+        first = canonical.setdefault(digest, name)
+        if first != name:
+            alias[name] = first
+    if not alias:
+        return 0
+
+    for name in [n for n in parts if n.endswith(".rels")]:
+        directory = posixpath.dirname(posixpath.dirname(name))
+        source = posixpath.join(directory, posixpath.basename(name)[:-len(".rels")])
+        tree = etree.fromstring(parts[name])
+        changed = False
+        for rel in tree.findall(f"{{{NS_REL}}}Relationship"):
+            if rel.get("TargetMode") == "External":
+                continue
+            target = resolve_target(source, rel.get("Target"))
+            if target in alias:
+                rel.set("Target", relative_target(source, alias[target]))
+                changed = True
+        if changed:
+            parts[name] = _serialize(tree)
+    return len(alias)
+
+
+def _drop_unreachable(parts):
+    keep = reachable_parts(parts)
+    removed = []
+    for name in list(parts):
+        if name == CONTENT_TYPES or name.endswith(".rels"):
+            continue
+        if name not in keep:
+            removed.append(name)
+            del parts[name]
+    # .rels orphelins (partie source retirée)
+    for name in [n for n in parts if n.endswith(".rels") and n != ROOT_RELS]:
+        directory = posixpath.dirname(posixpath.dirname(name))
+        source = posixpath.join(directory, posixpath.basename(name)[:-len(".rels")])
+        if source not in parts:
+            removed.append(name)
+            del parts[name]
+
+    # Types de contenu des parties retirées
+    tree = etree.fromstring(parts[CONTENT_TYPES])
+    for override in tree.findall(f"{{{NS_CT}}}Override"):
+        if override.get("PartName", "").lstrip("/") not in parts:
+            tree.remove(override)
+    parts[CONTENT_TYPES] = _serialize(tree)
+    return removed
+
+
+def optimize_parts(parts):
+    """Applique toutes les passes à un contenu d'archive (modifié sur place)."""
+    _drop_relationships(parts)
+    _prune_layouts(parts)
+    merged = _dedupe_media(parts)
+    removed = _drop_unreachable(parts)
+    return removed, merged
+
+
+def optimize_pptx(path, out_path=None, level=DEFAULT_LEVEL):
+    """Optimise `path` (sur place par défaut). Retourne un PackageReport."""
+    out_path = out_path or path
+    before = os.path.getsize(path)
+    parts = read_package(path)
+    removed, merged = optimize_parts(parts)
+    write_package(parts, out_path, level=level)
+    return PackageReport(before, os.path.getsize(out_path), removed, merged)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Allège un fichier .pptx déjà enregistré.")
+    parser.add_argument("pptx", nargs="+", help="fichier(s) .pptx à optimiser (sur place)")
+    parser.add_argument("--level", type=int, default=DEFAULT_LEVEL, choices=range(0, 10),
+                        metavar="0-9", help="niveau de compression zlib des parties XML")
+    parser.add_argument("-o", "--output", help="fichier de sortie (un seul .pptx en entrée)")
+    args = parser.parse_args(argv)
+    if args.output and len(args.pptx) > 1:
+        parser.error("--output n'accepte qu'un seul fichier en entrée")
+
+    total = 0
+    for path in args.pptx:
+        report = optimize_pptx(path, args.output, level=args.level)
+        total += report.saved
+        print(f"{args.output or path}: {report}")
+    if len(args.pptx) > 1:
+        print(f"total: {total} octets économisés")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
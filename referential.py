@@ -0,0 +1,143 @@
+"""
+Rechargement du référentiel (COMPETENCES.txt) sans perdre les sélections.
+
+Le nouveau référentiel est comparé à l'ancien compétence par compétence, clé
+(domaine, sous-domaine, intitulé):
+- inchangée: même clé des deux côtés;
+- déplacée: même intitulé, nouvel emplacement (sous-domaine ou domaine renommé,
+  compétence changée de sous-domaine);
+- renommée: intitulé retouché au même emplacement (faute corrigée), rapproché par
+  similarité (difflib);
+- ajoutée / retirée: le reste.
+Le diff est appliqué sur place au projet (ou à l'interface): les compétences
+sélectionnées suivent leurs déplacements et renommages, une compétence retirée du
+référentiel reste sélectionnée. Seuls les domaines touchés sont à repaginer.
+"""
+import difflib
+from collections import OrderedDict
+
+from model import DomainState, domain_color, intern_text
+
+# Similarité minimale (difflib) pour un intitulé retouché plutôt que remplacé
+RENAME_MIN_RATIO = 0.6
+
+
+def flat_keys(available, domain_order):
+    """[(domaine, sous-domaine, intitulé)] dans l'ordre du référentiel."""
+    return [(d, sd, c) for d in domain_order for sd, comps in available.get(d, {}).items() for c in comps]
+
+
+class ReferentialDiff:
+    def __init__(self):
+        self.moved = {}         # ancienne clé -> nouvelle clé (même intitulé)
+        self.renamed = {}       # ancienne clé -> nouvelle clé (intitulé retouché)
+        self.added = []
+        self.removed = []
+        self.domain_renames = {}    # ancien domaine -> nouveau domaine
+        self.affected = set()       # domaines (nouveaux noms) dont les pages changent
+        self.order_changed = False
+
+    @property
+    def mapping(self):
+        mapping = dict(self.moved)
+        mapping.update(self.renamed)
+        return mapping
+
+    def __bool__(self):
+        return bool(self.moved or self.renamed or self.added or self.removed or self.order_changed)
+
+    def __str__(self):
+        return (f"{len(self.added)} ajoutée(s), {len(self.removed)} retirée(s), "
+                f"{len(self.renamed)} renommée(s), {len(self.moved)} déplacée(s)")
+
+
+def diff_referentials(old_available, old_order, new_available, new_order):
+    """Diff structurel de deux référentiels (available, domain_order)."""
+    diff = ReferentialDiff()
+    old_keys = flat_keys(old_available, old_order)
+    new_keys = flat_keys(new_available, new_order)
+    old_set, new_set = set(old_keys), set(new_keys)
+    removed = [k for k in old_keys if k not in new_set]
+    added = [k for k in new_keys if k not in old_set]
+
+    # Déplacements: intitulé unique retrouvé ailleurs
+    added_by_text = {}
+    for key in added:
+        added_by_text.setdefault(key[2], []).append(key)
+    still_removed = []
+    for key in removed:
+        targets = added_by_text.get(key[2])
+        if targets and len(targets) == 1:
+            diff.moved[key] = targets.pop()
+        else:
+            still_removed.append(key)
+    taken = set(diff.moved.values())
+    still_added = [k for k in added if k not in taken]
+
+    # Renommages: intitulé le plus proche au même emplacement
+    added_by_place = OrderedDict()
+    for key in still_added:
+        added_by_place.setdefault(key[:2], []).append(key[2])
+    for key in still_removed:
+        candidates = added_by_place.get(key[:2])
+        match = difflib.get_close_matches(key[2], candidates, n=1, cutoff=RENAME_MIN_RATIO) if candidates else []
+        if match:
+            candidates.remove(match[0])
+            diff.renamed[key] = key[:2] + (match[0],)
+        else:
+            diff.removed.append(key)
+    renamed_to = set(diff.renamed.values())
+    diff.added = [k for k in still_added if k not in renamed_to]
+
+    # Domaine renommé: toutes ses compétences parties vers un même domaine nouveau
+    new_domains = set(new_order)
+    for d in old_order:
+        if d in new_domains:
+            continue
+        targets = {new[0] for old, new in diff.mapping.items() if old[0] == d}
+        if len(targets) == 1 and not any(k[0] == d for k in diff.removed):
+            target = targets.pop()
+            if target not in old_order:
+                diff.domain_renames[d] = target
+
+    for old, new in diff.mapping.items():
+        diff.affected.update((diff.domain_renames.get(old[0], old[0]), new[0]))
+    diff.affected.update(diff.domain_renames.get(k[0], k[0]) for k in diff.removed)
+    diff.affected.update(k[0] for k in diff.added)
+    diff.order_changed = [diff.domain_renames.get(d, d) for d in old_order] != list(new_order)
+    return diff
+
+
+def apply_diff(diff, state, new_available, new_order, theme=None):
+    """
+    Applique `diff` sur place à `state` (Project ou interface: available, domain_order,
+    domain_states, selected_items, page_images). Retourne les domaines à repaginer.
+    """
+    mapping = diff.mapping
+    for item in state.selected_items:
+        new = mapping.get(item.key())
+        if new is not None:
+            item.domain, item.subdomain, item.text = (intern_text(v) for v in new)
+
+    # Styles et images suivent les domaines renommés
+    for old, new in diff.domain_renames.items():
+        ds = state.domain_states.pop(old, None)
+        if ds is not None and new not in state.domain_states:
+            ds.name = new
+            state.domain_states[new] = ds
+    if diff.domain_renames:
+        state.page_images = type(state.page_images)(
+            ((diff.domain_renames.get(d, d), pi), imgs) for (d, pi), imgs in state.page_images.items())
+
+    state.available.clear()
+    state.available.update(new_available)
+    # Domaines encore utilisés par une sélection mais absents du référentiel: gardés en fin
+    used = OrderedDict((it.domain, None) for it in state.selected_items)
+    order = list(new_order) + [d for d in used if d not in new_available]
+    state.domain_order[:] = order
+    for idx, d in enumerate(order):
+        if d not in state.domain_states:
+            fallback = domain_color(idx)
+            color = theme.domain_color(d, fallback) if theme is not None else fallback
+            state.domain_states[d] = DomainState(d, color)
+    return set(diff.affected) & set(order)
@@ -0,0 +1,499 @@
+"""
+Rendu Pillow du livret (sans PowerPoint ni écran) : pages PNG et PDF multi-pages.
+
+Dessine les mêmes diapos que l'export PowerPoint (build_cover_slide, pages de
+domaine issues de layout.domain_slides, synthèses par section) à la résolution
+choisie. Utilisable en lot et pour des instantanés de non-régression visuelle :
+
+    python render.py projet.json --pdf livret.pdf --dpi 150
+    python render.py projet.json --png-dir pages/ --dpi 96
+"""
+import argparse
+import os
+import sys
+
+from PIL import Image, ImageDraw, ImageFont
+
+from model import Project, SECTION_KEYS, SECTION_LABELS, SECTION_FIELDS
+from theme import load_theme
+from periods import parse_period, filter_project
+from layout import (
+    PREVIEW_WIDTH, PREVIEW_HEIGHT, SLIDE_WIDTH_IN, SLIDE_HEIGHT_IN, BANNER_DESC_FONT_PT,
+    paginate, domain_slides, split_page_into_slides, content_box_in, block_top,
+)
+
+DEFAULT_DPI = 150
+COVER_HEADER_COLOR = "#6e6e6e"
+# Couleur ACCENT_3 du thème par défaut de python-pptx (fond des infos personnelles)
+COVER_PERSONAL_BG_EXPORT = "#9BBB59"
+SECTION_PHOTO_BG = (245, 245, 245)
+SYNTHESIS_BAND_COLOR = (255, 0, 0)
+# Marges internes par défaut d'une zone de texte PowerPoint (pouces)
+TEXTBOX_INSET_X_IN = 0.1
+TEXTBOX_INSET_Y_IN = 0.05
+LINE_HEIGHT_FACTOR = 1.2
+
+_FONT_FILES = {
+    False: ["arial.ttf", "Arial.ttf", "LiberationSans-Regular.ttf", "DejaVuSans.ttf"],
+    True: ["arialbd.ttf", "Arial Bold.ttf", "LiberationSans-Bold.ttf", "DejaVuSans-Bold.ttf"],
+}
+_font_cache = {}
+
+
+def load_font(size_px, bold=False):
+    """Police TrueType Arial (ou équivalent) à la taille donnée en pixels."""
+    size_px = max(1, int(round(size_px)))
+    key = (size_px, bool(bold))
+    font = _font_cache.get(key)
+    if font is not None:
+        return font
+    for name in _FONT_FILES[bool(bold)]:
+        try:
+            font = ImageFont.truetype(name, size_px)
+            break
+        except OSError:
+            continue
+    if font is None:
+        try:
+            font = ImageFont.load_default(size_px)
+        except TypeError:
+            # Pillow < 10.1: police bitmap de taille fixe
+            font = ImageFont.load_default()
+    _font_cache[key] = font
+    return font
+
+
+def text_width(font, text):
+    if hasattr(font, "getlength"):
+        return font.getlength(text)
+    return font.getsize(text)[0]
+
+
+def wrap_words(text, max_width_px, font):
+    # Même algorithme que CompetenceApp.wrap_text
+    words = text.split()
+    lines = []
+    cur = ""
+    for w in words:
+        test = w if not cur else cur + " " + w
+        if text_width(font, test) <= max_width_px:
+            cur = test
+        else:
+            if cur:
+                lines.append(cur)
+            cur = w
+    if cur:
+        lines.append(cur)
+    return lines
+
+
+class PilTextMeasurer:
+    """
+    Remplace la mesure tkfont de l'interface en mode sans écran.
+    Les tailles de police (points) sont converties en pixels d'aperçu à 96 dpi, comme Tk.
+    """
+
+    def __init__(self, screen_dpi=96):
+        self.scale = screen_dpi / 72.0
+        # Mesures identiques d'un élève à l'autre: cache de coupure partagé (templates.py)
+        self.wrap_key = ("pil", self.scale)
+
+    def wrap_text(self, text, max_width_px, font_tuple):
+        return wrap_words(text, max_width_px, load_font(font_tuple[1] * self.scale))
+
+
+def find_image_variant(path_with_default_ext):
+    # Si le chemin donné existe, l'utiliser, sinon essayer variantes jpg/jpeg
+    if os.path.exists(path_with_default_ext):
+        return path_with_default_ext
+    base, _ = os.path.splitext(path_with_default_ext)
+    for e in [".png", ".jpg", ".jpeg"]:
+        if os.path.exists(base + e):
+            return base + e
+    return None
+
+
+class BookletRenderer:
+    """
+    Dessine le livret d'un projet en images Pillow (une par diapo).
+
+    `measurer` fournit wrap_text(text, max_width_px, font_tuple) pour la pagination:
+    l'interface passe sa mesure Tk et la taille réelle de son aperçu, afin que les
+    pages soient identiques à l'export PowerPoint.
+    """
+
+    def __init__(self, project, dpi=DEFAULT_DPI, measurer=None, canvas_size=None, theme=None):
+        self.project = project
+        self.dpi = dpi
+        self.measurer = measurer or PilTextMeasurer()
+        self.canvas_size = canvas_size or project.preview_size or (PREVIEW_WIDTH, PREVIEW_HEIGHT)
+        self.theme = theme or load_theme()
+        self.width = self.px(SLIDE_WIDTH_IN)
+        self.height = self.px(SLIDE_HEIGHT_IN)
+
+    # ---- Unités ----
+
+    def px(self, inches):
+        return int(round(inches * self.dpi))
+
+    def font(self, size_pt, bold=False):
+        return load_font(size_pt * self.dpi / 72.0, bold)
+
+    def _line_height(self, size_pt):
+        return int(round(size_pt * self.dpi / 72.0 * LINE_HEIGHT_FACTOR))
+
+    # ---- Pages ----
+
+    def iter_pages(self):
+        """Génère les pages dans l'ordre de l'export PowerPoint."""
+        yield self.render_cover()
+        for slide in self.domain_slides():
+            yield self.render_domain_slide(slide)
+        for key in SECTION_KEYS:
+            if self.project.sections_data[key]["completed"]:
+                yield self.render_synthesis(key)
+
+    def render_pages(self):
+        return list(self.iter_pages())
+
+    def domain_slides(self):
+        p = self.project
+        domain_page_map, _, _ = paginate(p.selected_items, p.domain_order, p.domain_states,
+                                         p.prenom, self.measurer.wrap_text, self.canvas_size, p.genre)
+        return domain_slides(domain_page_map, p.domain_order, p.domain_states,
+                             p.prenom, self.measurer.wrap_text, self.canvas_size, p.genre)
+
+    def render_preview_page(self, domain, page_index, page):
+        """Première diapo d'une page d'aperçu déjà paginée (miniatures de l'interface)."""
+        p = self.project
+        slides = split_page_into_slides(domain, page_index, page, p.prenom, self.measurer.wrap_text,
+                                        self.canvas_size, p.domain_states[domain].font_body[1], p.genre)
+        if not slides:
+            return self._new_page()[0]
+        return self.render_domain_slide(slides[0])
+
+    def save_pngs(self, out_dir, prefix="page"):
+        os.makedirs(out_dir, exist_ok=True)
+        paths = []
+        for i, page in enumerate(self.iter_pages(), start=1):
+            path = os.path.join(out_dir, f"{prefix}_{i:03d}.png")
+            page.save(path, "PNG", dpi=(self.dpi, self.dpi))
+            paths.append(path)
+        return paths
+
+    def save_pdf(self, path):
+        pages = self.render_pages()
+        first, rest = pages[0], pages[1:]
+        first.save(path, "PDF", save_all=True, append_images=rest, resolution=float(self.dpi))
+        return len(pages)
+
+    # ---- Primitives ----
+
+    def _new_page(self):
+        img = Image.new("RGB", (self.width, self.height), "white")
+        return img, ImageDraw.Draw(img)
+
+    def _text_lines(self, draw, left, top, lines, size_pt, fill, bold=False, underline=False,
+                    align="left", box_width=None):
+        # Zone de texte: marges internes PowerPoint, une ligne par paragraphe
+        font = self.font(size_pt, bold)
+        lh = self._line_height(size_pt)
+        x0 = left + self.px(TEXTBOX_INSET_X_IN)
+        y = top + self.px(TEXTBOX_INSET_Y_IN)
+        inner_w = (box_width - 2 * self.px(TEXTBOX_INSET_X_IN)) if box_width else None
+        for line in lines:
+            w = text_width(font, line)
+            x = x0
+            if align == "center" and inner_w:
+                x = x0 + (inner_w - w) / 2
+            draw.text((x, y), line, font=font, fill=fill)
+            if underline:
+                uy = y + int(size_pt * self.dpi / 72.0) + 1
+                draw.line([(x, uy), (x + w, uy)], fill=fill, width=max(1, self.dpi // 96))
+            y += lh
+        return y
+
+    def _paste_image(self, page, path, left, top, width=None, height=None):
+        """Colle une image, en conservant le ratio si une seule dimension est fournie."""
+        with Image.open(path) as im:
+            im.load()
+            iw, ih = im.size
+            if width is None and height is None:
+                width, height = iw, ih
+            elif width is None:
+                width = int(round(iw * height / ih))
+            elif height is None:
+                height = int(round(ih * width / iw))
+            width, height = max(1, int(width)), max(1, int(height))
+            im = im.convert("RGBA").resize((width, height), Image.LANCZOS)
+        page.paste(im, (int(left), int(top)), im)
+        return width, height
+
+    # ---- Couverture ----
+
+    def render_cover(self):
+        p = self.project
+        page, draw = self._new_page()
+        sw, sh = self.width, self.height
+        margin = self.px(0.6)
+
+        # Bannière top (image si dispo)
+        used_banner_h = self.px(0.8)
+        top_path = find_image_variant(os.path.join("img", "banniere-top.png"))
+        drawn = False
+        if top_path and os.path.exists(top_path):
+            try:
+                _, used_banner_h = self._paste_image(page, top_path, 0, 0, width=sw)
+                drawn = True
+            except Exception:
+                drawn = False
+        if not drawn:
+            used_banner_h = self.px(0.8)
+            draw.rectangle([0, 0, sw, used_banner_h], fill=COVER_HEADER_COLOR)
+            self._text_lines(draw, 0, 0, ["PROFIL DE L'ELEVE"], 28, "white", bold=True,
+                             align="center", box_width=sw)
+
+        content_top = used_banner_h + self.px(0.15)
+
+        # Colonne principale: fond olive + infos personnelles
+        left_left = margin
+        left_w = sw - 2 * margin
+        left_top = content_top
+        left_h = self.px(1.8)
+        draw.rectangle([left_left, left_top, left_left + left_w, left_top + left_h],
+                       fill=COVER_PERSONAL_BG_EXPORT)
+        lines = []
+        if p.nom.strip():
+            lines.append(f"Nom: {p.nom.strip()}")
+        if p.prenom.strip():
+            lines.append(f"Prénom: {p.prenom.strip()}")
+        if p.naissance.strip():
+            lines.append(f"Date de naissance: {p.naissance.strip()}")
+        self._text_lines(draw, left_left + self.px(0.15), left_top + self.px(0.12), lines, 14,
+                         "white", bold=True)
+
+        # Photo élève (en haut à droite)
+        if p.photo_path and os.path.exists(p.photo_path):
+            try:
+                with Image.open(p.photo_path) as im:
+                    iw, ih = im.size
+                ph_h = self.px(1.4)
+                ph_w = int(round(iw * ph_h / ih)) if ih else ph_h
+                self._paste_image(page, p.photo_path, left_left + left_w - ph_w - self.px(0.2),
+                                  left_top + self.px(0.2), width=ph_w, height=ph_h)
+            except Exception:
+                pass
+
+        # Présentation HORIZONTALE des sections
+        row_top = left_top + left_h + self.px(0.2)
+        col_w = (sw - 2 * margin) / len(SECTION_KEYS)
+        col_text_h = self.px(1.0)
+        col_photo_h = self.px(1.6)
+
+        for idx, key in enumerate(SECTION_KEYS):
+            col_left = int(margin + col_w * idx)
+            fields = p.sections_data[key]["fields"]
+            y = self._text_lines(draw, col_left, row_top, [SECTION_LABELS[key]], 12, "black", bold=True)
+            field_lines = []
+            for fname, flabel in SECTION_FIELDS.items():
+                val = fields.get(fname, "").strip()
+                if val:
+                    field_lines.append(f"{flabel}: {val}")
+            # niveau 1: retrait de 0,5 pouce
+            self._text_lines(draw, col_left + self.px(0.5), y - self.px(TEXTBOX_INSET_Y_IN),
+                             field_lines, 10, "black")
+
+            # Emplacement photo sous le bloc texte
+            ph_top = row_top + col_text_h + self.px(0.05)
+            box_w, box_h = int(col_w), col_photo_h
+            draw.rectangle([col_left, ph_top, col_left + box_w, ph_top + box_h], fill=SECTION_PHOTO_BG)
+            sec_photo = p.sections_data[key]["photo"]
+            if sec_photo and os.path.exists(sec_photo):
+                try:
+                    with Image.open(sec_photo) as im:
+                        iw, ih = im.size
+                    img_ratio = iw / ih if ih else 1.0
+                    box_ratio = box_w / box_h if box_h else 1.0
+                    if img_ratio >= box_ratio:
+                        h = int(round(box_w / img_ratio))
+                        self._paste_image(page, sec_photo, col_left, ph_top + (box_h - h) // 2, width=box_w)
+                    else:
+                        w = int(round(box_h * img_ratio))
+                        self._paste_image(page, sec_photo, col_left + (box_w - w) // 2, ph_top, height=box_h)
+                except Exception:
+                    pass
+
+        # Bannière basse (page de garde uniquement)
+        for candidate in ("banniere-bas.png", "banniere-bas.jpg", "banniere-bas.jpeg"):
+            img_path = os.path.join("img", candidate)
+            if os.path.exists(img_path):
+                try:
+                    with Image.open(img_path) as im:
+                        iw, ih = im.size
+                    h = int(round(ih * sw / iw)) if iw else 0
+                    self._paste_image(page, img_path, 0, sh - h, width=sw, height=h)
+                except Exception:
+                    pass
+                break
+
+        return page
+
+    # ---- Pages de domaine ----
+
+    def render_domain_slide(self, slide):
+        p = self.project
+        page, draw = self._new_page()
+        d = slide.domain
+        ds = p.domain_states[d]
+        color = self.theme.rgb(ds.color)
+
+        # Bandeau domaine dynamique (titre + description)
+        banner = self.theme.banner(d, self.measurer.wrap_text, self.canvas_size)
+        banner_h_in = banner.height_in
+        draw.rectangle([0, 0, self.width, self.px(banner_h_in)], fill=color)
+        self._text_lines(draw, self.px(0.4), self.px(0.05), [d], 20, "white", bold=True)
+        if banner.lines:
+            self._text_lines(draw, self.px(0.4), self.px(0.65), banner.lines, BANNER_DESC_FONT_PT, "white")
+
+        # Zone de contenu
+        left_in, content_top_in, width_in, height_in = content_box_in(banner_h_in)
+        left = self.px(left_in)
+        width = self.px(width_in)
+        body_size = ds.font_body[1]
+
+        for block in slide.blocks:
+            top = self.px(block_top(block.y_px, self.canvas_size, content_top_in, height_in))
+            if block.kind == "header":
+                sub_color = self.theme.rgb(self.theme.subdomain_color(d, block.text, ds.color))
+                self._text_lines(draw, left, top, [block.text], 13, sub_color, bold=True, underline=True)
+            elif block.kind == "band":
+                draw.rectangle([left, top, left + width, top + self.px(0.28)], fill="black")
+                self._text_lines(draw, left, top, [block.text], 10, "white", align="center",
+                                 box_width=width)
+            else:
+                self._text_lines(draw, left + self.px(0.2), top, block.lines, body_size, "black")
+
+        # Images de la page d'aperçu (première diapo seulement)
+        if slide.first_for_page:
+            cw, ch = self.canvas_size
+            for img in p.page_images.get((d, slide.page_index), []):
+                lx = int(img["pos"][0] / cw * self.width)
+                ly = int(img["pos"][1] / ch * self.height)
+                w = int(img["size"][0] / cw * self.width)
+                h = int(img["size"][1] / ch * self.height)
+                try:
+                    if w > 0 and h > 0:
+                        self._paste_image(page, img["path"], lx, ly, width=w, height=h)
+                except Exception:
+                    pass
+
+        return page
+
+    # ---- Synthèse par section ----
+
+    def render_synthesis(self, key):
+        section = self.project.sections_data[key]
+        page, draw = self._new_page()
+        sw, sh = self.width, self.height
+
+        band_h = self.px(0.8)
+        draw.rectangle([0, 0, sw, band_h], fill=SYNTHESIS_BAND_COLOR)
+        self._text_lines(draw, 0, 0, ["Synthèse"], 20, "black", align="center", box_width=sw)
+        self._text_lines(draw, self.px(0.6), band_h + self.px(0.2), [SECTION_LABELS.get(key, key)], 18,
+                         "black", align="center", box_width=sw - self.px(1.2))
+
+        top_content = band_h + self.px(1.0)
+        left = self.px(0.6)
+        width = sw - self.px(1.2)
+        available_h = sh - top_content - self.px(0.9)
+
+        bilan1 = (section["bilan1"] or "").strip()
+        use_bilan2 = bool(section["bilan2_enabled"])
+        bilan2 = (section["bilan2"] or "").strip() if use_bilan2 else ""
+
+        if use_bilan2:
+            box_h = available_h / 2.0 - self.px(0.2)
+            self._bilan_box(draw, left, top_content, width, "Bilan", bilan1)
+            self._bilan_box(draw, left, top_content + box_h + self.px(0.2), width, "Bilan", bilan2)
+        else:
+            self._bilan_box(draw, left, top_content, width, "Bilan", bilan1)
+        return page
+
+    def _bilan_box(self, draw, left, top, width, title, content):
+        self._text_lines(draw, left, top, [title], 14, "black", bold=True)
+        # Contenu avec retour à la ligne (word_wrap activé à l'export)
+        font = self.font(12)
+        inner_w = width - 2 * self.px(TEXTBOX_INSET_X_IN)
+        lines = []
+        for para in content.splitlines():
+            lines.extend(wrap_words(para, inner_w, font) or [""])
+        self._text_lines(draw, left, top + self.px(0.45), lines, 12, "black")
+
+
+class ThumbnailCache:
+    """
+    Miniatures de pages indexées par page et par empreinte de contenu
+    (layout.page_fingerprint): une entrée n'est régénérée que si sa page change.
+    """
+
+    def __init__(self):
+        self._entries = {}   # page key -> (fingerprint, image)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, fingerprint):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, key, fingerprint, image):
+        self._entries[key] = (fingerprint, image)
+
+    def retain(self, keys):
+        # Oublie les pages qui n'existent plus
+        keys = set(keys)
+        for key in [k for k in self._entries if k not in keys]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+
+def make_thumbnail(image, width):
+    thumb = image.copy()
+    thumb.thumbnail((width, width), Image.LANCZOS)
+    return thumb
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rendu PNG/PDF d'un projet de livret (sans PowerPoint).")
+    parser.add_argument("project", help="fichier projet .json")
+    parser.add_argument("--pdf", help="PDF multi-pages à écrire")
+    parser.add_argument("--png-dir", help="dossier où écrire une image PNG par page")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI)
+    parser.add_argument("--period", help="compétences d'une période seulement "
+                                         "(« depuis Mars 2025 », « 2024-2025 », « MS »...)")
+    args = parser.parse_args(argv)
+    if not args.pdf and not args.png_dir:
+        parser.error("indiquer --pdf et/ou --png-dir")
+
+    project = Project.load(args.project)
+    try:
+        period = parse_period(args.period, project.sections_data)
+    except ValueError as e:
+        parser.error(str(e))
+    renderer = BookletRenderer(filter_project(project, period), dpi=args.dpi)
+    if args.pdf:
+        n = renderer.save_pdf(args.pdf)
+        print(f"{args.pdf}: {n} page(s)")
+    if args.png_dir:
+        paths = renderer.save_pngs(args.png_dir)
+        print(f"{args.png_dir}: {len(paths)} page(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
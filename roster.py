@@ -0,0 +1,232 @@
+"""
+Création des projets élèves d'une classe ou d'une école à partir d'une liste CSV.
+
+Une ligne par élève (export de l'administration scolaire ou tableur): nom, prénom,
+date de naissance, et facultativement le genre (F/M, pour les accords des intitulés),
+la section (TPS/PS/MS/GS) et les champs de section (année, école, enseignants). Les champs de section communs sont donnés une
+fois pour tous; le référentiel est lu une seule fois et partagé par tous les projets
+créés (projet modèle). Le fichier est lu en flux, chaque projet est écrit aussitôt;
+une ligne invalide est signalée avec son numéro et n'arrête pas l'import.
+
+Depuis l'interface (« Importer une liste »), le projet ouvert sert de modèle:
+référentiel, couleurs et champs de section déjà saisis.
+
+    python roster.py liste.csv --out eleves/ --section MS --annee 2025-2026 \\
+        --ecole "École des Tilleuls" --enseignants "Mme Durand"
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+import unicodedata
+from datetime import datetime
+
+from model import (
+    Project, DomainState, SECTION_KEYS, SECTION_LABELS, SECTION_FIELDS,
+    domain_color, parse_competences_file,
+)
+from templates import parse_genre
+
+# En-têtes reconnus (après normalisation: minuscules, sans accents ni ponctuation)
+COLUMN_ALIASES = {
+    "nom": ("nom", "nom de famille", "nom eleve", "nom d usage", "nom de l eleve"),
+    "prenom": ("prenom", "prenoms", "prenom eleve", "prenom de l eleve"),
+    "naissance": ("date de naissance", "naissance", "ne le", "ne e le", "nee le", "date naissance"),
+    "section": ("section", "niveau"),
+    "annee": ("annee", "annee scolaire"),
+    "ecole": ("ecole", "etablissement"),
+    "enseignants": ("enseignant", "enseignants", "enseignant s", "enseignante", "professeur"),
+    "photo": ("photo", "fichier photo", "photographie"),
+    "genre": ("genre", "sexe", "fille garcon"),
+}
+DATE_FORMATS = ("%d/%m/%Y", "%d/%m/%y", "%Y-%m-%d", "%d-%m-%Y", "%d.%m.%Y")
+# Libellés de niveau des exports administratifs -> clés de section
+SECTION_ALIASES = {"tps": "TPS", "ps": "PS", "ms": "MS", "gs": "GS",
+                   "toute petite section": "TPS", "petite section": "PS",
+                   "moyenne section": "MS", "grande section": "GS"}
+
+
+def normalize_header(text):
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def map_columns(header):
+    """{champ: indice de colonne} d'après la ligne d'en-tête; ValueError si nom ou prénom manque."""
+    columns = {}
+    for index, name in enumerate(header):
+        key = normalize_header(name)
+        for field, aliases in COLUMN_ALIASES.items():
+            if key in aliases and field not in columns:
+                columns[field] = index
+    missing = [f for f in ("nom", "prenom") if f not in columns]
+    if missing:
+        raise ValueError("colonne(s) introuvable(s): " + ", ".join(missing))
+    return columns
+
+
+def parse_birth_date(text):
+    """Date de naissance au format jj/mm/aaaa ("" si vide); ValueError si illisible."""
+    text = (text or "").strip()
+    if not text:
+        return ""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%d/%m/%Y")
+        except ValueError:
+            continue
+    raise ValueError(f"date de naissance illisible: {text!r}")
+
+
+def parse_section(text):
+    key = SECTION_ALIASES.get(normalize_header(text))
+    if key is None:
+        raise ValueError(f"section inconnue: {text!r} (attendu {', '.join(SECTION_KEYS)})")
+    return key
+
+
+def project_filename(nom, prenom):
+    name = f"{nom.strip().upper()}_{prenom.strip()}"
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^\w-]+", "_", name).strip("_") + ".json"
+
+
+def template_project(competences_path, theme=None):
+    """
+    Projet modèle: référentiel (lu une fois, partagé par tous les projets créés) et
+    couleurs des domaines du thème.
+    """
+    template = Project()
+    template.available, template.domain_order = parse_competences_file(competences_path)
+    for idx, d in enumerate(template.domain_order):
+        fallback = domain_color(idx)
+        color = theme.domain_color(d, fallback) if theme is not None else fallback
+        template.domain_states[d] = DomainState(d, color)
+    return template
+
+
+def sniff_dialect(sample):
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=";,\t")
+    except csv.Error:
+        return csv.excel
+
+
+class RosterResult:
+    def __init__(self):
+        self.created = []     # chemins des projets écrits
+        self.errors = []      # (numéro de ligne, message)
+
+    def __str__(self):
+        return f"{len(self.created)} projet(s) créé(s), {len(self.errors)} ligne(s) en erreur"
+
+
+def open_roster(path):
+    # Exports administratifs: UTF-8 (avec ou sans BOM) ou Windows-1252
+    with open(path, "rb") as f:
+        head = f.read(4096)
+    try:
+        head.decode("utf-8-sig")
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        encoding = "cp1252"
+    return open(path, "r", encoding=encoding, newline="")
+
+
+def import_roster(csv_path, out_dir, template, section=None, fields=None, overwrite=False):
+    """
+    Crée un projet par ligne de `csv_path` dans `out_dir`, à partir de `template`
+    (référentiel, couleurs, champs de section déjà remplis). `fields` (année, école,
+    enseignants) complète la section de l'élève: colonne section, sinon `section`;
+    les colonnes de même nom l'emportent. Retourne un RosterResult.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    result = RosterResult()
+    seen = set()
+    with open_roster(csv_path) as f:
+        reader = csv.reader(f, sniff_dialect(f.read(4096)))
+        f.seek(0)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError("fichier vide")
+        columns = map_columns(header)
+
+        def cell(row, field):
+            index = columns.get(field)
+            return row[index].strip() if index is not None and index < len(row) else ""
+
+        for row in reader:
+            line = reader.line_num
+            if not any(c.strip() for c in row):
+                continue
+            try:
+                nom, prenom = cell(row, "nom"), cell(row, "prenom")
+                if not nom or not prenom:
+                    raise ValueError("nom ou prénom manquant")
+                naissance = parse_birth_date(cell(row, "naissance"))
+                row_section = parse_section(cell(row, "section")) if cell(row, "section") else section
+                path = os.path.join(out_dir, project_filename(nom, prenom))
+                if path in seen:
+                    raise ValueError(f"élève en double: {os.path.basename(path)}")
+                if os.path.exists(path) and not overwrite:
+                    raise ValueError(f"projet déjà présent: {os.path.basename(path)}")
+
+                project = new_pupil(template, nom, prenom, naissance)
+                project.genre = parse_genre(cell(row, "genre"))
+                if row_section:
+                    values = dict(fields or {})
+                    values.update((f, cell(row, f)) for f in SECTION_FIELDS if cell(row, f))
+                    project.sections_data[row_section]["fields"].update(values)
+                project.save(path)
+            except (ValueError, OSError) as e:
+                result.errors.append((line, str(e)))
+                continue
+            seen.add(path)
+            result.created.append(path)
+    return result
+
+
+def new_pupil(template, nom, prenom, naissance):
+    """Projet vierge d'un élève: référentiel et couleurs partagés avec `template`."""
+    project = Project()
+    project.available = template.available
+    project.domain_order = template.domain_order
+    project.domain_states = template.domain_states
+    project.nom, project.prenom, project.naissance = nom, prenom, naissance
+    for key in SECTION_KEYS:
+        project.sections_data[key]["fields"] = dict(template.sections_data[key]["fields"])
+    return project
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crée les projets élèves à partir d'une liste CSV.")
+    parser.add_argument("csv", help="liste des élèves (.csv, séparateur ; ou ,)")
+    parser.add_argument("--out", required=True, help="dossier des projets créés")
+    parser.add_argument("--competences-file", default="COMPETENCES.txt", help="référentiel (COMPETENCES.txt)")
+    parser.add_argument("--section", type=str.upper, choices=SECTION_KEYS,
+                        help="section des champs communs (et des élèves sans colonne section)")
+    for name, label in SECTION_FIELDS.items():
+        parser.add_argument(f"--{name}", default="", help=f"{label} (commun à tous les élèves)")
+    parser.add_argument("--overwrite", action="store_true", help="remplacer les projets existants")
+    args = parser.parse_args(argv)
+
+    fields = {name: getattr(args, name) for name in SECTION_FIELDS if getattr(args, name)}
+    if fields and not args.section:
+        parser.error("--section est requis avec " + ", ".join(f"--{n}" for n in fields))
+
+    from theme import load_theme
+    template = template_project(args.competences_file, load_theme())
+    try:
+        result = import_roster(args.csv, args.out, template, args.section, fields, args.overwrite)
+    except ValueError as e:
+        parser.exit(2, f"{args.csv}: {e}\n")
+    for line, message in result.errors:
+        print(f"{args.csv}:{line}: {message}", file=sys.stderr)
+    section = f" ({SECTION_LABELS[args.section]})" if args.section else ""
+    print(f"{result}{section}")
+    return 1 if result.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
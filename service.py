@@ -0,0 +1,401 @@
+"""
+Service HTTP local d'export PowerPoint (bibliothèque standard uniquement).
+
+Une seule machine de l'école fait les exports; tablettes et autres postes envoient
+un projet et récupèrent le livret, sans Python installé. Le rendu utilise le même
+code que l'interface (layout + export_pptx), avec la mesure de texte Pillow.
+
+    python service.py --port 8765 --workers 4 --queue 16
+
+Points d'accès:
+- POST /jobs                 projet .json (application/json) ou projet empaqueté
+                             (application/zip: un .json et ses images, chemins relatifs).
+                             202 + {"id", "status", "location"}; avec ?wait=1, attend
+                             la fin et renvoie directement le .pptx.
+                             503 (Retry-After) si la file d'attente est pleine.
+- GET  /jobs/<id>            état du travail (queued, running, done, failed).
+- GET  /jobs/<id>/pptx       livret terminé (409 tant qu'il n'est pas prêt).
+- GET  /metrics              profondeur de file, travaux en cours, latences (JSON).
+- GET  /health
+
+La file est bornée: au-delà de `queue` travaux en attente, les envois sont refusés
+plutôt que d'accumuler du retard. Le rendu tourne dans un pool de `workers`
+processus; seuls les `MAX_FINISHED_JOBS` derniers livrets terminés sont conservés.
+"""
+import argparse
+import io
+import json
+import os
+import queue
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from model import Project
+
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 16
+MAX_BODY_BYTES = 64 * 1024 * 1024
+MAX_UNPACKED_BYTES = 256 * 1024 * 1024     # contenu décompressé d'un projet empaqueté
+MAX_FINISHED_JOBS = 100
+LATENCY_WINDOW = 200
+RETRY_AFTER_S = 5
+PROJECT_NAME = "projet.json"
+PPTX_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+
+class ServiceBusy(Exception):
+    """File d'attente pleine: le client doit réessayer plus tard."""
+
+
+# ==== Rendu (processus du pool) ====
+
+def _confined(path, base_dir):
+    """
+    Chemin d'image du projet résolu dans `base_dir`; None s'il en sort (chemin absolu,
+    « ../ », lien symbolique): un client ne doit pas faire embarquer les fichiers du serveur.
+    """
+    if not path or os.path.isabs(path):
+        return None
+    root = os.path.realpath(base_dir)
+    target = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, target]) != root:
+        return None
+    return target
+
+
+def render_job(job_dir, compact=False):
+    """
+    Exporte `job_dir`/projet.json vers `job_dir`/livret.pptx; les chemins d'images
+    relatifs sont pris dans `job_dir`, les autres sont ignorés (_confined).
+    Retourne (chemin du livret, nombre de diapos).
+    """
+    from export_pptx import PptxExporter
+    from render import PilTextMeasurer
+
+    project = Project.load(os.path.join(job_dir, PROJECT_NAME))
+    project.photo_path = _confined(project.photo_path, job_dir)
+    for section in project.sections_data.values():
+        section["photo"] = _confined(section["photo"], job_dir)
+    for key, images in list(project.page_images.items()):
+        kept = []
+        for img in images:
+            img["path"] = _confined(img["path"], job_dir)
+            if img["path"]:
+                kept.append(img)
+        if kept:
+            project.page_images[key] = kept
+        else:
+            del project.page_images[key]
+
+    out = os.path.join(job_dir, "livret.pptx")
+    exporter = PptxExporter(project, PilTextMeasurer(), compact=compact)
+    exporter.save(out, incremental=False)
+    return out, exporter.rebuilt + exporter.reused
+
+
+def _extract_package(data, job_dir):
+    # Projet empaqueté: un seul .json à la racine, refus des chemins hors du dossier et
+    # des archives dont le contenu décompressé dépasse MAX_UNPACKED_BYTES
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        if sum(info.file_size for info in zf.infolist()) > MAX_UNPACKED_BYTES:
+            raise ValueError(f"archive trop volumineuse une fois décompressée "
+                             f"(> {MAX_UNPACKED_BYTES // 2**20} Mo)")
+        names = [n for n in zf.namelist() if not n.endswith("/")]
+        root = os.path.realpath(job_dir)
+        for name in names:
+            target = os.path.realpath(os.path.join(job_dir, name))
+            if os.path.commonpath([root, target]) != root:
+                raise ValueError(f"chemin interdit dans l'archive: {name}")
+        projects = [n for n in names if n.lower().endswith(".json") and "/" not in n]
+        if len(projects) != 1:
+            raise ValueError("l'archive doit contenir un seul projet .json à la racine")
+        zf.extractall(job_dir)
+    if projects[0] != PROJECT_NAME:
+        os.replace(os.path.join(job_dir, projects[0]), os.path.join(job_dir, PROJECT_NAME))
+
+
+# ==== Travaux ====
+
+class Job:
+    def __init__(self, job_id, job_dir, title):
+        self.id = job_id
+        self.dir = job_dir
+        self.title = title
+        self.status = "queued"
+        self.error = None
+        self.path = None
+        self.slides = 0
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        data = {"id": self.id, "status": self.status, "title": self.title}
+        if self.started is not None:
+            data["wait_ms"] = round((self.started - self.submitted) * 1000, 1)
+        if self.finished is not None and self.started is not None:
+            data["render_ms"] = round((self.finished - self.started) * 1000, 1)
+        if self.status == "done":
+            data["slides"] = self.slides
+            data["location"] = f"/jobs/{self.id}/pptx"
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered), 1),
+        "p50": round(ordered[len(ordered) // 2], 1),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+        "max": round(ordered[-1], 1),
+    }
+
+
+class ExportService:
+    """
+    File bornée + `workers` processus de rendu. Un fil d'expédition par processus
+    prend le travail suivant de la file et attend son résultat.
+    """
+
+    def __init__(self, workers=None, queue_size=DEFAULT_QUEUE_SIZE, work_dir=None, compact=False):
+        self.workers = workers or os.cpu_count() or 1
+        self.compact = compact
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix="livret-service-")
+        os.makedirs(self.work_dir, exist_ok=True)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._running = 0
+        self._counts = {"completed": 0, "failed": 0, "rejected": 0}
+        self._wait_ms = deque(maxlen=LATENCY_WINDOW)
+        self._render_ms = deque(maxlen=LATENCY_WINDOW)
+        self._total_ms = deque(maxlen=LATENCY_WINDOW)
+        self._threads = [threading.Thread(target=self._dispatch, daemon=True) for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    # ---- Envoi ----
+
+    def submit(self, data, content_type="application/json"):
+        """
+        Met un projet en file (octets JSON ou archive zip). ValueError si le projet est
+        illisible, ServiceBusy si la file est pleine. Retourne le Job.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = os.path.join(self.work_dir, job_id)
+        os.makedirs(job_dir)
+        try:
+            if content_type == "application/zip" or data[:2] == b"PK":
+                _extract_package(data, job_dir)
+            else:
+                with open(os.path.join(job_dir, PROJECT_NAME), "wb") as f:
+                    f.write(data)
+            # Validation avant la file: un projet illisible est refusé tout de suite
+            project = Project.load(os.path.join(job_dir, PROJECT_NAME))
+        except (ValueError, KeyError, TypeError, AttributeError, zipfile.BadZipFile) as e:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise ValueError(f"projet illisible: {e}") from e
+
+        job = Job(job_id, job_dir, " ".join(filter(None, (project.prenom.strip(), project.nom.strip()))))
+        with self._lock:
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self._counts["rejected"] += 1
+                shutil.rmtree(job_dir, ignore_errors=True)
+                raise ServiceBusy() from None
+            self._jobs[job_id] = job
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    # ---- Rendu ----
+
+    def _dispatch(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                job.status = "running"
+                job.started = time.monotonic()
+                self._running += 1
+            try:
+                job.path, job.slides = self._pool.submit(render_job, job.dir, self.compact).result()
+                status, error = "done", None
+            except Exception as e:
+                status, error = "failed", f"{type(e).__name__}: {e}"
+            with self._lock:
+                job.status, job.error = status, error
+                job.finished = time.monotonic()
+                self._running -= 1
+                self._counts["completed" if status == "done" else "failed"] += 1
+                self._wait_ms.append((job.started - job.submitted) * 1000)
+                self._render_ms.append((job.finished - job.started) * 1000)
+                self._total_ms.append((job.finished - job.submitted) * 1000)
+                self._evict()
+            job.done.set()
+
+    def _evict(self):
+        # Garde les MAX_FINISHED_JOBS derniers travaux terminés (appelé sous verrou)
+        finished = [j for j in self._jobs.values() if j.finished is not None]
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+            shutil.rmtree(job.dir, ignore_errors=True)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "running": self._running,
+                "workers": self.workers,
+                **self._counts,
+                "latency_ms": {
+                    "wait": _percentiles(self._wait_ms),
+                    "render": _percentiles(self._render_ms),
+                    "total": _percentiles(self._total_ms),
+                },
+            }
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._pool.shutdown()
+
+
+# ==== HTTP ====
+
+def _download_name(job):
+    name = re.sub(r"[^\w-]+", "_", job.title).strip("_")
+    return f"livret_{name or job.id}.pptx"
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    server_version = "LivretService/1.0"
+    service = None   # ExportService, fixé par make_server
+
+    def do_GET(self):
+        path = urlsplit(self.path).path.rstrip("/")
+        if path == "/health":
+            return self._json(200, {"status": "ok"})
+        if path == "/metrics":
+            return self._json(200, self.service.metrics())
+        parts = path.split("/")[1:]
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self.service.get(parts[1])
+            if job is None:
+                return self._json(404, {"error": "travail inconnu"})
+            if len(parts) == 2:
+                return self._json(200, job.to_dict())
+            if parts[2] == "pptx":
+                return self._send_pptx(job)
+        return self._json(404, {"error": "introuvable"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") != "/jobs":
+            return self._json(404, {"error": "introuvable"})
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            return self._json(400, {"error": "corps vide"})
+        if length > MAX_BODY_BYTES:
+            return self._json(413, {"error": "projet trop volumineux"})
+        data = self.rfile.read(length)
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip()
+        try:
+            job = self.service.submit(data, content_type)
+        except ValueError as e:
+            return self._json(400, {"error": str(e)})
+        except ServiceBusy:
+            return self._json(503, {"error": "file d'attente pleine, réessayer plus tard"},
+                              {"Retry-After": str(RETRY_AFTER_S)})
+
+        if parse_qs(url.query).get("wait", ["0"])[0] not in ("", "0"):
+            job.done.wait()
+            return self._send_pptx(job)
+        body = job.to_dict()
+        body["location"] = f"/jobs/{job.id}"
+        return self._json(202, body, {"Location": body["location"]})
+
+    def _send_pptx(self, job):
+        if job.status == "failed":
+            return self._json(500, job.to_dict())
+        if job.status != "done":
+            return self._json(409, job.to_dict())
+        with open(job.path, "rb") as f:
+            data = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", PPTX_TYPE)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Content-Disposition", f'attachment; filename="{_download_name(job)}"')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self, code, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        sys.stderr.write(f"{self.address_string()} {fmt % args}\n")
+
+
+def make_server(service, host="127.0.0.1", port=DEFAULT_PORT):
+    handler = type("BoundServiceHandler", (ServiceHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Service HTTP local d'export PowerPoint des livrets.")
+    parser.add_argument("--host", default="127.0.0.1", help="0.0.0.0 pour les autres postes du réseau")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="processus de rendu (défaut: nombre de cœurs)")
+    parser.add_argument("--queue", type=int, default=DEFAULT_QUEUE_SIZE, help="travaux en attente au maximum")
+    parser.add_argument("--work-dir", help="dossier des travaux (défaut: dossier temporaire)")
+    parser.add_argument("--compact", action="store_true", help="export compact (une zone de texte par sous-domaine)")
+    args = parser.parse_args(argv)
+
+    service = ExportService(args.workers, args.queue, args.work_dir, args.compact)
+    server = make_server(service, args.host, args.port)
+    print(f"Service d'export sur http://{args.host}:{server.server_address[1]} "
+          f"({service.workers} processus, file de {args.queue})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Personnalisation des intitulés de compétences.
+
+Les intitulés du référentiel sont écrits pour tous les élèves (« explique ce qu'il/elle
+fait », « concentré(e) », « appliqué/ée »). Chaque intitulé est compilé une fois en
+modèle: ses trois formes (non précisé, garçon, fille) sont calculées d'avance, et la
+ligne d'un élève est « • Prénom » suivi de la forme de son genre.
+
+La coupure en lignes (wrap) est mémorisée par modèle et personnalisation. Seule la
+première ligne dépend vraiment du prénom: la suite de la ligne est mise en cache par
+son texte et partagée entre les élèves d'une classe (coupure gloutonne: la fin d'une
+ligne coupée se coupe comme si elle était seule).
+"""
+import re
+from collections import OrderedDict
+from functools import lru_cache
+
+# Genres enregistrés dans le projet ("" = non précisé: formes inclusives gardées)
+GENRES = OrderedDict([("", "Non précisé"), ("M", "Garçon"), ("F", "Fille")])
+GENRE_INDEX = {"": 0, "M": 1, "F": 2}
+GENRE_ALIASES = {"m": "M", "g": "M", "garcon": "M", "masculin": "M", "h": "M",
+                 "f": "F", "fille": "F", "feminin": "F"}
+
+WRAP_CACHE_MAX = 20000
+FIRST_LINE_PROBE = 12       # mots essayés pour trouver la première ligne
+
+_SLOT_RE = re.compile(
+    r"(?P<de>\b[dD]['’]il/elle\b)"          # d'il/elle -> de lui / d'elle
+    r"|(?P<pron>\b[iI]l/[eE]lle\b)"         # il/elle -> il / elle
+    r"|(?P<adj>\b\w+)(?:\(e\)|·e)"          # concentré(e), content·e
+    r"|(?P<acc>\b\w*é)/ée\b"                # appliqué/ée
+)
+
+
+def _forms(match):
+    # (non précisé, garçon, fille) d'un emplacement
+    text = match.group(0)
+    if match.group("de"):
+        d = match.group("de")[0]
+        return text, ("De" if d == "D" else "de") + " lui", d + "'elle"
+    if match.group("pron"):
+        return text, text[:2], text[3:]
+    word = match.group("adj") or match.group("acc")
+    return text, word, word + "e"
+
+
+class CompetenceTemplate:
+    """Intitulé compilé: `forms` = (non précisé, garçon, fille)."""
+    __slots__ = ("text", "forms")
+
+    def __init__(self, text):
+        self.text = text
+        parts = [[], [], []]
+        pos = 0
+        for match in _SLOT_RE.finditer(text):
+            for part, form in zip(parts, _forms(match)):
+                part.append(text[pos:match.start()])
+                part.append(form)
+            pos = match.end()
+        self.forms = tuple("".join(part) + text[pos:] for part in parts)
+
+    def render(self, genre=""):
+        return self.forms[GENRE_INDEX.get(genre or "", 0)]
+
+
+@lru_cache(maxsize=4096)
+def compile_template(text):
+    return CompetenceTemplate(text or "")
+
+
+def parse_genre(text):
+    """"F", "M" ou "" d'après une saisie libre (« Fille », « G », « masculin »...)."""
+    key = (text or "").strip().lower().replace("ç", "c").replace("é", "e")
+    return GENRE_ALIASES.get(key, "")
+
+
+def personalize(prenom, text, genre=""):
+    """Ligne telle qu'exportée: puce + prénom + intitulé accordé."""
+    return f"• {(prenom or '').strip()} {compile_template(text).render(genre)}".strip()
+
+
+# ==== Coupure en lignes ====
+
+_wraps = {}     # (mesure, prénom, genre, intitulé, largeur, police) -> lignes
+_tails = {}     # (mesure, fin de ligne, largeur, police) -> lignes, partagé entre élèves
+
+
+def _measure_key(wrap_text):
+    # Mesures équivalentes (même police, même échelle) partagent le cache via `wrap_key`
+    return getattr(getattr(wrap_text, "__self__", None), "wrap_key", wrap_text)
+
+
+def _remember(cache, key, lines):
+    if len(cache) >= WRAP_CACHE_MAX:
+        cache.clear()
+    cache[key] = lines
+    return lines
+
+
+def wrap_competence(prenom, text, wrap_text, max_width_px, font_tuple, genre=""):
+    """Lignes de la compétence `text` personnalisée, coupées à `max_width_px`."""
+    measure = _measure_key(wrap_text)
+    font = tuple(font_tuple)
+    key = (measure, (prenom or "").strip(), genre or "", text, max_width_px, font)
+    lines = _wraps.get(key)
+    if lines is not None:
+        return lines
+
+    words = personalize(prenom, text, genre).split()
+    # Première ligne: coupure d'un début de ligne assez long pour passer à la ligne
+    n = min(len(words), FIRST_LINE_PROBE)
+    while True:
+        head = wrap_text(" ".join(words[:n]), max_width_px, font_tuple)
+        if len(head) > 1 or n >= len(words):
+            break
+        n = min(len(words), n * 2)
+    if len(head) <= 1:
+        return _remember(_wraps, key, list(head))
+
+    rest = " ".join(words[len(head[0].split()):])
+    tail_key = (measure, rest, max_width_px, font)
+    tail = _tails.get(tail_key)
+    if tail is None:
+        tail = _remember(_tails, tail_key, wrap_text(rest, max_width_px, font_tuple))
+    return _remember(_wraps, key, [head[0]] + list(tail))
@@ -0,0 +1,191 @@
+"""
+Thème du livret compilé une fois par exécution à partir de DOMAINES.txt
+(descriptions) et COULEURS_DOMAINES.txt (couleurs par domaine / sous-domaine).
+
+Le thème est immuable et mis en cache selon la date de modification des fichiers:
+l'interface, le rendu Pillow et les traitements par lot partagent le même objet
+pour tous les élèves. Les lignes de description des bandeaux et leur hauteur sont
+calculées une seule fois par domaine et par largeur d'aperçu.
+"""
+import os
+import re
+import threading
+from types import MappingProxyType
+
+from model import clean_line, parse_domaines_file
+from layout import banner_description_lines, banner_height_in
+
+DOMAINES_FILE = "DOMAINES.txt"
+COULEURS_FILE = "COULEURS_DOMAINES.txt"
+
+_HEX_RE = re.compile(r"^#[0-9A-Fa-f]{6}$")
+
+
+def normalize_name(name):
+    # Comparaison tolérante des intitulés (apostrophes, espaces, casse)
+    return " ".join(clean_line(name or "").upper().split())
+
+
+def parse_couleurs_file(path):
+    """
+    Lit COULEURS_DOMAINES.txt.
+    Retourne (domain_colors, subdomain_colors): domain -> "#RRGGBB", (domain, subdomain) -> "#RRGGBB".
+    """
+    domain_colors = {}
+    subdomain_colors = {}
+    domain = None
+    sub = None
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for raw in f:
+            line = clean_line(raw).strip()
+            if not line:
+                continue
+            if _HEX_RE.match(line):
+                if domain is None:
+                    continue
+                if sub:
+                    subdomain_colors[(domain, sub)] = line.upper()
+                else:
+                    domain_colors[domain] = line.upper()
+            elif line.startswith("##-"):
+                d = line[3:].strip()
+                if d.lower().startswith("domaine"):
+                    parts = d.split(None, 1)
+                    d = parts[1] if len(parts) > 1 else d
+                domain = d
+                sub = None
+            elif line.startswith("#-"):
+                s = line[2:].strip()
+                if s.lower().startswith("sous-domaine:"):
+                    s = s.split(":", 1)[1].strip()
+                sub = s
+    return domain_colors, subdomain_colors
+
+
+def hex_to_rgb(hx):
+    hx = hx.lstrip("#")
+    return tuple(int(hx[i:i+2], 16) for i in (0, 2, 4))
+
+
+class BannerLayout:
+    __slots__ = ("lines", "height_in")
+
+    def __init__(self, lines, height_in):
+        self.lines = tuple(lines)
+        self.height_in = height_in
+
+
+class Theme:
+    """Couleurs et descriptions des domaines, figées. Construire avec load_theme()."""
+
+    def __init__(self, domain_descriptions=None, subdomain_descriptions=None,
+                 domain_colors=None, subdomain_colors=None, signature=None):
+        d = object.__setattr__
+        d(self, "signature", signature)
+        d(self, "domain_descriptions", MappingProxyType(dict(domain_descriptions or {})))
+        d(self, "subdomain_descriptions", MappingProxyType(dict(subdomain_descriptions or {})))
+        d(self, "domain_colors", MappingProxyType(dict(domain_colors or {})))
+        d(self, "subdomain_colors", MappingProxyType(dict(subdomain_colors or {})))
+        # Index normalisés pour rapprocher COMPETENCES.txt des fichiers de thème
+        d(self, "_desc_index", {normalize_name(k): v for k, v in self.domain_descriptions.items()})
+        d(self, "_color_index", {normalize_name(k): v for k, v in self.domain_colors.items()})
+        d(self, "_sub_color_index", {
+            (normalize_name(dm), normalize_name(sd)): v for (dm, sd), v in self.subdomain_colors.items()
+        })
+        d(self, "_rgb", {})
+        d(self, "_rgb_color", {})
+        d(self, "_banners", {})
+        d(self, "_lock", threading.Lock())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Theme est immuable")
+
+    def __reduce__(self):
+        # Transmissible aux processus de travail (exports par lot)
+        return (Theme, (dict(self.domain_descriptions), dict(self.subdomain_descriptions),
+                        dict(self.domain_colors), dict(self.subdomain_colors), self.signature))
+
+    # ---- Descriptions ----
+
+    def description(self, domain):
+        desc = self.domain_descriptions.get(domain)
+        if desc is None:
+            desc = self._desc_index.get(normalize_name(domain), "")
+        return desc
+
+    # ---- Couleurs ----
+
+    def domain_color(self, domain, fallback=None):
+        return self._color_index.get(normalize_name(domain), fallback)
+
+    def subdomain_color(self, domain, subdomain, fallback=None):
+        """Couleur d'un sous-domaine: entrée « #- » du domaine, ou domaine « DOMAINE : SOUS-DOMAINE »."""
+        nd, ns = normalize_name(domain), normalize_name(subdomain)
+        color = self._sub_color_index.get((nd, ns))
+        if color is None:
+            color = self._color_index.get(f"{nd} : {ns}")
+        return color if color is not None else fallback
+
+    def rgb(self, hex_color):
+        rgb = self._rgb.get(hex_color)
+        if rgb is None:
+            rgb = hex_to_rgb(hex_color)
+            self._rgb[hex_color] = rgb
+        return rgb
+
+    def rgb_color(self, hex_color):
+        """pptx RGBColor précalculé (python-pptx n'est importé qu'au premier appel)."""
+        color = self._rgb_color.get(hex_color)
+        if color is None:
+            from pptx.dml.color import RGBColor
+            color = RGBColor(*self.rgb(hex_color))
+            self._rgb_color[hex_color] = color
+        return color
+
+    # ---- Bandeaux de domaine ----
+
+    def banner(self, domain, wrap_text, canvas_size):
+        """Lignes de description et hauteur (pouces) du bandeau, calculées une fois par largeur."""
+        # La mesure dépend de l'outil (Tk ou Pillow): la clé inclut son type
+        measurer = type(getattr(wrap_text, "__self__", wrap_text)).__name__
+        key = (domain, int(canvas_size[0]), measurer)
+        banner = self._banners.get(key)
+        if banner is None:
+            with self._lock:
+                banner = self._banners.get(key)
+                if banner is None:
+                    lines = banner_description_lines(self.description(domain), wrap_text, canvas_size)
+                    banner = BannerLayout(lines, banner_height_in(lines))
+                    self._banners[key] = banner
+        return banner
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def load_theme(base_dir=None):
+    """
+    Thème du répertoire donné (répertoire de travail par défaut), reconstruit seulement
+    si DOMAINES.txt ou COULEURS_DOMAINES.txt ont changé depuis le dernier appel.
+    """
+    base_dir = os.path.abspath(base_dir or os.getcwd())
+    dom_path = os.path.join(base_dir, DOMAINES_FILE)
+    col_path = os.path.join(base_dir, COULEURS_FILE)
+    signature = (_mtime(dom_path), _mtime(col_path))
+    with _cache_lock:
+        theme = _cache.get(base_dir)
+        if theme is not None and theme.signature == signature:
+            return theme
+        domain_desc, sub_desc = parse_domaines_file(dom_path) if signature[0] is not None else ({}, {})
+        domain_colors, sub_colors = parse_couleurs_file(col_path) if signature[1] is not None else ({}, {})
+        theme = Theme(domain_desc, sub_desc, domain_colors, sub_colors, signature)
+        _cache[base_dir] = theme
+        return theme
@@ -0,0 +1,152 @@
+"""
+Plusieurs élèves ouverts dans une même fenêtre (onglets de l'interface).
+
+Remplir les livrets d'une classe ne demande plus d'enregistrer, recharger et attendre
+entre deux élèves: chaque élève ouvert est une PupilSession qui ne garde que son propre
+état (sélection, images, sections, pagination, historique, champs de la couverture).
+Le référentiel, le thème, le cache de mesure du texte, les miniatures et les pixels
+d'images restent ceux de l'application et sont partagés par tous les onglets: changer
+d'élève échange des références, sans relire, repaginer ni décoder.
+
+Un projet ouvert dans un onglet est aligné sur le référentiel partagé (referential.py):
+ses compétences suivent renommages et déplacements, et il ne garde pas de copie du
+référentiel.
+"""
+from model import SECTION_KEYS, CompetenceItem, DomainState, domain_color, new_section_data
+from referential import diff_referentials, apply_diff
+from history import History
+from templates import GENRES
+
+# Attributs de CompetenceApp propres à un élève, échangés au changement d'onglet
+# (`available` est le référentiel partagé: même objet pour tous les élèves)
+SESSION_ATTRS = (
+    "available", "domain_order", "domain_states", "selected_items", "added_set",
+    "add_batch_counter", "page_images", "project_path", "export_dirty", "history",
+    "photo_path", "personal_completed", "sections_data",
+    "domain_page_map", "item_page_index", "flat_pages", "current_flat_index",
+    "current_domain", "_page_domains", "_cover_image_keys",
+)
+# Champs Tk de la couverture: valeurs gardées par élève
+SESSION_VARS = ("nom_var", "prenom_var", "naissance_var", "genre_var", "month_var", "year_var")
+
+NEW_PUPIL_LABEL = "Nouvel élève"
+
+
+def pupil_label(nom, prenom):
+    """Titre d'onglet: « Prénom NOM »."""
+    return " ".join(p for p in ((prenom or "").strip(), (nom or "").strip()) if p) or NEW_PUPIL_LABEL
+
+
+def fresh_domain_states(domain_order, theme=None):
+    """Styles par défaut (couleurs du thème) des domaines d'un nouvel élève."""
+    states = {}
+    for idx, d in enumerate(domain_order):
+        fallback = domain_color(idx)
+        states[d] = DomainState(d, theme.domain_color(d, fallback) if theme is not None else fallback)
+    return states
+
+
+def adopt_referential(project, available, domain_order, theme=None):
+    """
+    Aligne `project` (lu d'un fichier) sur le référentiel partagé (available, domain_order):
+    sélections, styles et images suivent le diff, puis project.available devient l'objet
+    partagé. Retourne le diff (vide si le projet avait le même référentiel).
+    """
+    diff = diff_referentials(project.available, project.domain_order, available, domain_order)
+    if diff:
+        apply_diff(diff, project, available, domain_order, theme)
+    project.available = available
+    return diff
+
+
+class PupilSession:
+    """
+    État d'un élève ouvert dans un onglet, hors de l'application quand l'onglet n'est
+    pas affiché. L'onglet affiché vit dans les attributs de CompetenceApp (store/restore).
+    """
+
+    def __init__(self, available, domain_order=(), theme=None):
+        self.tab = None                     # identifiant de l'onglet (interface)
+        self.available = available
+        self.domain_order = list(domain_order)
+        self.domain_states = fresh_domain_states(self.domain_order, theme)
+        self.selected_items = []
+        self.added_set = set()
+        self.add_batch_counter = 0
+        self.page_images = {}
+        self.project_path = None
+        self.export_dirty = False
+        self.history = History()
+        self.photo_path = None
+        self.personal_completed = False
+        self.sections_data = {key: new_section_data() for key in SECTION_KEYS}
+        self.domain_page_map = {}
+        self.item_page_index = {}
+        self.flat_pages = []
+        self.current_flat_index = 0
+        self.current_domain = None
+        self._page_domains = None
+        self._cover_image_keys = []
+        self.values = {name: "" for name in SESSION_VARS}
+        self.values["genre_var"] = GENRES[""]
+        # Pagination en attente au départ de l'onglet, taille d'aperçu des pages calculées
+        self.pages_pending = False
+        self.preview_size = None
+
+    @property
+    def label(self):
+        return pupil_label(self.values["nom_var"], self.values["prenom_var"])
+
+    def store(self, app):
+        """Garde l'état de l'élève affiché par `app` (références, aucune copie)."""
+        for name in SESSION_ATTRS:
+            setattr(self, name, getattr(app, name))
+        for name in SESSION_VARS:
+            self.values[name] = getattr(app, name).get()
+        self.pages_pending = "pages" in app.scheduler.dirty
+        self.preview_size = app._preview_canvas_size()
+
+    def restore(self, app):
+        """Remet l'état de cet élève dans `app`; les champs Tk sont remplis par l'appelant."""
+        for name in SESSION_ATTRS:
+            setattr(app, name, getattr(self, name))
+
+    def reset_domains(self, domain_order, theme=None):
+        """Premier référentiel chargé pendant que cet onglet (vide) est en arrière-plan."""
+        self.domain_order = list(domain_order)
+        self.domain_states = fresh_domain_states(self.domain_order, theme)
+        self.pages_pending = True
+
+    def follow_referential(self, diff, available, domain_order, theme=None):
+        """Référentiel rechargé pendant que cet onglet est en arrière-plan: repaginé au retour."""
+        domains = apply_diff(diff, self, available, domain_order, theme)
+        self.added_set = {it.key() for it in self.selected_items}
+        self._repaginate_later(domains)
+
+    def add_competences(self, keys, ts):
+        """
+        Validation groupée pendant que cet onglet est en arrière-plan (même règle que
+        CompetenceApp._add_competences): un nouveau lot, sans doublon. Retourne les
+        CompetenceItem ajoutés; l'historique est tenu par l'appelant.
+        """
+        self.add_batch_counter += 1
+        items = []
+        for domain, sub, comp in keys:
+            item = CompetenceItem(domain, sub, comp, ts=ts, batch_id=self.add_batch_counter)
+            if item.key() in self.added_set:
+                continue
+            self.selected_items.append(item)
+            self.added_set.add(item.key())
+            items.append(item)
+        if items:
+            self.export_dirty = True
+            self._repaginate_later({it.domain for it in items})
+        return items
+
+    def _repaginate_later(self, domains):
+        # Domaines à repaginer à l'affichage de l'onglet (s'ajoutent à ceux déjà en attente)
+        if not self.pages_pending:
+            self._page_domains = set(domains)
+        elif self._page_domains is not None:
+            self._page_domains |= set(domains)
+        self.pages_pending = True